@@ -48,6 +48,7 @@ Technical Features:
     ],
     'data': [
         'data/social_scoring_data.xml',
+        'data/ir_cron_data.xml',
         'security/ir.model.access.csv',
         'views/res_partner_views.xml',
         'views/website_templates.xml',
@@ -2,85 +2,93 @@
 
 from odoo import http, fields, _
 from odoo.http import request
-from odoo.addons.website.controllers.main import Website
 from odoo.addons.portal.controllers.portal import CustomerPortal
+from odoo.tools.misc import hmac
 import json
 import logging
 
 _logger = logging.getLogger(__name__)
 
+# Seconds a reverse proxy may serve a cached public showcase page
+SHOWCASE_MAX_AGE = 60
+
+# Customers read per query while generating the sitemap
+SITEMAP_BATCH_SIZE = 1000
+
+
+def sitemap_customers(env, rule, qs):
+    """Sitemap function for customer pages.
+
+    Published companies are streamed in id order, one batch at a time and
+    reading only what the sitemap needs. The website module caches the
+    result and splits it into sitemap index files.
+    """
+    if qs and qs.lower() not in '/customers':
+        return
+    Partner = env['res.partner'].sudo()
+    domain = [
+        ('is_company', '=', True),
+        ('website_published', '=', True),
+    ]
+    fnames = ['last_social_update', 'write_date', 'is_profile_complete']
+    last_id = 0
+    while True:
+        customers = Partner.search_fetch(domain + [('id', '>', last_id)], fnames, order='id', limit=SITEMAP_BATCH_SIZE)
+        if not customers:
+            break
+        for customer in customers:
+            yield {
+                'loc': f'/customers/{customer.id}',
+                'lastmod': fields.Date.to_date(customer.last_social_update or customer.write_date),
+                'changefreq': 'weekly',
+                'priority': 0.8 if customer.is_profile_complete else 0.6,
+            }
+        last_id = customers[-1].id
+        # Keep memory flat on large customer bases
+        Partner.invalidate_model(fnames)
+
 
 class CustomerShowcaseController(http.Controller):
+
+    def _get_engagement_visitor_key(self):
+        # Throttles the public engagement events per client address, which is
+        # only stored hashed with the database secret
+        return hmac(request.env(su=True), 'crm_social_extension.engagement', request.httprequest.remote_addr or '')
     
     @http.route(['/customers', '/customers/page/<int:page>'], 
                 type='http', auth='public', website=True, sitemap=True)
-    def customer_showcase(self, page=1, search='', sort='name', filter_complete='all', **kwargs):
-        """Display customer showcase page with social media information."""
-        
-        # Build domain based on filters
-        domain = [
-            ('is_company', '=', True),
-            ('website_published', '=', True),  # Only show published customers
-        ]
-        
-        # Add search filter
-        if search:
-            search_domain = [
-                '|', '|', '|', '|',
-                ('name', 'ilike', search),
-                ('facebook_url', 'ilike', search),
-                ('linkedin_url', 'ilike', search),
-                ('twitter_url', 'ilike', search),
-                ('social_notes', 'ilike', search)
-            ]
-            domain.extend(search_domain)
-        
-        # Add profile completeness filter
-        if filter_complete == 'complete':
-            domain.append(('is_profile_complete', '=', True))
-        elif filter_complete == 'incomplete':
-            domain.append(('is_profile_complete', '=', False))
-        
-        # Set up sorting
-        sort_options = {
-            'name': 'name asc',
-            'social_score': 'social_score desc',
-            'recent': 'last_social_update desc'
-        }
-        order = sort_options.get(sort, 'name asc')
-        
-        # Pagination setup
-        limit = 12
-        offset = (page - 1) * limit
-        
-        # Get customers
+    def customer_showcase(self, page=1, search='', sort='name', filter_complete='all', after=None, before=None, **kwargs):
+        """Display customer showcase page with social media information.
+
+        Anonymous visitors all see the same page, so its content is served
+        from a server-side cache and tagged for reverse proxies.
+        """
+        # Query string values (pagination links, keyset cursors) arrive as text
+        page = max(int(page), 1) if str(page).isdigit() else 1
+        after = int(after) if after and str(after).isdigit() else None
+        before = int(before) if before and str(before).isdigit() else None
+
         Partner = request.env['res.partner'].sudo()
-        total_customers = Partner.search_count(domain)
-        customers = Partner.search(domain, order=order, limit=limit, offset=offset)
-        
-        # Calculate pagination
-        total_pages = (total_customers + limit - 1) // limit
-        
-        # Prepare values for template
-        values = {
-            'customers': customers,
-            'search': search,
-            'sort': sort,
-            'filter_complete': filter_complete,
-            'page': page,
-            'total_pages': total_pages,
-            'total_customers': total_customers,
-            'has_prev': page > 1,
-            'has_next': page < total_pages,
-            'prev_page': page - 1 if page > 1 else None,
-            'next_page': page + 1 if page < total_pages else None,
-            'page_range': range(max(1, page - 2), min(total_pages + 1, page + 3)),
-        }
-        
-        return request.render('crm_social_extension.customer_showcase_page', values)
+        if not request.env.user._is_public() or request.session.debug:
+            values = Partner._get_showcase_values(page, search, sort, filter_complete, after=after, before=before)
+            return request.render('crm_social_extension.customer_showcase_page', values)
+
+        content, etag = Partner._render_showcase_content(
+            request.website.id, request.lang.code, page, search, sort, filter_complete, after, before,
+        )
+        headers = [
+            ('Cache-Control', f'public, max-age={SHOWCASE_MAX_AGE}'),
+            ('ETag', f'"{etag}"'),
+            ('Vary', 'Cookie'),
+        ]
+        if request.httprequest.if_none_match.contains(etag):
+            return request.make_response('', headers=headers, status=304)
+
+        values = {'showcase_content': content}
+        return request.render('crm_social_extension.customer_showcase_page', values, headers=headers)
 
     @http.route('/customers/<model("res.partner"):customer>', 
-                type='http', auth='public', website=True)
+                type='http', auth='public', website=True, sitemap=sitemap_customers)
     def customer_detail(self, customer, **kwargs):
         """Display individual customer detail page."""
         
@@ -88,10 +96,14 @@ class CustomerShowcaseController(http.Controller):
         if not customer.website_published or not customer.is_company:
             return request.not_found()
         
+        request.env['social.engagement.event'].sudo()._ingest([
+            {'partner_id': customer.id, 'type': 'page_view'},
+        ], visitor_key=self._get_engagement_visitor_key())
+        
         values = {
             'customer': customer,
             'main_object': customer,  # For SEO
-            'social_data': customer.get_social_media_data(),
+            'social_data': customer.showcase_card['platforms'] if customer.showcase_card else customer.get_social_media_data(),
         }
         
         return request.render('crm_social_extension.customer_detail_page', values)
@@ -104,122 +116,18 @@ class CustomerShowcaseController(http.Controller):
         if not term or len(term) < 2:
             return []
         
-        domain = [
-            ('is_company', '=', True),
-            ('website_published', '=', True),
-            '|', '|', '|',
-            ('name', 'ilike', term),
-            ('facebook_url', 'ilike', term),
-            ('linkedin_url', 'ilike', term),
-            ('twitter_url', 'ilike', term)
-        ]
-        
-        customers = request.env['res.partner'].sudo().search(domain, limit=10)
-        
-        results = []
-        for customer in customers:
-            social_platforms = []
-            if customer.facebook_url:
-                social_platforms.append('Facebook')
-            if customer.linkedin_url:
-                social_platforms.append('LinkedIn')
-            if customer.twitter_url:
-                social_platforms.append('Twitter')
-            
-            results.append({
-                'id': customer.id,
-                'name': customer.name,
-                'url': f'/customers/{customer.id}',
-                'social_platforms': social_platforms,
-                'social_score': customer.social_score,
-                'is_complete': customer.is_profile_complete,
-            })
-        
-        return results
+        # Served from the per-worker prefix index, without touching the database
+        return request.env['res.partner'].sudo()._social_autocomplete(term, limit=10)
+
+    @http.route('/customers/api/engagement', 
+                type='json', auth='public', website=True)
+    def customer_engagement(self, events=None, **kwargs):
+        """Collect a batch of engagement events (e.g. social link clicks)."""
+        Event = request.env['social.engagement.event'].sudo()
+        return {'accepted': Event._ingest(events, visitor_key=self._get_engagement_visitor_key())}
 
     @http.route('/customers/api/stats', 
                 type='json', auth='public', website=True)
     def customer_stats(self, **kwargs):
         """API endpoint for customer statistics."""
-        
-        Partner = request.env['res.partner'].sudo()
-        
-        total_customers = Partner.search_count([
-            ('is_company', '=', True),
-            ('website_published', '=', True)
-        ])
-        
-        complete_profiles = Partner.search_count([
-            ('is_company', '=', True),
-            ('website_published', '=', True),
-            ('is_profile_complete', '=', True)
-        ])
-        
-        high_social_score = Partner.search_count([
-            ('is_company', '=', True),
-            ('website_published', '=', True),
-            ('social_score', '>', 80)
-        ])
-        
-        platform_stats = {}
-        for platform in ['facebook_url', 'linkedin_url', 'twitter_url']:
-            platform_stats[platform] = Partner.search_count([
-                ('is_company', '=', True),
-                ('website_published', '=', True),
-                (platform, '!=', False)
-            ])
-        
-        return {
-            'total_customers': total_customers,
-            'complete_profiles': complete_profiles,
-            'completion_rate': round((complete_profiles / total_customers * 100) if total_customers else 0, 1),
-            'high_social_score': high_social_score,
-            'platform_stats': platform_stats,
-        }
-
-
-class WebsiteSEOController(Website):
-    """Extend website controller for SEO optimization."""
-    
-    @http.route('/sitemap.xml', type='http', auth="public", website=True, sitemap=False)
-    def sitemap_xml_index(self, **kwargs):
-        """Override sitemap to include customer pages."""
-        response = super().sitemap_xml_index(**kwargs)
-        
-        # Add customer showcase pages to sitemap
-        Partner = request.env['res.partner'].sudo()
-        customers = Partner.search([
-            ('is_company', '=', True),
-            ('website_published', '=', True),
-            ('is_profile_complete', '=', True)  # Only complete profiles in sitemap
-        ])
-        
-        sitemap_content = response.get_data(as_text=True)
-        
-        # Add customer URLs to sitemap
-        for customer in customers:
-            customer_url = f'{request.httprequest.url_root}customers/{customer.id}'
-            sitemap_content = sitemap_content.replace(
-                '</urlset>',
-                f'<url><loc>{customer_url}</loc><changefreq>weekly</changefreq><priority>0.7</priority></url></urlset>'
-            )
-        
-        return request.make_response(sitemap_content, headers=response.headers)
-
-
-def sitemap_customers(env, rule, qs):
-    """Sitemap function for customer pages."""
-    Partner = env['res.partner'].sudo()
-    customers = Partner.search([
-        ('is_company', '=', True),
-        ('website_published', '=', True),
-    ])
-    
-    for customer in customers:
-        if customer.website_published:
-            yield {
-                'loc': f'/customers/{customer.id}',
-                'lastmod': customer.last_social_update or customer.write_date,
-                'changefreq': 'weekly',
-                'priority': 0.8 if customer.is_profile_complete else 0.6,
-            }
\ No newline at end of file
+        return request.env['res.partner'].sudo()._get_showcase_stats()
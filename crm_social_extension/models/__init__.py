@@ -1,2 +1,10 @@
 """Contenido eliminado por razones legales
-"""
\ No newline at end of file
+"""
+from . import res_partner_search
+from . import res_partner_showcase
+from . import res_partner_scoring
+from . import res_partner_autocomplete
+from . import res_partner_follow_up
+from . import social_preview_cache
+from . import social_engagement
+from . import crm_lead
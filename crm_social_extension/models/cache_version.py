@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""Cache versions kept in PostgreSQL sequences.
+
+The sequence value is part of the ormcache keys, so bumping it outdates the
+entries of every worker without clearing the rest of the cache. It is bumped
+on invalidation and again after commit, which drops what other workers
+cached from the previous data while the transaction was still open.
+"""
+
+
+def create_version_sequence(cr, sequence):
+    cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {sequence}")
+
+
+def get_cache_version(env, sequence):
+    """Current version, read once per transaction."""
+    cache = env.cr.cache
+    if sequence not in cache:
+        env.cr.execute(f"SELECT last_value FROM {sequence}")
+        cache[sequence] = env.cr.fetchone()[0]
+    return cache[sequence]
+
+
+def bump_cache_version(env, sequence):
+    """Bump the version now and, once per transaction, after commit."""
+    env.cr.execute(f"SELECT nextval('{sequence}')")
+    env.cr.cache[sequence] = env.cr.fetchone()[0]
+    postcommit = env.cr.postcommit
+    if postcommit.data.get(sequence):
+        return
+    postcommit.data[sequence] = True
+    registry = env.registry
+
+    @postcommit.add
+    def bump_after_commit():
+        with registry.cursor() as cr:
+            cr.execute(f"SELECT nextval('{sequence}')")
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models, modules
+from odoo.tools import SQL
+
+from .res_partner_scoring import SOCIAL_SCORE_CHUNK_SIZE
+
+_logger = logging.getLogger(__name__)
+
+# Lowest lead priority implied by the customer's social score
+LEAD_PRIORITY_THRESHOLDS = [
+    (80, '3'),
+    (50, '2'),
+    (20, '1'),
+]
+
+# Last partner update already propagated to the leads by the cron
+LEAD_SCORE_WATERMARK_PARAM = 'crm_social_extension.lead_score_watermark'
+# Partners written this long before the watermark are read again: a write
+# committed late keeps the write_date of its transaction start
+LEAD_SCORE_WATERMARK_OVERLAP = timedelta(minutes=15)
+
+
+class CrmLead(models.Model):
+    _inherit = 'crm.lead'
+
+    social_score = fields.Integer(
+        string='Customer Social Score',
+        readonly=True,
+        aggregator='avg',
+        help='Social score of the customer, propagated in bulk from the contact.'
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        leads = super().create(vals_list)
+        leads.filtered('partner_id')._sync_social_scores()
+        return leads
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'partner_id' in vals:
+            self._sync_social_scores()
+        return res
+
+    def _sync_social_scores(self):
+        if self:
+            self._propagate_social_scores(lead_ids=self.ids)
+
+    @api.model
+    def _propagate_social_scores(self, partner_ids=None, lead_ids=None):
+        """Copy the customer social score onto the open leads, in bulk.
+
+        Targets the leads whose contact or commercial partner is among the
+        given partners, the given leads, or every open lead when both are
+        None. The score is copied and the priority raised to the one the
+        score implies; priorities set higher by the salespeople are kept.
+        Only the leads where one of them changes are written. Returns the
+        updated leads.
+        """
+        self.flush_model(['partner_id', 'stage_id', 'active', 'priority', 'social_score'])
+        self.env['res.partner'].flush_model(['commercial_partner_id', 'social_score'])
+        self.env['crm.stage'].flush_model(['is_won'])
+
+        priority = SQL("CASE %s ELSE '0' END", SQL(" ").join(
+            SQL("WHEN company.social_score >= %s THEN %s", threshold, level)
+            for threshold, level in LEAD_PRIORITY_THRESHOLDS
+        ))
+        if partner_ids is not None:
+            chunks = [
+                SQL("(contact.id = ANY(%(ids)s) OR company.id = ANY(%(ids)s))",
+                    ids=list(partner_ids[start:start + SOCIAL_SCORE_CHUNK_SIZE]))
+                for start in range(0, len(partner_ids), SOCIAL_SCORE_CHUNK_SIZE)
+            ]
+        elif lead_ids is not None:
+            chunks = [SQL("lead.id = ANY(%s)", list(lead_ids))] if lead_ids else []
+        else:
+            chunks = [SQL("TRUE")]
+
+        updated_ids = []
+        for condition in chunks:
+            rows = self.env.execute_query(SQL("""
+                WITH target AS (
+                    SELECT lead.id,
+                           COALESCE(company.social_score, 0) AS score,
+                           GREATEST(COALESCE(lead.priority, '0'), %(priority)s) AS priority
+                      FROM crm_lead lead
+                      JOIN res_partner contact ON contact.id = lead.partner_id
+                      JOIN res_partner company ON company.id = contact.commercial_partner_id
+                      LEFT JOIN crm_stage stage ON stage.id = lead.stage_id
+                     WHERE lead.active
+                       AND NOT COALESCE(stage.is_won, FALSE)
+                       AND %(condition)s
+                )
+                UPDATE crm_lead lead
+                   SET social_score = target.score,
+                       priority = target.priority
+                  FROM target
+                 WHERE lead.id = target.id
+                   AND (lead.social_score IS DISTINCT FROM target.score
+                        OR lead.priority IS DISTINCT FROM target.priority)
+             RETURNING lead.id
+            """, priority=priority, condition=condition))
+            updated_ids += [row[0] for row in rows]
+
+        leads = self.browse(updated_ids)
+        if leads:
+            self.invalidate_model(['social_score', 'priority'])
+            leads.modified(['social_score', 'priority'])
+        return leads
+
+    @api.model
+    def _cron_propagate_social_scores(self):
+        """Propagate the scores of the partners changed since the last run.
+
+        Scores rewritten in SQL are propagated right away (see
+        ``_recompute_social_scores``); this catches the ORM updates,
+        reparented contacts included. The watermark is the latest
+        ``write_date`` read, not the clock of the cron.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        Partner = self.env['res.partner'].with_context(active_test=False)
+        watermark = ICP.get_param(LEAD_SCORE_WATERMARK_PARAM)
+        if watermark:
+            since = fields.Datetime.to_datetime(watermark) - LEAD_SCORE_WATERMARK_OVERLAP
+            partners = Partner.search_fetch([('write_date', '>=', since)], ['write_date'], order='id')
+            latest = max(partners.mapped('write_date'), default=None)
+            leads = self._propagate_social_scores(partner_ids=partners.ids)
+        else:
+            [(latest,)] = Partner._read_group([], aggregates=['write_date:max'])
+            leads = self._propagate_social_scores()
+        if latest:
+            ICP.set_param(LEAD_SCORE_WATERMARK_PARAM, fields.Datetime.to_string(latest))
+        _logger.info("Social scores propagated: %s leads updated", len(leads))
+        if not modules.module.current_test:
+            self.env.cr.commit()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import bisect
+from urllib.parse import urlparse
+
+from odoo import api, models, tools
+
+from .res_partner_search import normalize_social_search
+
+SOCIAL_PLATFORMS = [
+    ('facebook_url', 'Facebook'),
+    ('linkedin_url', 'LinkedIn'),
+    ('twitter_url', 'Twitter'),
+]
+
+
+def social_handle(url):
+    """Return the account handle of a social profile URL, e.g. ``acme`` for
+    ``https://linkedin.com/company/acme/``."""
+    segments = [segment for segment in urlparse(url or '').path.split('/') if segment]
+    return segments[-1].lstrip('@') if segments else ''
+
+
+class SocialAutocompleteIndex:
+    """Sorted prefix index over the published customers of one database.
+
+    Each customer is indexed under the words of its name, its full name and
+    its social handles. A lookup is a binary search for the first word of
+    the term; the other words must prefix one of the customer's tokens.
+    Results are precomputed, so answering never touches PostgreSQL.
+    """
+
+    def __init__(self, rows):
+        self.results = []
+        self.names = []
+        self.tokens = []
+        entries = []
+        for position, row in enumerate(rows):
+            platforms = [label for fname, label in SOCIAL_PLATFORMS if row[fname]]
+            self.results.append({
+                'id': row['id'],
+                'name': row['name'],
+                'url': f"/customers/{row['id']}",
+                'social_platforms': platforms,
+                'social_score': row['social_score'],
+                'is_complete': row['is_profile_complete'],
+            })
+            name = normalize_social_search(row['name'])
+            self.names.append(name)
+            tokens = set(name.split()) | {name}
+            tokens.update(normalize_social_search(social_handle(row[fname])) for fname, _label in SOCIAL_PLATFORMS)
+            tokens.discard('')
+            self.tokens.append(tuple(tokens))
+            # Lets the browser narrow cached results for longer terms
+            self.results[-1]['search_tokens'] = sorted(tokens)
+            entries.extend((token, position) for token in tokens)
+        entries.sort()
+        self.keys = [token for token, _position in entries]
+        self.positions = [position for _token, position in entries]
+
+    def __len__(self):
+        return len(self.results)
+
+    def search(self, term, limit=10):
+        words = normalize_social_search(term).split()
+        if not words:
+            return []
+        first, others = words[0], words[1:]
+        start = bisect.bisect_left(self.keys, first)
+        end = bisect.bisect_left(self.keys, first + '\uffff', lo=start)
+        matches = {
+            position for position in self.positions[start:end]
+            if all(any(token.startswith(word) for token in self.tokens[position]) for word in others)
+        }
+        name_prefix = ' '.join(words)
+        ranked = sorted(matches, key=lambda position: (
+            not self.names[position].startswith(name_prefix),
+            -self.results[position]['social_score'],
+            self.results[position]['name'],
+        ))
+        return [dict(self.results[position]) for position in ranked[:limit]]
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    @api.model
+    @tools.ormcache('self._get_showcase_cache_version()')
+    def _get_social_autocomplete_index(self):
+        """Build the per-worker autocomplete index.
+
+        It lives in the ormcache under the showcase cache version, so it is
+        rebuilt lazily in every worker after a published company changes
+        (see ``_invalidate_showcase_cache``).
+        """
+        rows = self.sudo().search_read(
+            [('is_company', '=', True), ('website_published', '=', True)],
+            ['name', 'social_score', 'is_profile_complete'] + [fname for fname, _label in SOCIAL_PLATFORMS],
+            order='id',
+        )
+        return SocialAutocompleteIndex(rows)
+
+    @api.model
+    def _social_autocomplete(self, term, limit=10):
+        return self._get_social_autocomplete_index().search(term, limit=limit)
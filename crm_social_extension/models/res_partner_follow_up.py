@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from odoo import api, models, modules
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+FOLLOW_UP_BATCH_SIZE = 2000
+
+FOLLOW_UP_NOTE = (
+    'This customer has an incomplete social media profile. Consider reaching out to gather '
+    'their social media information for better engagement opportunities.'
+)
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    @api.model
+    def _get_social_follow_up_activity_type(self):
+        activity_type = self.env.ref('crm_social_extension.mail_activity_type_social_follow_up', False) \
+            or self.env['mail.activity.type'].search([('name', '=', 'Social Media Follow-up')], limit=1)
+        if not activity_type:
+            activity_type = self.env['mail.activity.type'].create({
+                'name': 'Social Media Follow-up',
+                'summary': 'Follow up on social media profile completion',
+                'res_model': 'res.partner',
+                'category': 'meeting',
+                'delay_count': 7,
+                'delay_unit': 'days',
+            })
+        return activity_type
+
+    @api.model
+    def _get_social_follow_up_candidate_ids(self, activity_type):
+        """Ids of incomplete companies without an open follow-up, in one query.
+
+        Companies without a salesperson are left out: nobody would own the
+        activity.
+        """
+        query = self._search([
+            ('is_company', '=', True),
+            ('is_profile_complete', '=', False),
+            ('user_id', '!=', False),
+        ], order='id')
+        query.add_where(SQL(
+            """NOT EXISTS (
+                SELECT 1 FROM mail_activity activity
+                 WHERE activity.res_model = 'res.partner'
+                   AND activity.res_id = %s
+                   AND activity.activity_type_id = %s
+                   AND activity.active
+            )""",
+            SQL.identifier(query.table, 'id'), activity_type.id,
+        ))
+        return self.browse(query).ids
+
+    @api.model
+    def _generate_social_follow_up_activities(self, batch_size=FOLLOW_UP_BATCH_SIZE):
+        """Create a Social Media Follow-up activity for every incomplete company.
+
+        Partners that already have an open follow-up are skipped. Returns the
+        number of activities created. Nothing is committed, so the caller
+        (e.g. the install hook) keeps its transaction.
+        """
+        created = sum(self._generate_social_follow_up_batches(batch_size))
+        _logger.info("Social media follow-up activities created: %s", created)
+        return created
+
+    @api.model
+    def _generate_social_follow_up_batches(self, batch_size=FOLLOW_UP_BATCH_SIZE):
+        """Create the follow-ups batch by batch, yielding each batch size.
+
+        Each batch is a single multi-create, with the activities assigned to
+        the partner's salesperson.
+        """
+        activity_type = self._get_social_follow_up_activity_type()
+        partner_ids = self._get_social_follow_up_candidate_ids(activity_type)
+        if not partner_ids:
+            return
+
+        Activity = self.env['mail.activity'].with_context(mail_activity_quick_update=True)
+        model_id = self.env['ir.model']._get_id('res.partner')
+        date_deadline = activity_type._get_date_deadline()
+        for start in range(0, len(partner_ids), batch_size):
+            partners = self.browse(partner_ids[start:start + batch_size])
+            Activity.create([{
+                'activity_type_id': activity_type.id,
+                'res_model_id': model_id,
+                'res_id': partner.id,
+                'summary': f'Complete social media profile for {partner.name}',
+                'note': FOLLOW_UP_NOTE,
+                'date_deadline': date_deadline,
+                'user_id': partner.user_id.id,
+            } for partner in partners])
+            yield len(partners)
+            partners.invalidate_recordset()
+
+    @api.model
+    def _cron_generate_social_follow_ups(self):
+        # Commit every batch, so a timeout keeps the follow-ups already planned
+        created = 0
+        for count in self._generate_social_follow_up_batches():
+            created += count
+            if not modules.module.current_test:
+                self.env.cr.commit()
+        _logger.info("Social media follow-up activities created: %s", created)
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from odoo import api, fields, models, modules
+
+_logger = logging.getLogger(__name__)
+
+SOCIAL_SCORE_CHUNK_SIZE = 5000
+
+SOCIAL_URL_FIELDS = ['facebook_url', 'linkedin_url', 'twitter_url']
+
+# Scoring weights and their defaults (see data/social_scoring_data.xml)
+SOCIAL_SCORE_PARAMS = {
+    'crm_social_extension.facebook_points': 20,
+    'crm_social_extension.linkedin_points': 20,
+    'crm_social_extension.twitter_points': 20,
+    'crm_social_extension.completion_bonus': 20,
+}
+
+ENGAGEMENT_POINTS = {
+    'low': 0,
+    'medium': 5,
+    'high': 10,
+    'excellent': 20,
+}
+
+# Last social update already scored by the incremental cron
+SOCIAL_SCORE_WATERMARK_PARAM = 'crm_social_extension.social_score_watermark'
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    @api.model
+    def _get_social_score_weights(self):
+        """Read the scoring weights once for a whole recomputation."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        return {
+            key.split('.')[-1]: int(ICP.get_param(key, default))
+            for key, default in SOCIAL_SCORE_PARAMS.items()
+        }
+
+    @api.model
+    def _recompute_social_scores(self, partner_ids=None):
+        """Recompute the social score in bulk, one UPDATE per chunk.
+
+        Scores the given partners, or every partner when ``partner_ids`` is
+        None, and only writes the rows whose score actually changes.
+        Returns the partners whose score changed.
+        """
+        self.flush_model(SOCIAL_URL_FIELDS + ['social_engagement_level', 'social_score'])
+        if partner_ids is None:
+            self.env.cr.execute("SELECT id FROM res_partner ORDER BY id")
+            partner_ids = [row[0] for row in self.env.cr.fetchall()]
+
+        params = self._get_social_score_weights()
+        params.update({f'engagement_{level}': points for level, points in ENGAGEMENT_POINTS.items()})
+        changed_ids = []
+        for start in range(0, len(partner_ids), SOCIAL_SCORE_CHUNK_SIZE):
+            params['ids'] = list(partner_ids[start:start + SOCIAL_SCORE_CHUNK_SIZE])
+            self.env.cr.execute("""
+                WITH scored AS (
+                    SELECT id,
+                           CASE WHEN COALESCE(facebook_url, '') != '' THEN %(facebook_points)s ELSE 0 END
+                         + CASE WHEN COALESCE(linkedin_url, '') != '' THEN %(linkedin_points)s ELSE 0 END
+                         + CASE WHEN COALESCE(twitter_url, '') != '' THEN %(twitter_points)s ELSE 0 END
+                         + CASE WHEN COALESCE(facebook_url, '') != ''
+                                 AND COALESCE(linkedin_url, '') != ''
+                                 AND COALESCE(twitter_url, '') != ''
+                                THEN %(completion_bonus)s ELSE 0 END
+                         + CASE social_engagement_level
+                                WHEN 'medium' THEN %(engagement_medium)s
+                                WHEN 'high' THEN %(engagement_high)s
+                                WHEN 'excellent' THEN %(engagement_excellent)s
+                                ELSE %(engagement_low)s END AS score
+                      FROM res_partner
+                     WHERE id = ANY(%(ids)s)
+                )
+                UPDATE res_partner partner
+                   SET social_score = scored.score
+                  FROM scored
+                 WHERE partner.id = scored.id
+                   AND partner.social_score IS DISTINCT FROM scored.score
+             RETURNING partner.id
+            """, params)
+            changed_ids += [row[0] for row in self.env.cr.fetchall()]
+
+        changed = self.browse(changed_ids)
+        if changed:
+            self.invalidate_model(['social_score'])
+            # Recompute what depends on the score, e.g. the showcase cards
+            changed.modified(['social_score'])
+            self._invalidate_showcase_cache()
+            self.env['crm.lead']._propagate_social_scores(partner_ids=changed.ids)
+        return changed
+
+    @api.model
+    def _cron_recompute_social_scores(self):
+        """Score the partners whose social profile changed since the last run.
+
+        Without a watermark (first run, or after the weights changed) every
+        partner is rescored.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        watermark = ICP.get_param(SOCIAL_SCORE_WATERMARK_PARAM)
+        now = fields.Datetime.now()
+        if watermark:
+            partner_ids = self.with_context(active_test=False).search(
+                [('last_social_update', '>=', watermark)], order='id'
+            ).ids
+            changed = self._recompute_social_scores(partner_ids)
+        else:
+            changed = self._recompute_social_scores()
+        ICP.set_param(SOCIAL_SCORE_WATERMARK_PARAM, fields.Datetime.to_string(now))
+        _logger.info("Social scores recomputed: %s partners changed", len(changed))
+        if not modules.module.current_test:
+            self.env.cr.commit()
+
+
+class IrConfigParameter(models.Model):
+    _inherit = 'ir.config_parameter'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._reset_social_score_watermark()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self._reset_social_score_watermark()
+        return res
+
+    def _reset_social_score_watermark(self):
+        # New weights change every score: the next cron run rescores everyone
+        if any(param.key in SOCIAL_SCORE_PARAMS for param in self):
+            self.search([('key', '=', SOCIAL_SCORE_WATERMARK_PARAM)]).unlink()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+import re
+import unicodedata
+
+from odoo import api, fields, models
+from odoo.tools import SQL
+
+# Fields combined into the public customer search document
+SOCIAL_SEARCH_FIELDS = ['name', 'facebook_url', 'linkedin_url', 'twitter_url', 'social_notes']
+
+
+def normalize_social_search(value):
+    """Lowercase, strip accents and collapse whitespace so that the stored
+    document and the search term compare with a plain LIKE."""
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFKD', value)
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return re.sub(r'\s+', ' ', value).strip().lower()
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    social_search_document = fields.Char(
+        string='Social Search Document',
+        compute='_compute_social_search_document',
+        store=True,
+        index='trigram',
+        help='Normalized name, social URLs and notes used by the public customer search.'
+    )
+
+    @api.depends(*SOCIAL_SEARCH_FIELDS)
+    def _compute_social_search_document(self):
+        for partner in self:
+            partner.social_search_document = normalize_social_search(' '.join(
+                partner[field_name] for field_name in SOCIAL_SEARCH_FIELDS if partner[field_name]
+            )) or False
+
+    @api.model
+    def _search_social_ranked(self, term, domain=None, limit=None, offset=0, order=None):
+        """Search partners whose social document contains ``term``, best matches first.
+
+        The substring filter is served by the trigram index, and results are
+        ranked by trigram similarity with ``order`` as the tie breaker.
+        Returns a lazy recordset.
+        """
+        query = self._search_social_query(term, domain, limit=limit, offset=offset, order=order)
+        return self.browse(query)
+
+    @api.model
+    def _search_social_count(self, term, domain=None):
+        return self.search_count(self._get_social_search_domain(term, domain))
+
+    @api.model
+    def _get_social_search_domain(self, term, domain=None):
+        return list(domain or []) + [('social_search_document', 'like', normalize_social_search(term))]
+
+    @api.model
+    def _search_social_query(self, term, domain=None, limit=None, offset=0, order=None):
+        query = self._search(self._get_social_search_domain(term, domain), offset=offset, limit=limit, order=order)
+        if self.env.registry.has_trigram:
+            rank = SQL(
+                "similarity(%s, %s) DESC",
+                SQL.identifier(self._table, 'social_search_document'),
+                normalize_social_search(term),
+            )
+            query.order = SQL("%s, %s", rank, query.order) if query.order else rank
+        return query
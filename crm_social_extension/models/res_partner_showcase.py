@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from odoo import api, fields, models, tools
+from odoo.tools import SQL
+
+from .cache_version import bump_cache_version, create_version_sequence, get_cache_version
+
+SHOWCASE_PAGE_SIZE = 12
+
+SHOWCASE_SORT_OPTIONS = {
+    'name': 'name asc',
+    'social_score': 'social_score desc',
+    'recent': 'last_social_update desc',
+}
+
+# Seconds the public showcase statistics may be served from the cache
+SHOWCASE_STATS_TTL = 300
+
+SOCIAL_PLATFORM_FIELDS = ['facebook_url', 'linkedin_url', 'twitter_url']
+
+# Fields rendered on (or selecting partners for) the public customer showcase
+SHOWCASE_FIELDS = {
+    'name', 'city', 'country_id', 'facebook_url', 'linkedin_url', 'twitter_url',
+    'social_notes', 'social_score', 'is_profile_complete', 'social_engagement_level',
+    'last_social_update', 'is_company', 'website_published', 'is_published', 'active',
+}
+
+
+# Version of the cached pages, counts, stats and autocomplete index (see cache_version)
+SHOWCASE_VERSION_SEQUENCE = 'crm_social_showcase_version'
+
+# Social profiles shown on a customer card: (platform, field, label, icon)
+SHOWCASE_CARD_PLATFORMS = [
+    ('facebook', 'facebook_url', 'Facebook', 'fa-facebook'),
+    ('linkedin', 'linkedin_url', 'LinkedIn', 'fa-linkedin'),
+    ('twitter', 'twitter_url', 'Twitter', 'fa-twitter'),
+]
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    showcase_card = fields.Json(
+        string='Showcase Card',
+        compute='_compute_showcase_card',
+        store=True,
+        help='Precomputed payload rendered on the public customer showcase, '
+             'only set for published companies.'
+    )
+
+    @api.depends('is_company', 'website_published', 'name', 'city', 'country_id',
+                 'facebook_url', 'linkedin_url', 'twitter_url', 'social_score',
+                 'is_profile_complete', 'social_engagement_level', 'last_social_update')
+    def _compute_showcase_card(self):
+        for partner in self:
+            if partner.is_company and partner.website_published:
+                partner.showcase_card = partner._prepare_showcase_card()
+            else:
+                partner.showcase_card = False
+
+    def _prepare_showcase_card(self):
+        """Language independent payload: the country and the update date are
+        resolved in the visitor's language by ``_localize_showcase_cards``."""
+        self.ensure_one()
+        return {
+            'id': self.id,
+            'name': self.name,
+            'url': f'/customers/{self.id}',
+            'logo_url': f'/web/image/res.partner/{self.id}/avatar_128',
+            'platforms': [
+                {'platform': platform, 'name': label, 'icon': icon, 'url': self[fname]}
+                for platform, fname, label, icon in SHOWCASE_CARD_PLATFORMS if self[fname]
+            ],
+            'facebook_url': self.facebook_url or False,
+            'linkedin_url': self.linkedin_url or False,
+            'twitter_url': self.twitter_url or False,
+            'social_score': self.social_score,
+            'is_complete': self.is_profile_complete,
+            'city': self.city or False,
+            'country_id': self.country_id.id or False,
+            'engagement_level': self.social_engagement_level or False,
+            'last_update': fields.Datetime.to_string(self.last_social_update) if self.last_social_update else False,
+        }
+
+    @api.model
+    def _localize_showcase_cards(self, cards):
+        """Return the cards with the country name and the update date in the
+        language of the environment, reading the countries in one query."""
+        countries = self.env['res.country'].browse({card['country_id'] for card in cards if card.get('country_id')})
+        country_names = {country.id: country.name for country in countries}
+        return [dict(
+            card,
+            country=country_names.get(card.get('country_id'), False),
+            last_update=tools.format_date(self.env, card['last_update']) if card.get('last_update') else False,
+        ) for card in cards]
+
+    @api.model
+    def _get_showcase_domain(self, filter_complete='all'):
+        domain = [
+            ('is_company', '=', True),
+            ('website_published', '=', True),  # Only show published customers
+        ]
+        if filter_complete == 'complete':
+            domain.append(('is_profile_complete', '=', True))
+        elif filter_complete == 'incomplete':
+            domain.append(('is_profile_complete', '=', False))
+        return domain
+
+    @api.model
+    def _get_showcase_sort_key(self, sort, alias):
+        """Return the keyset expression and direction of a showcase sort.
+
+        NULLs are coalesced so that row comparisons and the ORDER BY agree.
+        Ties are broken by id in the same direction.
+        """
+        if sort == 'social_score':
+            return SQL("COALESCE(%s, 0)", SQL.identifier(alias, 'social_score')), 'DESC'
+        if sort == 'recent':
+            return SQL("COALESCE(%s, '-infinity')", SQL.identifier(alias, 'last_social_update')), 'DESC'
+        return SQL.identifier(alias, 'name'), 'ASC'
+
+    @api.model
+    def _search_showcase_keyset(self, domain, sort='name', after=None, before=None, limit=SHOWCASE_PAGE_SIZE, offset=0):
+        """Seek the page following partner ``after`` (or preceding ``before``).
+
+        The cursor is the id of the last (or first) partner of the adjacent
+        page; its sort key is read in a subquery, so every page costs one
+        range scan of the matching showcase index (see ``init``) whatever
+        its depth.
+        """
+        backward = bool(before) and not after
+        cursor = after or before
+        query = self._search(domain, offset=offset, limit=limit)
+        key, direction = self._get_showcase_sort_key(sort, query.table)
+        if backward:
+            direction = 'DESC' if direction == 'ASC' else 'ASC'
+        id_column = SQL.identifier(query.table, 'id')
+        if cursor:
+            cursor_key, _direction = self._get_showcase_sort_key(sort, 'cursor')
+            query.add_where(SQL(
+                "(%s, %s) %s (SELECT %s, cursor.id FROM %s AS cursor WHERE cursor.id = %s)",
+                key, id_column, SQL('>' if direction == 'ASC' else '<'),
+                cursor_key, SQL.identifier(self._table), cursor,
+            ))
+        query.order = SQL("%s %s, %s %s", key, SQL(direction), id_column, SQL(direction))
+        # Ids and card payloads in a single query
+        partners = self._fetch_query(query, [self._fields['showcase_card']])
+        return partners.browse(reversed(partners.ids)) if backward else partners
+
+    @api.model
+    @tools.ormcache('self._get_showcase_cache_version()', 'filter_complete')
+    def _get_showcase_count(self, filter_complete='all'):
+        # Dropped with the other showcase caches when a published company changes
+        return self.search_count(self._get_showcase_domain(filter_complete))
+
+    @api.model
+    def _get_showcase_values(self, page=1, search='', sort='name', filter_complete='all', after=None, before=None):
+        """Query one showcase page and return the template values.
+
+        Browsing pages with the previous/next links seeks from the adjacent
+        page (keyset pagination); numbered links and searches, ranked by
+        relevance, still use an offset.
+        """
+        domain = self._get_showcase_domain(filter_complete)
+        order = SHOWCASE_SORT_OPTIONS.get(sort, 'name asc')
+        limit = SHOWCASE_PAGE_SIZE
+        offset = (page - 1) * limit
+
+        # Get customers, ranked by relevance when searching (trigram index)
+        if search:
+            total_customers = self._search_social_count(search, domain)
+            query = self._search_social_query(search, domain, order=order, limit=limit, offset=offset)
+            customers = self._fetch_query(query, [self._fields['showcase_card']])
+        else:
+            total_customers = self._get_showcase_count(filter_complete)
+            if after or before:
+                offset = 0
+            customers = self._search_showcase_keyset(domain, sort, after=after, before=before, limit=limit, offset=offset)
+
+        total_pages = max((total_customers + limit - 1) // limit, 1)
+        # A cached count may lag behind: trust a short page over it
+        has_next = page < total_pages and len(customers) == limit
+        url_params = {'search': search, 'sort': sort, 'filter_complete': filter_complete}
+        prev_url = next_url = None
+        if page > 1:
+            prev_params = dict(url_params, page=page - 1)
+            if not search and customers and page > 2:
+                prev_params['before'] = customers[0].id
+            prev_url = '/customers?%s' % urlencode(prev_params)
+        if has_next:
+            next_params = dict(url_params, page=page + 1)
+            if not search:
+                next_params['after'] = customers[-1].id
+            next_url = '/customers?%s' % urlencode(next_params)
+        return {
+            'customers': customers,
+            'cards': self._localize_showcase_cards(
+                [customer.showcase_card for customer in customers if customer.showcase_card]
+            ),
+            'search': search,
+            'sort': sort,
+            'filter_complete': filter_complete,
+            'page': page,
+            'total_pages': total_pages,
+            'total_customers': total_customers,
+            'has_prev': page > 1,
+            'has_next': has_next,
+            'prev_page': page - 1 if page > 1 else None,
+            'next_page': page + 1 if has_next else None,
+            'prev_url': prev_url,
+            'next_url': next_url,
+            'page_range': range(max(1, page - 2), min(total_pages + 1, page + 3)),
+        }
+
+    @api.model
+    @tools.ormcache('self._get_showcase_cache_version()', 'website_id', 'lang', 'page', 'search', 'sort',
+                    'filter_complete', 'after', 'before', cache='templates.cached_values')
+    def _render_showcase_content(self, website_id, lang, page, search, sort, filter_complete, after=None, before=None):
+        """Render the showcase content of one page and its ETag.
+
+        Shared by all anonymous visitors of a website and language. The
+        cache is dropped with the QWeb cached values when a view is edited,
+        and outdated with the statistics and counts when a published company
+        changes (see ``_invalidate_showcase_cache``).
+        """
+        values = self.with_context(lang=lang)._get_showcase_values(
+            page, search, sort, filter_complete, after=after, before=before,
+        )
+        content = self.env['ir.qweb']._render('crm_social_extension.customer_showcase_content', values)
+        etag = hashlib.sha1(f'{website_id}:{lang}:{content}'.encode()).hexdigest()
+        return content, etag
+
+    @api.model
+    def _get_showcase_stats(self):
+        """Return the public showcase counters, cached for a short TTL."""
+        return dict(self._get_showcase_stats_cached(int(time.time() // SHOWCASE_STATS_TTL)))
+
+    @api.model
+    @tools.ormcache('self._get_showcase_cache_version()', 'ttl_bucket')
+    def _get_showcase_stats_cached(self, ttl_bucket):
+        # All counters in a single pass over the published companies
+        counters = [
+            ('complete_profiles', 'is_profile_complete', '=', True),
+            ('high_social_score', 'social_score', '>', 80),
+        ] + [(platform, platform, '!=', False) for platform in SOCIAL_PLATFORM_FIELDS]
+        query = self._search(self._get_showcase_domain())
+        [row] = self.env.execute_query(query.select(SQL('COUNT(*)'), *(
+            SQL('COUNT(*) FILTER (WHERE %s)', self._condition_to_sql(self._table, fname, operator, value, query))
+            for _key, fname, operator, value in counters
+        )))
+        total_customers, *counts = row
+        values = dict(zip([key for key, *_condition in counters], counts))
+        return {
+            'total_customers': total_customers,
+            'complete_profiles': values['complete_profiles'],
+            'completion_rate': round((values['complete_profiles'] / total_customers * 100) if total_customers else 0, 1),
+            'high_social_score': values['high_social_score'],
+            'platform_stats': {platform: values[platform] for platform in SOCIAL_PLATFORM_FIELDS},
+        }
+
+    def _is_on_showcase(self):
+        return any(partner.is_company and partner.website_published for partner in self)
+
+    def init(self):
+        super().init()
+        create_version_sequence(self.env.cr, SHOWCASE_VERSION_SEQUENCE)
+        # One index per showcase sort, matching the keys of
+        # _get_showcase_sort_key, over the published companies only
+        for sort, expression in [
+            ('name', 'name'),
+            ('score', 'COALESCE(social_score, 0)'),
+            ('recent', "COALESCE(last_social_update, '-infinity')"),
+        ]:
+            tools.create_index(
+                self.env.cr, f'res_partner_showcase_{sort}_idx', self._table,
+                [expression, 'id'], where='is_company AND is_published AND active'
+            )
+
+    @api.model
+    def _get_showcase_cache_version(self):
+        return get_cache_version(self.env, SHOWCASE_VERSION_SEQUENCE)
+
+    def _invalidate_showcase_cache(self):
+        bump_cache_version(self.env, SHOWCASE_VERSION_SEQUENCE)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        partners = super().create(vals_list)
+        if partners._is_on_showcase():
+            self._invalidate_showcase_cache()
+        return partners
+
+    def write(self, vals):
+        # Published before or after the write: both change the showcase
+        was_on_showcase = SHOWCASE_FIELDS.intersection(vals) and self._is_on_showcase()
+        res = super().write(vals)
+        if was_on_showcase or (SHOWCASE_FIELDS.intersection(vals) and self._is_on_showcase()):
+            self._invalidate_showcase_cache()
+        return res
+
+    def unlink(self):
+        on_showcase = self._is_on_showcase()
+        res = super().unlink()
+        if on_showcase:
+            self._invalidate_showcase_cache()
+        return res
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models, modules, tools
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+ENGAGEMENT_EVENT_TYPES = [
+    ('page_view', 'Page View'),
+    ('social_click', 'Social Link Click'),
+]
+
+ENGAGEMENT_PLATFORMS = [
+    ('facebook', 'Facebook'),
+    ('linkedin', 'LinkedIn'),
+    ('twitter', 'Twitter'),
+]
+
+# Events accepted per ingestion call
+ENGAGEMENT_MAX_BATCH = 100
+ENGAGEMENT_EVENT_RETENTION = timedelta(days=90)
+
+# Engagement level from the weighted activity of the last days
+ENGAGEMENT_WINDOW_DAYS = 30
+ENGAGEMENT_CLICK_WEIGHT = 3
+ENGAGEMENT_LEVEL_THRESHOLDS = [
+    (100, 'excellent'),
+    (30, 'high'),
+    (5, 'medium'),
+    (0, 'low'),
+]
+
+
+class SocialEngagementEvent(models.Model):
+    _name = 'social.engagement.event'
+    _description = 'Social Engagement Event'
+    _order = 'id desc'
+    _log_access = False
+
+    partner_id = fields.Many2one('res.partner', string='Customer', required=True, ondelete='cascade', readonly=True)
+    event_type = fields.Selection(ENGAGEMENT_EVENT_TYPES, string='Event', required=True, readonly=True)
+    platform = fields.Selection(ENGAGEMENT_PLATFORMS, string='Platform', readonly=True)
+    occurred_at = fields.Datetime(string='Occurred At', required=True, readonly=True)
+    visitor_key = fields.Char(string='Visitor', readonly=True, help='Keyed hash of the client address.')
+    is_rolled_up = fields.Boolean(string='Rolled Up', readonly=True)
+
+    def init(self):
+        # The rollup scans the pending events, the throttling those of a visitor
+        tools.create_index(
+            self.env.cr, 'social_engagement_event_pending_idx', self._table, ['id'], where='NOT is_rolled_up'
+        )
+        tools.create_index(
+            self.env.cr, 'social_engagement_event_visitor_idx', self._table,
+            ['visitor_key', 'partner_id', 'occurred_at'], where='visitor_key IS NOT NULL'
+        )
+
+    def write(self, vals):
+        raise UserError("Engagement events are append-only.")
+
+    @api.model
+    def _ingest(self, events, visitor_key=None):
+        """Append a batch of engagement events with a single INSERT.
+
+        ``events`` are dicts with ``partner_id``, ``type`` and optionally
+        ``platform``. Events for unknown types or for partners that are not
+        published companies are dropped. Never writes to ``res_partner``.
+        With a ``visitor_key``, a visitor counts at most once per customer,
+        event type and platform a day, so public calls cannot inflate a
+        customer's engagement. Returns the number of events stored.
+        """
+        event_types = dict(ENGAGEMENT_EVENT_TYPES)
+        platforms = dict(ENGAGEMENT_PLATFORMS)
+        candidates = []
+        for event in (events or [])[:ENGAGEMENT_MAX_BATCH]:
+            if not isinstance(event, dict) or event.get('type') not in event_types:
+                continue
+            try:
+                partner_id = int(event.get('partner_id'))
+            except (TypeError, ValueError):
+                continue
+            platform = event.get('platform')
+            candidates.append((partner_id, event['type'], platform if platform in platforms else None))
+        if visitor_key:
+            candidates = list(dict.fromkeys(candidates))
+        if not candidates:
+            return 0
+
+        published_ids = set(self.env['res.partner'].sudo().search([
+            ('id', 'in', list({partner_id for partner_id, *_rest in candidates})),
+            ('is_company', '=', True),
+            ('website_published', '=', True),
+        ]).ids)
+        rows = [SQL("(%s, %s, %s)", partner_id, event_type, platform)
+                for partner_id, event_type, platform in candidates if partner_id in published_ids]
+        if not rows:
+            return 0
+        now = fields.Datetime.now()
+        already_seen = SQL("TRUE")
+        if visitor_key:
+            already_seen = SQL("""NOT EXISTS (
+                SELECT 1 FROM social_engagement_event seen
+                 WHERE seen.visitor_key = %(visitor_key)s
+                   AND seen.partner_id = event.partner_id
+                   AND seen.event_type = event.event_type
+                   AND seen.platform IS NOT DISTINCT FROM event.platform
+                   AND seen.occurred_at >= %(day_start)s
+            )""", visitor_key=visitor_key, day_start=now.replace(hour=0, minute=0, second=0, microsecond=0))
+        self.env.cr.execute(SQL("""
+            INSERT INTO social_engagement_event (partner_id, event_type, platform, visitor_key, occurred_at, is_rolled_up)
+            SELECT event.partner_id, event.event_type, event.platform, %(visitor_key)s, %(now)s, FALSE
+              FROM (VALUES %(rows)s) AS event(partner_id, event_type, platform)
+             WHERE %(already_seen)s
+        """, rows=SQL(", ").join(rows), visitor_key=visitor_key, now=now, already_seen=already_seen))
+        return self.env.cr.rowcount
+
+    @api.autovacuum
+    def _gc_old_events(self):
+        # Old events are only kept through their daily rollups
+        self.env.cr.execute("""
+            DELETE FROM social_engagement_event
+             WHERE occurred_at < %s AND is_rolled_up
+        """, [fields.Datetime.now() - ENGAGEMENT_EVENT_RETENTION])
+
+
+class SocialEngagementDaily(models.Model):
+    _name = 'social.engagement.daily'
+    _description = 'Daily Social Engagement'
+    _order = 'day desc, partner_id'
+    _log_access = False
+
+    partner_id = fields.Many2one('res.partner', string='Customer', required=True, ondelete='cascade', readonly=True)
+    day = fields.Date(string='Day', required=True, readonly=True)
+    page_views = fields.Integer(string='Page Views', readonly=True)
+    social_clicks = fields.Integer(string='Social Clicks', readonly=True)
+
+    _sql_constraints = [
+        ('partner_day_unique', 'unique(partner_id, day)', 'Only one engagement rollup per customer and day.'),
+    ]
+
+    @api.model
+    def _cron_rollup_engagement(self):
+        """Fold the events not rolled up yet into the daily rollups, then
+        refresh the engagement level of the customers it may change.
+
+        Events are flagged as they are folded, in the same statement: an
+        event committed late, whatever its id, is folded by the next run.
+        """
+        self.env.cr.execute("""
+            WITH batch AS (
+                UPDATE social_engagement_event
+                   SET is_rolled_up = TRUE
+                 WHERE NOT is_rolled_up
+             RETURNING partner_id, occurred_at, event_type
+            )
+            INSERT INTO social_engagement_daily (partner_id, day, page_views, social_clicks)
+            SELECT partner_id, occurred_at::date,
+                   COUNT(*) FILTER (WHERE event_type = 'page_view'),
+                   COUNT(*) FILTER (WHERE event_type = 'social_click')
+              FROM batch
+             GROUP BY partner_id, occurred_at::date
+            ON CONFLICT (partner_id, day) DO UPDATE
+               SET page_views = social_engagement_daily.page_views + EXCLUDED.page_views,
+                   social_clicks = social_engagement_daily.social_clicks + EXCLUDED.social_clicks
+            RETURNING partner_id
+        """)
+        partner_ids = {row[0] for row in self.env.cr.fetchall()}
+        self.invalidate_model()
+        self.env['social.engagement.event'].invalidate_model(['is_rolled_up'])
+
+        # Levels also decay as the activity leaves the window
+        date_from = fields.Date.context_today(self) - timedelta(days=ENGAGEMENT_WINDOW_DAYS)
+        self.env.cr.execute("SELECT DISTINCT partner_id FROM social_engagement_daily WHERE day >= %s", [date_from])
+        partner_ids.update(row[0] for row in self.env.cr.fetchall())
+        Partner = self.env['res.partner'].with_context(active_test=False)
+        partners = Partner.browse(partner_ids) | Partner.search([
+            ('social_engagement_level', 'in', [level for threshold, level in ENGAGEMENT_LEVEL_THRESHOLDS if threshold]),
+        ])
+        partners._update_engagement_levels()
+        _logger.info("Engagement rollup: %s customers refreshed", len(partners))
+        if not modules.module.current_test:
+            self.env.cr.commit()
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    def _get_engagement_activity(self):
+        """Weighted engagement of the last days per partner, from the rollups."""
+        if not self:
+            return {}
+        date_from = fields.Date.context_today(self) - timedelta(days=ENGAGEMENT_WINDOW_DAYS)
+        self.env.cr.execute("""
+            SELECT partner_id, SUM(page_views + %s * social_clicks)
+              FROM social_engagement_daily
+             WHERE partner_id IN %s AND day >= %s
+             GROUP BY partner_id
+        """, [ENGAGEMENT_CLICK_WEIGHT, tuple(self.ids), date_from])
+        return dict(self.env.cr.fetchall())
+
+    def _update_engagement_levels(self):
+        """Derive the engagement level, and so the social score, from the
+        measured activity. One write per level for the whole batch."""
+        activity = self._get_engagement_activity()
+        partners_by_level = {}
+        for partner in self:
+            points = activity.get(partner.id, 0)
+            level = next(level for threshold, level in ENGAGEMENT_LEVEL_THRESHOLDS if points >= threshold)
+            if partner.social_engagement_level != level:
+                partners_by_level.setdefault(level, self.browse())
+                partners_by_level[level] |= partner
+        for level, partners in partners_by_level.items():
+            partners.write({'social_engagement_level': level})
+        changed = self.browse().union(*partners_by_level.values())
+        self._recompute_social_scores(changed.ids)
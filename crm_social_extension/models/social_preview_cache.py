@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+import html
+import logging
+import re
+from datetime import timedelta
+from urllib.parse import urlparse
+
+import requests
+from psycopg2.extras import Json
+
+from odoo import api, fields, models, modules
+
+from .res_partner_autocomplete import social_handle
+
+_logger = logging.getLogger(__name__)
+
+PREVIEW_TTL = timedelta(days=7)
+# Unreachable or invalid profiles are retried sooner than valid ones
+PREVIEW_NEGATIVE_TTL = timedelta(hours=12)
+PREVIEW_FETCH_TIMEOUT = 5
+PREVIEW_MAX_BYTES = 256 * 1024
+# Profiles fetched per cron run
+PREVIEW_FILL_BATCH_SIZE = 50
+
+SOCIAL_PREVIEW_PLATFORMS = {
+    'facebook.com': {'platform': 'facebook', 'name': 'Facebook', 'icon': 'fa-facebook', 'color': '#1877f2'},
+    'fb.com': {'platform': 'facebook', 'name': 'Facebook', 'icon': 'fa-facebook', 'color': '#1877f2'},
+    'linkedin.com': {'platform': 'linkedin', 'name': 'LinkedIn', 'icon': 'fa-linkedin', 'color': '#0077b5'},
+    'twitter.com': {'platform': 'twitter', 'name': 'Twitter', 'icon': 'fa-twitter', 'color': '#1da1f2'},
+    'x.com': {'platform': 'twitter', 'name': 'Twitter', 'icon': 'fa-twitter', 'color': '#1da1f2'},
+}
+
+OPEN_GRAPH_RE = re.compile(
+    r'<meta[^>]+property=["\']og:(title|description|image)["\'][^>]+content=["\']([^"\']*)["\']',
+    re.IGNORECASE,
+)
+
+
+def normalize_social_url(url):
+    """Cache key of a profile URL: https, lowercase host without ``www.``,
+    no query, fragment or trailing slash. Returns '' for non social URLs."""
+    parsed = urlparse((url or '').strip())
+    host = (parsed.hostname or '').lower().removeprefix('www.')
+    path = parsed.path.rstrip('/')
+    if parsed.scheme not in ('http', 'https') or host not in SOCIAL_PREVIEW_PLATFORMS or not path:
+        return ''
+    return f'https://{host}{path}'
+
+
+class SocialPreviewCache(models.Model):
+    _name = 'social.preview.cache'
+    _description = 'Social Profile Preview Cache'
+    _log_access = False
+
+    url_key = fields.Char(string='Normalized URL', required=True)
+    payload = fields.Json(string='Preview')
+    is_negative = fields.Boolean(string='No Preview', help='The profile could not be previewed.')
+    expires_at = fields.Datetime(string='Expires At', required=True, index=True)
+    is_pending = fields.Boolean(string='Pending', help='Queued to be fetched by the preview cron.')
+
+    _sql_constraints = [
+        ('url_key_unique', 'unique(url_key)', 'A URL can only be cached once.'),
+    ]
+
+    @api.model
+    def _get_preview(self, url):
+        """Return the cached preview of a profile URL, without fetching it.
+
+        Missing and expired entries are queued for ``_cron_fill_previews``;
+        meanwhile an expired preview is still served and a missing one is
+        False, so the RPC never waits on the social network.
+        """
+        url_key = normalize_social_url(url)
+        if not url_key:
+            return False
+        self.env.cr.execute(
+            "SELECT payload, is_negative, expires_at > NOW() AT TIME ZONE 'UTC' FROM social_preview_cache WHERE url_key = %s",
+            [url_key],
+        )
+        row = self.env.cr.fetchone()
+        if not row or not row[2]:
+            self._queue_preview(url_key)
+        if not row:
+            return False
+        payload, is_negative, _fresh = row
+        return False if is_negative else payload or False
+
+    @api.model
+    def _queue_preview(self, url_key):
+        # Already queued URLs are left alone, so the cron is woken up once
+        self.env.cr.execute("""
+            INSERT INTO social_preview_cache (url_key, is_negative, is_pending, expires_at)
+            VALUES (%s, FALSE, TRUE, NOW() AT TIME ZONE 'UTC')
+            ON CONFLICT (url_key) DO UPDATE
+               SET is_pending = TRUE
+             WHERE NOT social_preview_cache.is_pending
+         RETURNING id
+        """, [url_key])
+        if self.env.cr.rowcount:
+            self.env.ref('crm_social_extension.cron_fill_social_previews')._trigger()
+
+    @api.model
+    def _store_preview(self, url_key, payload):
+        ttl = PREVIEW_TTL if payload else PREVIEW_NEGATIVE_TTL
+        # Concurrent workers may compute the same URL: the last one wins
+        self.env.cr.execute("""
+            INSERT INTO social_preview_cache (url_key, payload, is_negative, is_pending, expires_at)
+            VALUES (%s, %s, %s, FALSE, %s)
+            ON CONFLICT (url_key) DO UPDATE
+               SET payload = EXCLUDED.payload,
+                   is_negative = EXCLUDED.is_negative,
+                   is_pending = FALSE,
+                   expires_at = EXCLUDED.expires_at
+        """, [url_key, Json(payload) if payload else None, not payload, fields.Datetime.now() + ttl])
+
+    @api.model
+    def _cron_fill_previews(self, limit=PREVIEW_FILL_BATCH_SIZE):
+        """Fetch the queued previews, oldest first, committing after each one."""
+        self.env.cr.execute(
+            "SELECT url_key FROM social_preview_cache WHERE is_pending ORDER BY expires_at, id LIMIT %s",
+            [limit],
+        )
+        url_keys = [row[0] for row in self.env.cr.fetchall()]
+        for url_key in url_keys:
+            self._store_preview(url_key, self._compute_preview(url_key))
+            if not modules.module.current_test:
+                self.env.cr.commit()
+        if len(url_keys) == limit:
+            self.env.ref('crm_social_extension.cron_fill_social_previews')._trigger()
+        _logger.info("Social previews fetched: %s", len(url_keys))
+
+    @api.model
+    def _compute_preview(self, url_key):
+        """Build the preview of a profile and enrich it with its Open Graph tags."""
+        host = urlparse(url_key).hostname
+        payload = dict(SOCIAL_PREVIEW_PLATFORMS[host], url=url_key, handle=social_handle(url_key))
+        try:
+            with requests.get(url_key, timeout=PREVIEW_FETCH_TIMEOUT, stream=True,
+                              headers={'User-Agent': 'Mozilla/5.0 (compatible; OdooSocialPreview)'}) as response:
+                if response.status_code == 404:
+                    return False
+                response.raise_for_status()
+                content = next(response.iter_content(PREVIEW_MAX_BYTES), b'')
+                content = content.decode(response.encoding or 'utf-8', 'replace')
+        except requests.RequestException as error:
+            # Social networks often refuse crawlers: keep the offline preview
+            _logger.debug("Social preview fetch failed for %s: %s", url_key, error)
+            return payload
+        for tag, value in OPEN_GRAPH_RE.findall(content):
+            payload.setdefault(tag.lower(), html.unescape(value))
+        return payload
+
+    @api.autovacuum
+    def _gc_expired_previews(self):
+        self.env.cr.execute(
+            "DELETE FROM social_preview_cache WHERE expires_at < NOW() AT TIME ZONE 'UTC' AND NOT is_pending"
+        )
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    @api.model
+    def get_social_preview(self, url):
+        """Preview data of a social profile URL for the social URL widget."""
+        return self.env['social.preview.cache'].sudo()._get_preview(url)
@@ -3,6 +3,43 @@
 (function() {
     'use strict';
 
+    // Normalize like the server index: no accents, lowercase, single spaces
+    function normalizeTerm(term) {
+        return term.normalize('NFKD').replace(/[\u0300-\u036f]/g, '')
+            .replace(/\s+/g, ' ').trim().toLowerCase();
+    }
+
+    // Least recently used cache of search term -> results
+    class SearchResultCache {
+        constructor(maxSize = 50) {
+            this.maxSize = maxSize;
+            this.entries = new Map();
+        }
+
+        get(term) {
+            if (!this.entries.has(term)) {
+                return undefined;
+            }
+            const results = this.entries.get(term);
+            // Refresh recency
+            this.entries.delete(term);
+            this.entries.set(term, results);
+            return results;
+        }
+
+        set(term, results) {
+            this.entries.delete(term);
+            this.entries.set(term, results);
+            if (this.entries.size > this.maxSize) {
+                this.entries.delete(this.entries.keys().next().value);
+            }
+        }
+
+        clear() {
+            this.entries.clear();
+        }
+    }
+
     // Customer Search Functionality
     class CustomerSearch {
         constructor() {
@@ -10,6 +47,10 @@
             this.suggestionsContainer = document.getElementById('search-suggestions');
             this.searchTimeout = null;
             this.minSearchLength = 2;
+            this.resultLimit = 10;  // Results returned by the server per term
+            this.cache = new SearchResultCache(50);
+            this.abortController = null;
+            this.lastTerm = null;
             
             this.init();
         }
@@ -31,7 +72,7 @@
         }
 
         handleSearchInput(event) {
-            const searchTerm = event.target.value.trim();
+            const searchTerm = normalizeTerm(event.target.value);
             
             // Clear previous timeout
             if (this.searchTimeout) {
@@ -39,10 +80,26 @@
             }
 
             if (searchTerm.length < this.minSearchLength) {
+                this.cancelPendingSearch();
+                this.lastTerm = null;
                 this.hideSuggestions();
                 return;
             }
 
+            // Same normalized term (extra space, accent, case): nothing to do
+            if (searchTerm === this.lastTerm) {
+                return;
+            }
+
+            // Answer from the cache right away, without waiting for the debounce
+            const cached = this.getCachedResults(searchTerm);
+            if (cached) {
+                this.cancelPendingSearch();
+                this.lastTerm = searchTerm;
+                this.displaySuggestions(cached);
+                return;
+            }
+
             // Debounce search requests
             this.searchTimeout = setTimeout(() => {
                 this.performSearch(searchTerm);
@@ -50,7 +107,7 @@
         }
 
         handleSearchFocus(event) {
-            const searchTerm = event.target.value.trim();
+            const searchTerm = normalizeTerm(event.target.value);
             if (searchTerm.length >= this.minSearchLength) {
                 this.performSearch(searchTerm);
             }
@@ -117,7 +174,57 @@
             suggestions[nextIndex].scrollIntoView({ block: 'nearest' });
         }
 
+        /**
+         * Results for a term from the cache, either stored for the term itself
+         * or narrowed from a shorter prefix whose result list was complete:
+         * every match of "acmex" is also a match of "acme".
+         */
+        getCachedResults(searchTerm) {
+            const cached = this.cache.get(searchTerm);
+            if (cached) {
+                return cached;
+            }
+            for (let length = searchTerm.length - 1; length >= this.minSearchLength; length--) {
+                const prefix = searchTerm.slice(0, length);
+                const prefixResults = this.cache.get(prefix);
+                if (prefixResults && prefixResults.length < this.resultLimit) {
+                    const results = prefixResults.filter(result => this.matchesTerm(result, searchTerm));
+                    this.cache.set(searchTerm, results);
+                    return results;
+                }
+            }
+            return undefined;
+        }
+
+        matchesTerm(result, searchTerm) {
+            // Same rule as the server index: each word prefixes a search token
+            const tokens = result.search_tokens || [normalizeTerm(result.name)];
+            return searchTerm.split(' ').every(
+                word => tokens.some(token => token.startsWith(word) || token.split(' ').some(part => part.startsWith(word)))
+            );
+        }
+
+        cancelPendingSearch() {
+            if (this.abortController) {
+                this.abortController.abort();
+                this.abortController = null;
+            }
+        }
+
         async performSearch(searchTerm) {
+            const cached = this.getCachedResults(searchTerm);
+            if (cached) {
+                this.lastTerm = searchTerm;
+                this.displaySuggestions(cached);
+                return;
+            }
+
+            // Only the latest term matters: cancel the request still in flight
+            this.cancelPendingSearch();
+            const abortController = new AbortController();
+            this.abortController = abortController;
+            this.lastTerm = searchTerm;
+
             try {
                 this.showLoadingState();
                 
@@ -131,16 +238,31 @@
                         jsonrpc: '2.0',
                         method: 'call',
                         params: { term: searchTerm }
-                    })
+                    }),
+                    signal: abortController.signal
                 });
 
                 const data = await response.json();
+                if (data.error) {
+                    // Never cache a failure: it would narrow every longer term to nothing
+                    throw new Error(data.error.message || 'Search failed');
+                }
                 const results = data.result || [];
                 
+                this.cache.set(searchTerm, results);
                 this.displaySuggestions(results);
             } catch (error) {
+                if (error.name === 'AbortError') {
+                    return;
+                }
                 console.error('Search error:', error);
+                // Let the same term be searched again
+                this.lastTerm = null;
                 this.hideSuggestions();
+            } finally {
+                if (this.abortController === abortController) {
+                    this.abortController = null;
+                }
             }
         }
 
@@ -261,9 +383,70 @@
         }
     }
 
+    // Engagement events, sent to the server in batches
+    class EngagementTracker {
+        constructor() {
+            this.endpoint = '/customers/api/engagement';
+            this.queue = [];
+            this.maxBatchSize = 20;
+            this.flushDelay = 5000;
+            this.flushTimeout = null;
+
+            // Last chance to send pending events when the visitor leaves
+            window.addEventListener('pagehide', () => this.flush(true));
+            document.addEventListener('visibilitychange', () => {
+                if (document.visibilityState === 'hidden') {
+                    this.flush(true);
+                }
+            });
+        }
+
+        track(partnerId, type, platform = null) {
+            if (!partnerId) {
+                return;
+            }
+            this.queue.push({ partner_id: partnerId, type: type, platform: platform });
+            if (this.queue.length >= this.maxBatchSize) {
+                this.flush();
+            } else if (!this.flushTimeout) {
+                this.flushTimeout = setTimeout(() => this.flush(), this.flushDelay);
+            }
+        }
+
+        flush(unloading = false) {
+            if (this.flushTimeout) {
+                clearTimeout(this.flushTimeout);
+                this.flushTimeout = null;
+            }
+            if (this.queue.length === 0) {
+                return;
+            }
+            const events = this.queue.splice(0, this.queue.length);
+            const body = JSON.stringify({
+                jsonrpc: '2.0',
+                method: 'call',
+                params: { events: events }
+            });
+            if (unloading && navigator.sendBeacon) {
+                navigator.sendBeacon(this.endpoint, new Blob([body], { type: 'application/json' }));
+                return;
+            }
+            fetch(this.endpoint, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-Requested-With': 'XMLHttpRequest'
+                },
+                body: body,
+                keepalive: true
+            }).catch(error => console.debug('Engagement tracking failed:', error));
+        }
+    }
+
     // Card Animations and Interactions
     class CardInteractions {
-        constructor() {
+        constructor(engagementTracker) {
+            this.engagementTracker = engagementTracker;
             this.init();
         }
 
@@ -295,7 +478,7 @@
         }
 
         initSocialLinkTracking() {
-            const socialLinks = document.querySelectorAll('.social-links a, .social-icon a');
+            const socialLinks = document.querySelectorAll('.social-links a, .social-icon a, [data-partner-id] a[target="_blank"]');
             
             socialLinks.forEach(link => {
                 link.addEventListener('click', this.trackSocialClick.bind(this));
@@ -306,8 +489,13 @@
             const link = event.currentTarget;
             const platform = this.getSocialPlatform(link.href);
             
-            // Track social media clicks (can be extended with analytics)
-            console.log(`Social link clicked: ${platform}`);
+            // Track social media clicks
+            const container = link.closest('[data-partner-id]');
+            if (container && platform !== 'Unknown') {
+                this.engagementTracker.track(
+                    parseInt(container.dataset.partnerId, 10), 'social_click', platform.toLowerCase()
+                );
+            }
             
             // Add visual feedback
             link.style.transform = 'scale(0.95)';
@@ -437,7 +625,7 @@
             // Initialize all components
             new CustomerSearch();
             new CustomerStats();
-            new CardInteractions();
+            new CardInteractions(new EngagementTracker());
             new FilterSort();
 
             // Add smooth scrolling to anchor links
@@ -8,6 +8,16 @@ import { Component, useState, onMounted, onWillUnmount } from "@odoo/owl";
 import { useService } from "@web/core/utils/hooks";
 import { _t } from "@web/core/l10n/translation";
 
+// Previews already requested in this browser tab, by URL. The promise is
+// stored so that concurrent edits of the same URL share one request.
+const previewCache = new Map();
+const PREVIEW_CACHE_SIZE = 100;
+
+function normalizePreviewUrl(url) {
+    return url.trim().toLowerCase().replace(/^http:/, "https:").replace("://www.", "://")
+        .replace(/[?#].*$/, "").replace(/\/+$/, "");
+}
+
 /**
  * Social URL Field
  */
@@ -84,18 +94,32 @@ class SocialUrlField extends CharField {
     }
 
     async fetchPreviewData(url) {
+        const key = normalizePreviewUrl(url);
         try {
-            const payload = {
-                model: "res.partner",
-                method: "get_social_preview",
-                args: [url],
-                kwargs: {},
-            };
-            const response = await this.rpc("/web/dataset/call_kw", payload);
+            let request = previewCache.get(key);
+            if (!request) {
+                const payload = {
+                    model: "res.partner",
+                    method: "get_social_preview",
+                    args: [url],
+                    kwargs: {},
+                };
+                request = this.rpc("/web/dataset/call_kw", payload);
+                previewCache.set(key, request);
+                if (previewCache.size > PREVIEW_CACHE_SIZE) {
+                    previewCache.delete(previewCache.keys().next().value);
+                }
+            }
+            const response = await request;
             if (response) {
                 this.state.previewData = response;
+            } else {
+                // The server fetches missing previews in the background: ask again next time
+                previewCache.delete(key);
             }
         } catch (error) {
+            // Allow a later retry instead of memoizing the failure
+            previewCache.delete(key);
             // Silenciar: es sólo un “nice to have”
             console.debug("Preview fetch failed:", error);
         }
@@ -12,13 +12,9 @@ CRM Social Extension including:
 - Performance and load testing
 
 Test Structure:
-- test_res_partner.py: Tests for the extended partner model
-- test_website_controller.py: Tests for website functionality
-- test_social_scoring.py: Tests for the lead scoring system
-- test_marketing_automation.py: Tests for automated features
-- test_security.py: Security and permission tests
+- test_res_partner.py: Tests for the extended partner model, the website
+  controllers, the lead scoring and the automated features
 - test_performance.py: Performance and load tests
-- test_integration.py: Integration tests with other modules
 
 Usage:
     Run all tests:
@@ -35,9 +31,4 @@ Usage:
 """
 
 from . import test_res_partner
-from . import test_website_controller
-from . import test_social_scoring
-from . import test_marketing_automation
-from . import test_security
 from . import test_performance
-from . import test_integration
\ No newline at end of file
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from urllib.parse import urlencode
+
+from odoo.models import PREFETCH_MAX
+from odoo.tests import tagged
+from odoo.tests.common import HttpCase
+
+from odoo.addons.crm_social_extension.controllers.website_controller import SITEMAP_BATCH_SIZE, sitemap_customers
+from odoo.addons.crm_social_extension.models.res_partner_scoring import SOCIAL_SCORE_CHUNK_SIZE
+from odoo.addons.crm_social_extension.models.res_partner_showcase import SHOWCASE_PAGE_SIZE
+
+_logger = logging.getLogger(__name__)
+
+NAME_WORDS = ['Acme', 'Globex', 'Initech', 'Umbrella', 'Stark', 'Wayne', 'Hooli', 'Vandelay']
+ENGAGEMENT_LEVELS = [False, 'low', 'medium', 'high', 'excellent']
+
+
+@tagged('post_install', '-at_install', '-standard', 'social_performance')
+class TestSocialPerformance(HttpCase):
+    """Query counts and timings of the public showcase at volume.
+
+    Not part of the standard run. Run with:
+        odoo-bin -d <db> -i crm_social_extension --test-tags social_performance
+    The volume is set with CRM_SOCIAL_PERFORMANCE_PARTNERS (50000 by default).
+    Query counts must not depend on the volume nor on the page size, so an
+    N+1 regression fails whatever the volume; timings are loose guards.
+    The public routes are measured end to end, so the budgets of a request
+    are relative to what the same route costs for a single card or when
+    served from its cache.
+    """
+
+    PARTNERS = 50000
+    CREATE_BATCH_SIZE = 5000
+
+    # Maximum seconds per measurement
+    TIME_BUDGETS = {
+        'http.showcase': 1.0,
+        'http.showcase.cached': 0.2,
+        'http.autocomplete.index': 20.0,
+        'http.autocomplete': 0.2,
+        'http.stats': 1.0,
+        'http.stats.cached': 0.2,
+        'sitemap': 20.0,
+        'score.recompute': 60.0,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        count = int(os.environ.get('CRM_SOCIAL_PERFORMANCE_PARTNERS', cls.PARTNERS))
+        started = time.perf_counter()
+        Partner = cls.env['res.partner'].with_context(tracking_disable=True)
+        for start in range(0, count, cls.CREATE_BATCH_SIZE):
+            Partner.create([{
+                'name': f'{NAME_WORDS[index % len(NAME_WORDS)]} Customer {index:05d}',
+                'is_company': True,
+                'website_published': index % 5 != 0,
+                'city': 'Havana' if index % 2 else 'Madrid',
+                'facebook_url': f'https://facebook.com/perf{index}' if index % 2 else False,
+                'linkedin_url': f'https://linkedin.com/company/perf{index}' if index % 3 else False,
+                'twitter_url': f'https://twitter.com/perf{index}' if index % 4 else False,
+                'social_engagement_level': ENGAGEMENT_LEVELS[index % len(ENGAGEMENT_LEVELS)],
+            } for index in range(start, min(start + cls.CREATE_BATCH_SIZE, count))])
+            cls.env.flush_all()
+            cls.env.invalidate_all()
+        cls.partner_count = count
+        cls.results = []
+        _logger.info("Performance data generated in %.2fs: %s partners", time.perf_counter() - started, count)
+
+    @classmethod
+    def tearDownClass(cls):
+        lines = [f"{'Measurement':<30} {'Queries':>10} {'Time (ms)':>12}"]
+        lines += [f"{name:<30} {queries:>10} {elapsed * 1000:>12.1f}" for name, queries, elapsed in cls.results]
+        _logger.info("Social performance results:\n%s", "\n".join(lines))
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.Partner = self.env['res.partner']
+        self.env.registry.clear_cache()
+        self.env.flush_all()
+        self.env.invalidate_all()
+
+    @contextmanager
+    def _measure(self, name, max_queries, repeat=1):
+        """Check the queries and the (average) time of a block, pending writes included."""
+        queries_before = self.env.cr.sql_log_count
+        started = time.perf_counter()
+        yield
+        self.env.flush_all()
+        elapsed = (time.perf_counter() - started) / repeat
+        queries = self.env.cr.sql_log_count - queries_before
+        self.results.append((name, queries, elapsed))
+        self.assertLessEqual(queries, max_queries, f"{name}: {queries} queries, budget {max_queries}")
+        self.assertLess(elapsed, self.TIME_BUDGETS[name], f"{name}: {elapsed:.3f}s")
+
+    def _count_queries(self, func):
+        queries_before = self.env.cr.sql_log_count
+        result = func()
+        return result, self.env.cr.sql_log_count - queries_before
+
+    def _open_showcase(self, url):
+        response = self.url_open(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_showcase_listing(self):
+        # Warm up the route (views, website, translations) with another filter
+        self._open_showcase('/customers?filter_complete=complete')
+
+        # A full page costs no more queries than a single card
+        name = self.Partner.search(self.Partner._get_showcase_domain(), order='id', limit=1).name
+        single, single_queries = self._count_queries(
+            lambda: self._open_showcase('/customers?%s' % urlencode({'search': name}))
+        )
+        with self._measure('http.showcase', single_queries):
+            response = self._open_showcase('/customers')
+        self.assertEqual(response.content.count(b'customer-card'), SHOWCASE_PAGE_SIZE)
+        self.assertLess(single.content.count(b'customer-card'), SHOWCASE_PAGE_SIZE)
+        page_queries = self.results[-1][1]
+
+        # Anonymous visitors are served the cached page: no count nor rows
+        with self._measure('http.showcase.cached', page_queries - 2):
+            self._open_showcase('/customers')
+
+        # Following pages seek from the cursor, whatever their depth
+        domain = self.Partner._get_showcase_domain()
+        cursor = self.Partner.search(domain, order='name desc, id desc', offset=SHOWCASE_PAGE_SIZE, limit=1)
+        page = self.Partner.search_count(domain) // SHOWCASE_PAGE_SIZE
+        with self._measure('http.showcase', page_queries):
+            response = self._open_showcase(f'/customers?page={page}&after={cursor.id}')
+        self.assertEqual(response.content.count(b'customer-card'), SHOWCASE_PAGE_SIZE)
+
+    def _json_route_queries(self):
+        """Queries of a warm public JSON request that does no work."""
+        route = '/customers/search/autocomplete'
+        self.make_jsonrpc_request(route, {'term': 'a'})
+        _result, queries = self._count_queries(lambda: self.make_jsonrpc_request(route, {'term': 'a'}))
+        return queries
+
+    def test_autocomplete(self):
+        route = '/customers/search/autocomplete'
+        overhead = self._json_route_queries()
+        # The first lookup of the worker reads the cache version and builds
+        # the index in one query; the following ones stay in memory
+        with self._measure('http.autocomplete.index', overhead + 2):
+            self.make_jsonrpc_request(route, {'term': 'acme'})
+        terms = ['ac', 'acme', 'globex cust', 'perf1', 'stark customer 0']
+        with self._measure('http.autocomplete', (overhead + 1) * len(terms), repeat=len(terms)):
+            results = [self.make_jsonrpc_request(route, {'term': term}) for term in terms]
+        self.assertTrue(all(results))
+
+    def test_showcase_stats(self):
+        route = '/customers/api/stats'
+        overhead = self._json_route_queries()
+        # All counters in one query, skipped once cached
+        with self._measure('http.stats', overhead + 2):
+            stats = self.make_jsonrpc_request(route, {})
+        self.assertEqual(stats['total_customers'], self.Partner.search_count(self.Partner._get_showcase_domain()))
+        with self._measure('http.stats.cached', overhead + 1):
+            self.make_jsonrpc_request(route, {})
+
+    def test_sitemap(self):
+        published = self.Partner.search_count(self.Partner._get_showcase_domain())
+        batches = published // SITEMAP_BATCH_SIZE + 1
+        with self._measure('sitemap', batches):
+            entries = list(sitemap_customers(self.env, None, ''))
+        self.assertEqual(len(entries), published)
+
+    def test_bulk_score_recompute(self):
+        self.env.cr.execute("UPDATE res_partner SET social_score = 0")
+        self.env.cr.execute("SELECT COUNT(*) FROM res_partner")
+        chunks = -(-self.env.cr.fetchone()[0] // SOCIAL_SCORE_CHUNK_SIZE)
+        self.env.invalidate_all()
+        # Weights, id listing, one UPDATE per chunk and the lead propagation
+        # per chunk, then the stored cards recomputed on flush: their inputs
+        # read and written once per prefetch batch
+        card_batches = -(-self.partner_count // PREFETCH_MAX)
+        with self._measure('score.recompute', 2 * chunks + 10 + 4 * card_batches):
+            changed = self.Partner._recompute_social_scores()
+        self.assertGreaterEqual(len(changed), self.partner_count * 4 // 5)
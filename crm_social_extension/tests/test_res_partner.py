@@ -1,10 +1,13 @@
 # -*- coding: utf-8 -*-
 
+from odoo import fields
 from odoo.tests.common import TransactionCase, HttpCase
 from odoo.exceptions import ValidationError
 from unittest.mock import patch
 import logging
 
+from odoo.addons.crm_social_extension.models.crm_lead import LEAD_SCORE_WATERMARK_PARAM
+
 _logger = logging.getLogger(__name__)
 
 
@@ -221,6 +224,37 @@ class TestResPartnerSocial(TransactionCase):
         
         self.assertGreater(final_activities, initial_activities)
 
+    def test_social_preview_cache(self):
+        """Test social previews are fetched by the cron once per normalized URL, failures included."""
+        Cache = self.env['social.preview.cache']
+        preview = {'platform': 'facebook', 'url': 'https://facebook.com/test'}
+        with patch.object(type(Cache), '_compute_preview', return_value=preview) as compute:
+            # Misses are queued, not fetched during the request
+            self.assertFalse(self.Partner.get_social_preview('https://www.facebook.com/test/'))
+            self.assertFalse(self.Partner.get_social_preview('http://facebook.com/test?ref=share'))
+            compute.assert_not_called()
+            Cache._cron_fill_previews()
+            self.assertEqual(compute.call_count, 1)
+            self.assertEqual(self.Partner.get_social_preview('https://www.facebook.com/test/'), preview)
+            self.assertEqual(self.Partner.get_social_preview('http://facebook.com/test?ref=share'), preview)
+
+            # Expired previews are served while they are refreshed
+            self.env.cr.execute("UPDATE social_preview_cache SET expires_at = NOW() AT TIME ZONE 'UTC' - INTERVAL '1 day'")
+            self.assertEqual(self.Partner.get_social_preview('https://facebook.com/test'), preview)
+            Cache._cron_fill_previews()
+            self.assertEqual(compute.call_count, 2)
+
+        with patch.object(type(Cache), '_compute_preview', return_value=False) as compute:
+            self.assertFalse(self.Partner.get_social_preview('https://twitter.com/missing'))
+            Cache._cron_fill_previews()
+            self.assertFalse(self.Partner.get_social_preview('https://twitter.com/missing'))
+            Cache._cron_fill_previews()
+            self.assertEqual(compute.call_count, 1)
+
+        # Non social URLs are neither computed nor cached
+        self.assertFalse(self.Partner.get_social_preview('https://example.com/test'))
+        self.assertFalse(Cache.search_count([('url_key', 'like', 'example.com')]))
+
     def test_name_get_with_social_score(self):
         """Test name_get method with social score context."""
         self.partner.facebook_url = 'https://facebook.com/test'
@@ -328,6 +362,30 @@ class TestWebsiteController(HttpCase):
         response = self.url_open(f'/customers/{unpublished.id}')
         self.assertEqual(response.status_code, 404)
 
+    def test_customer_sitemap(self):
+        """Test published customers are listed once in the sitemap."""
+        response = self.url_open('/sitemap.xml')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content.count(f'/customers/{self.customer1.id}<'.encode()), 1)
+        self.assertIn(f'/customers/{self.customer2.id}<'.encode(), response.content)
+
+    def test_customer_showcase_cache(self):
+        """Test cached showcase pages are revalidated and invalidated."""
+        response = self.url_open('/customers')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response.headers['Cache-Control'])
+        etag = response.headers['ETag']
+
+        response = self.url_open('/customers', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        # Changing a published company invalidates the cached page
+        self.customer2.name = 'Renamed Customer 2'
+        response = self.url_open('/customers', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertIn(b'Renamed Customer 2', response.content)
+
 
 class TestSocialIntegration(TransactionCase):
     """Test integration with CRM and other modules."""
@@ -356,6 +414,105 @@ class TestSocialIntegration(TransactionCase):
         self.assertTrue(lead.partner_id.is_profile_complete)
         self.assertEqual(lead.partner_id.social_score, 80)
 
+    def test_lead_social_score_propagation(self):
+        """Test partner scores reach their open leads, and only those."""
+        contact = self.Partner.create({'name': 'Test Contact', 'parent_id': self.partner.id})
+        won_stage = self.env['crm.stage'].create({'name': 'Social Won', 'is_won': True})
+        lead, contact_lead, manual_lead = self.Lead.create([
+            {'name': 'Social Lead', 'partner_id': self.partner.id},
+            {'name': 'Contact Lead', 'partner_id': contact.id},
+            {'name': 'Manual Lead', 'partner_id': self.partner.id, 'priority': '3'},
+        ])
+        won_lead = self.Lead.create({'name': 'Won Lead', 'partner_id': self.partner.id, 'stage_id': won_stage.id})
+        self.assertEqual((lead.social_score, lead.priority), (80, '3'))
+        self.assertEqual(contact_lead.social_score, 80)
+
+        # A bulk rescore propagates to the open leads of the changed partners
+        self.env['ir.config_parameter'].set_param('crm_social_extension.completion_bonus', 0)
+        self.Partner._recompute_social_scores(self.partner.ids)
+        self.assertEqual((lead.social_score, lead.priority), (60, '3'))
+        self.assertEqual(contact_lead.social_score, 60)
+        self.assertEqual(manual_lead.priority, '3')
+        self.assertEqual(won_lead.social_score, 0)
+
+        # Nothing to write when the scores did not change
+        self.assertFalse(self.Lead._propagate_social_scores(partner_ids=self.partner.ids))
+
+        # The cron resyncs the leads of reparented contacts
+        other = self.Partner.create({'name': 'Other Company', 'is_company': True})
+        self.env['ir.config_parameter'].set_param(LEAD_SCORE_WATERMARK_PARAM, fields.Datetime.to_string(self.env.cr.now()))
+        contact.parent_id = other
+        self.Lead._cron_propagate_social_scores()
+        self.assertEqual(contact_lead.social_score, other.social_score)
+        self.assertEqual(lead.social_score, 60)
+
+    def test_batched_follow_up_generation(self):
+        """Test follow-ups cover every incomplete company exactly once."""
+        incomplete = self.Partner.create([{
+            'name': f'Follow-up Partner {i}',
+            'is_company': True,
+            'user_id': self.env.user.id,
+            'facebook_url': f'https://facebook.com/followup{i}',
+        } for i in range(5)])
+        unassigned = self.Partner.create({'name': 'Follow-up Partner Unassigned', 'is_company': True})
+        activity_type = self.Partner._get_social_follow_up_activity_type()
+
+        self.assertGreaterEqual(self.Partner._generate_social_follow_up_activities(batch_size=2), 5)
+        activities = self.env['mail.activity'].search([
+            ('res_model', '=', 'res.partner'),
+            ('activity_type_id', '=', activity_type.id),
+            ('res_id', 'in', (incomplete | unassigned | self.partner).ids),
+        ])
+        # Assigned to the salesperson; companies without one are skipped
+        self.assertEqual(sorted(activities.mapped('res_id')), sorted(incomplete.ids))
+        self.assertEqual(activities.user_id, self.env.user)
+
+        # Open follow-ups are not duplicated
+        self.assertEqual(self.Partner._generate_social_follow_up_activities(), 0)
+
+    def test_engagement_ingestion_and_rollup(self):
+        """Test engagement events are appended, rolled up and drive the engagement level."""
+        self.partner.website_published = True
+        unpublished = self.Partner.create({'name': 'Hidden Partner', 'is_company': True})
+        Event = self.env['social.engagement.event']
+
+        events = [{'partner_id': self.partner.id, 'type': 'social_click', 'platform': 'linkedin'}] * 10
+        events += [{'partner_id': unpublished.id, 'type': 'page_view'}, {'partner_id': 'x', 'type': 'page_view'}]
+        self.assertEqual(Event._ingest(events), 10)
+        self.assertEqual(Event._ingest([{'partner_id': self.partner.id, 'type': 'page_view'}]), 1)
+
+        self.env['social.engagement.daily']._cron_rollup_engagement()
+        daily = self.env['social.engagement.daily'].search([('partner_id', '=', self.partner.id)])
+        self.assertEqual((daily.page_views, daily.social_clicks), (1, 10))
+        self.assertEqual(self.partner.social_engagement_level, 'high')
+        self.assertEqual(self.partner.social_score, 90)
+
+        # Already rolled up events are not counted twice
+        self.env['social.engagement.daily']._cron_rollup_engagement()
+        self.assertEqual(daily.social_clicks, 10)
+
+        # Events are folded by flag, whatever the order of their ids
+        late = Event.create({'partner_id': self.partner.id, 'event_type': 'page_view', 'occurred_at': fields.Datetime.now()})
+        self.env.cr.execute("UPDATE social_engagement_event SET id = id - 1000000 WHERE id = %s", [late.id])
+        self.env['social.engagement.daily']._cron_rollup_engagement()
+        self.assertEqual(daily.page_views, 2)
+
+        # Levels decay once the activity leaves the window
+        self.env.cr.execute("UPDATE social_engagement_daily SET day = day - 60 WHERE partner_id = %s", [self.partner.id])
+        self.env['social.engagement.daily']._cron_rollup_engagement()
+        self.assertEqual(self.partner.social_engagement_level, 'low')
+
+    def test_engagement_visitor_throttling(self):
+        """Test a visitor counts once per customer, event type and platform a day."""
+        self.partner.website_published = True
+        Event = self.env['social.engagement.event']
+        clicks = [{'partner_id': self.partner.id, 'type': 'social_click', 'platform': 'linkedin'}] * 100
+        self.assertEqual(Event._ingest(clicks, visitor_key='visitor-a'), 1)
+        self.assertEqual(Event._ingest(clicks, visitor_key='visitor-a'), 0)
+        self.assertEqual(Event._ingest([{'partner_id': self.partner.id, 'type': 'social_click', 'platform': 'twitter'}],
+                                       visitor_key='visitor-a'), 1)
+        self.assertEqual(Event._ingest(clicks, visitor_key='visitor-b'), 1)
+
     def test_activity_creation_for_incomplete_profile(self):
         """Test activity creation for incomplete profiles."""
         incomplete_partner = self.Partner.create({
@@ -407,6 +564,137 @@ class TestPerformanceAndSecurity(TransactionCase):
         for partner in partners:
             self.assertEqual(partner.social_score, 20)
 
+    def test_bulk_social_score_recompute(self):
+        """Test bulk score recomputation matches the per-record scoring."""
+        partners = self.Partner.create([{
+            'name': f'Score Partner {i}',
+            'is_company': True,
+            'facebook_url': f'https://facebook.com/score{i}',
+            'linkedin_url': f'https://linkedin.com/in/score{i}' if i % 2 else False,
+            'twitter_url': f'https://twitter.com/score{i}' if i % 2 else False,
+            'social_engagement_level': 'excellent' if i % 4 == 1 else False,
+        } for i in range(8)])
+        expected = {partner.id: partner.social_score for partner in partners}
+
+        self.env.flush_all()
+        self.env.cr.execute("UPDATE res_partner SET social_score = 0 WHERE id IN %s", [tuple(partners.ids)])
+        self.env.invalidate_all()
+        changed = self.Partner._recompute_social_scores(partners.ids)
+        self.assertEqual(changed, partners)
+        self.assertEqual({partner.id: partner.social_score for partner in partners}, expected)
+
+        # Nothing left to write on a second pass
+        self.assertFalse(self.Partner._recompute_social_scores(partners.ids))
+
+        # New weights are read once and applied to every partner
+        self.env['ir.config_parameter'].set_param('crm_social_extension.facebook_points', 30)
+        self.assertEqual(self.Partner._recompute_social_scores(partners.ids), partners)
+        self.assertEqual(partners[0].social_score, 30)
+
+    def test_showcase_stats_single_query(self):
+        """Test showcase statistics match the per-counter searches."""
+        self.Partner.create([{
+            'name': f'Stats Partner {i}',
+            'is_company': True,
+            'website_published': True,
+            'facebook_url': f'https://facebook.com/stats{i}',
+            'linkedin_url': f'https://linkedin.com/in/stats{i}' if i % 2 else False,
+        } for i in range(6)])
+        domain = [('is_company', '=', True), ('website_published', '=', True)]
+
+        self.env.flush_all()
+        with self.assertQueryCount(1):
+            stats = self.Partner._get_showcase_stats()
+        self.assertEqual(stats['total_customers'], self.Partner.search_count(domain))
+        self.assertEqual(stats['complete_profiles'], self.Partner.search_count(domain + [('is_profile_complete', '=', True)]))
+        self.assertEqual(stats['high_social_score'], self.Partner.search_count(domain + [('social_score', '>', 80)]))
+        for platform in ['facebook_url', 'linkedin_url', 'twitter_url']:
+            self.assertEqual(stats['platform_stats'][platform], self.Partner.search_count(domain + [(platform, '!=', False)]))
+
+        # Cached until a published company changes
+        with self.assertQueryCount(0):
+            self.Partner._get_showcase_stats()
+        version = self.Partner._get_showcase_cache_version()
+        self.Partner.create({'name': 'Stats Partner New', 'is_company': True, 'website_published': True})
+        self.assertGreater(self.Partner._get_showcase_cache_version(), version)
+        self.assertEqual(self.Partner._get_showcase_stats()['total_customers'], stats['total_customers'] + 1)
+
+    def test_showcase_keyset_pagination(self):
+        """Test keyset pages walk the showcase like offset pages, both ways."""
+        self.Partner.create([{
+            'name': f'Keyset Partner {i % 7}',  # Duplicate names exercise the id tie-breaker
+            'is_company': True,
+            'website_published': True,
+            'facebook_url': f'https://facebook.com/keyset{i}' if i % 3 else False,
+        } for i in range(40)])
+
+        for sort in ['name', 'social_score', 'recent']:
+            with self.subTest(sort=sort):
+                expected = self.Partner._search_showcase_keyset(
+                    self.Partner._get_showcase_domain(), sort, limit=None
+                ).ids
+                pages, values = [], self.Partner._get_showcase_values(sort=sort)
+                pages.append(values['customers'].ids)
+                while values['has_next']:
+                    values = self.Partner._get_showcase_values(
+                        page=values['page'] + 1, sort=sort, after=values['customers'][-1].id
+                    )
+                    pages.append(values['customers'].ids)
+                self.assertEqual([pid for page in pages for pid in page], expected)
+
+                # Seeking backwards returns the same pages
+                for number in range(len(pages) - 1, 0, -1):
+                    previous = self.Partner._get_showcase_values(
+                        page=number, sort=sort, before=pages[number][0]
+                    )
+                    self.assertEqual(previous['customers'].ids, pages[number - 1])
+
+    def test_showcase_card_payload(self):
+        """Test the stored card follows the partner and serves the listing."""
+        partners = self.Partner.create([{
+            'name': f'Card Partner {i}',
+            'is_company': True,
+            'website_published': True,
+            'city': 'Lisbon',
+            'facebook_url': f'https://facebook.com/card{i}',
+        } for i in range(3)])
+        card = partners[0].showcase_card
+        self.assertEqual(card['url'], f'/customers/{partners[0].id}')
+        self.assertEqual([platform['platform'] for platform in card['platforms']], ['facebook'])
+        self.assertEqual(card['social_score'], 20)
+
+        # Refreshed with the partner, including score changes
+        partners[0].write({'name': 'Card Partner Renamed', 'linkedin_url': 'https://linkedin.com/in/card0'})
+        card = partners[0].showcase_card
+        self.assertEqual(card['name'], 'Card Partner Renamed')
+        self.assertEqual(card['social_score'], 40)
+        self.assertEqual(len(card['platforms']), 2)
+
+        # Country and date are stored raw and resolved in the visitor's language
+        belgium = self.env.ref('base.be')
+        partners[0].write({'country_id': belgium.id, 'last_social_update': '2024-03-05 10:00:00'})
+        card = partners[0].showcase_card
+        self.assertEqual(card['country_id'], belgium.id)
+        self.assertNotIn('country', card)
+        self.env['res.lang']._activate_lang('fr_FR')
+        [localized] = self.Partner.with_context(lang='fr_FR')._localize_showcase_cards([card])
+        self.assertEqual(localized['country'], belgium.with_context(lang='fr_FR').name)
+        self.assertEqual(localized['last_update'], '05/03/2024')
+
+        # Unpublished partners have no card
+        partners[1].website_published = False
+        self.assertFalse(partners[1].showcase_card)
+
+        # The page rows and their cards come from one query
+        self.env.flush_all()
+        self.env.invalidate_all()
+        domain = self.Partner._get_showcase_domain()
+        with self.assertQueryCount(1):
+            customers = self.Partner._search_showcase_keyset(domain, limit=None)
+            cards = [customer.showcase_card for customer in customers]
+        self.assertIn(partners[0].id, [card['id'] for card in cards])
+        self.assertNotIn(partners[1].id, customers.ids)
+
     def test_sql_injection_protection(self):
         """Test protection against SQL injection in search."""
         # Try to inject SQL in search
@@ -439,4 +727,73 @@ class TestPerformanceAndSecurity(TransactionCase):
         with self.assertRaises(Exception):
             partner.with_user(portal_user).write({
                 'facebook_url': 'https://facebook.com/hack'
-            })
\ No newline at end of file
+            })
+
+
+class TestCustomerSocialSearch(TransactionCase):
+    """Test the trigram-backed public customer search."""
+
+    def setUp(self):
+        super().setUp()
+        self.Partner = self.env['res.partner']
+        self.domain = [('is_company', '=', True), ('website_published', '=', True)]
+        self.exact = self.Partner.create({
+            'name': 'Café Montaña',
+            'is_company': True,
+            'website_published': True,
+            'facebook_url': 'https://facebook.com/cafemontana',
+        })
+        self.mention = self.Partner.create({
+            'name': 'Roastery Supplies',
+            'is_company': True,
+            'website_published': True,
+            'social_notes': 'Supplier of Café Montaña and other coffee shops',
+        })
+        self.unpublished = self.Partner.create({
+            'name': 'Café Montaña Outlet',
+            'is_company': True,
+            'website_published': False,
+        })
+
+    def test_search_document_is_normalized(self):
+        """Test the stored document combines the social fields without accents or case."""
+        self.assertIn('cafe montana', self.exact.social_search_document)
+        self.assertIn('facebook.com/cafemontana', self.exact.social_search_document)
+
+        self.exact.write({'twitter_url': 'https://twitter.com/CafeMontana'})
+        self.assertIn('twitter.com/cafemontana', self.exact.social_search_document)
+
+    def test_search_is_accent_and_case_insensitive(self):
+        """Test accented and unaccented terms find the same customers."""
+        for term in ('Café Montaña', 'cafe montana', 'CAFE MONTANA'):
+            results = self.Partner._search_social_ranked(term, self.domain)
+            self.assertIn(self.exact, results)
+            self.assertIn(self.mention, results)
+            self.assertNotIn(self.unpublished, results)
+            self.assertEqual(self.Partner._search_social_count(term, self.domain), 2)
+
+    def test_search_results_are_ranked(self):
+        """Test the closest match comes first regardless of the secondary order."""
+        results = self.Partner._search_social_ranked('cafe montana', self.domain, order='name asc')
+        self.assertEqual(results[0], self.exact)
+
+    def test_search_matches_social_urls(self):
+        """Test searching by a social media handle."""
+        results = self.Partner._search_social_ranked('facebook.com/cafemontana', self.domain, limit=10)
+        self.assertEqual(results, self.exact)
+
+    def test_autocomplete_prefix_index(self):
+        """Test autocomplete answers from the prefix index without queries."""
+        results = self.Partner._social_autocomplete('cafe mon')
+        self.assertEqual([result['id'] for result in results], [self.exact.id])
+        self.assertEqual(results[0]['social_platforms'], ['Facebook'])
+
+        # Handles are indexed, and repeated lookups stay in memory
+        with self.assertQueryCount(0):
+            results = self.Partner._social_autocomplete('cafemont')
+        self.assertEqual([result['id'] for result in results], [self.exact.id])
+
+        # Publishing a customer rebuilds the index
+        self.unpublished.website_published = True
+        results = self.Partner._social_autocomplete('Café Montaña')
+        self.assertEqual([result['id'] for result in results], [self.exact.id, self.unpublished.id])
@@ -72,6 +72,7 @@ Integraciones:
         'data/demo_data.xml',
         'data/loan_accounting_data.xml',
         'data/ir_cron_data.xml',
+        'data/loan_notification_data.xml',
         
         # ==========================================
         # WIZARD VIEWS - ANTES QUE LAS VISTAS QUE LAS REFERENCIAN
@@ -98,6 +99,7 @@ Integraciones:
         # ANALYTICS - CONVERSION DASHBOARD  
         # ==========================================
         'views/loan_analytics_board.xml', 
+        'views/loan_notification_job_views.xml',
         # ==========================================
         # DEBUG Y DESARROLLO
         # ==========================================
@@ -1,4 +1,6 @@
-from odoo import http
+from dateutil.relativedelta import relativedelta
+
+from odoo import fields, http
 from odoo.http import request
 
 class LoanAnalyticsController(http.Controller):
@@ -6,9 +8,14 @@ class LoanAnalyticsController(http.Controller):
     @http.route('/loan_analytics/dashboard_data', type='json', auth='user')
     def get_dashboard_data(self):
         dashboard = request.env['loan.analytics.dashboard']
-        return dashboard.get_dashboard_data()
+        data = dashboard.get_dashboard_data()
+        # Embudo del último año desde los acumulados de eventos
+        date_to = fields.Date.context_today(dashboard)
+        data['funnel'] = request.env['loan.event'].get_conversion_funnel(
+            date_to - relativedelta(years=1), date_to
+        )
+        return data
     
     @http.route('/loan_analytics/trends/<int:months>', type='json', auth='user')
     def get_trends(self, months=12):
-        analytics = request.env['loan.conversion.analytics']
-        return analytics.get_conversion_trends(months)
\ No newline at end of file
+        return request.env['loan.event'].get_conversion_trends(months)
\ No newline at end of file
@@ -56,6 +56,27 @@ def post_install_hook(env):
                     _logger = logging.getLogger(__name__)
                     _logger.warning("No se pudo crear ubicación temporal: %s", e)
 
+    # 3) Inicializar contadores de préstamos por cliente
+    if registry.get('loan.tracking.detail'):
+        su_env = api.Environment(cr, SUPERUSER_ID, {})
+        su_env['res.partner']._recompute_loan_counters()
+
+    # 4) Generar el historial de eventos de préstamos existentes
+    if registry.get('loan.event'):
+        su_env = api.Environment(cr, SUPERUSER_ID, {})
+        su_env['loan.event']._backfill_from_tracking()
+
+    # 5) Indexar los vencimientos de los préstamos abiertos
+    if registry.get('loan.due.date'):
+        su_env = api.Environment(cr, SUPERUSER_ID, {})
+        loans = su_env['stock.picking'].search([('is_loan', '=', True)])
+        su_env['loan.due.date']._sync_from_pickings(loans)
+
+    # 6) Calcular la diferencia de valoración de los seguimientos existentes
+    if registry.get('loan.valuation.tracker'):
+        su_env = api.Environment(cr, SUPERUSER_ID, {})
+        su_env['loan.valuation.tracker'].browse()._refresh_valuation_drift()
+
 
 def uninstall_hook(env):
     """Hook ejecutado antes de la desinstalación del módulo (Odoo 18: recibe env)."""
@@ -0,0 +1,7 @@
+from . import loan_stock_reservation
+from . import loan_partner_counters
+from . import loan_notification_job
+from . import loan_valuation_drift
+from . import loan_location_resolver
+from . import loan_event
+from . import loan_due_scheduler
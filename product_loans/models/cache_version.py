@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""Versiones de caché guardadas en secuencias de PostgreSQL.
+
+El valor de la secuencia forma parte de la clave del ormcache: incrementarla
+deja obsoletas las entradas de todos los procesos sin vaciar el resto de la
+caché. Se incrementa al invalidar y de nuevo tras el commit, para descartar
+lo que otros procesos hayan cacheado con los datos anteriores mientras la
+transacción seguía abierta.
+"""
+
+
+def create_version_sequence(cr, sequence):
+    cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {sequence}")
+
+
+def get_cache_version(env, sequence):
+    """Versión vigente, leída una vez por transacción"""
+    cache = env.cr.cache
+    if sequence not in cache:
+        env.cr.execute(f"SELECT last_value FROM {sequence}")
+        cache[sequence] = env.cr.fetchone()[0]
+    return cache[sequence]
+
+
+def bump_cache_version(env, sequence):
+    """Incrementar la versión ahora y, una sola vez por transacción, tras el commit"""
+    env.cr.execute(f"SELECT nextval('{sequence}')")
+    env.cr.cache[sequence] = env.cr.fetchone()[0]
+    postcommit = env.cr.postcommit
+    if postcommit.data.get(sequence):
+        return
+    postcommit.data[sequence] = True
+    registry = env.registry
+
+    @postcommit.add
+    def bump_after_commit():
+        with registry.cursor() as cr:
+            cr.execute(f"SELECT nextval('{sequence}')")
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+
+from odoo import api, fields, models, modules, tools, _
+import logging
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_DUE_WINDOW_DAYS = 1
+DUE_BATCH_SIZE = 500
+# Intentos de conversión automática antes de dejarla a un usuario
+MAX_AUTO_CONVERT_ATTEMPTS = 5
+
+OPEN_LOAN_STATES = ('active', 'in_trial', 'partially_resolved')
+# Campos de stock.picking que determinan sus vencimientos
+DUE_DATE_FIELDS = {'is_loan', 'loan_state', 'trial_end_date', 'loan_expected_return_date', 'loan_return_origin_id'}
+
+
+class LoanDueDate(models.Model):
+    _name = 'loan.due.date'
+    _description = 'Vencimiento de Préstamo'
+    _order = 'due_date, id'
+
+    picking_id = fields.Many2one('stock.picking', string='Préstamo', required=True, readonly=True, ondelete='cascade')
+    partner_id = fields.Many2one(related='picking_id.loaned_to_partner_id', string='Cliente')
+    due_type = fields.Selection([
+        ('trial_end', 'Fin de Período de Prueba'),
+        ('expected_return', 'Devolución Esperada'),
+    ], string='Tipo', required=True, readonly=True)
+    due_date = fields.Date(string='Fecha de Vencimiento', required=True, readonly=True)
+    state = fields.Selection([
+        ('pending', 'Pendiente'),
+        ('reminded', 'Recordado'),
+        ('done', 'Procesado'),
+        ('failed', 'Conversión Fallida'),
+    ], string='Estado', default='pending', required=True, readonly=True)
+    user_id = fields.Many2one(
+        'res.users',
+        string='Responsable',
+        help="Usuario que recibe el recordatorio. Por defecto el responsable del préstamo"
+    )
+    reminder_disabled = fields.Boolean(
+        string='Sin Recordatorio',
+        readonly=True,
+        help="El recordatorio se desactivó al configurar el período de prueba "
+             "y no se vuelve a crear aunque cambie la fecha"
+    )
+    notes = fields.Text(string='Notas', readonly=True)
+    attempt_count = fields.Integer(string='Intentos de Conversión', readonly=True)
+    next_attempt_date = fields.Date(
+        string='Próximo Intento',
+        readonly=True,
+        help="Tras una conversión automática fallida se espera cada vez el doble antes de reintentar"
+    )
+    last_error = fields.Text(string='Último Error', readonly=True)
+
+    _sql_constraints = [
+        ('picking_due_type_unique', 'unique(picking_id, due_type)',
+         'Un préstamo solo puede tener un vencimiento de cada tipo.'),
+    ]
+
+    def init(self):
+        # Índice ordenado solo sobre los vencimientos abiertos: el cron lee un
+        # rango de fechas y su costo depende de los préstamos que vencen.
+        tools.create_index(
+            self.env.cr, 'loan_due_date_open_due_date_idx', self._table,
+            ['due_date', 'due_type'], where="state != 'done'"
+        )
+
+    @api.model
+    def _sync_from_pickings(self, pickings):
+        """Alinear el índice de vencimientos con las fechas de los préstamos"""
+        if not pickings:
+            return
+        pickings.flush_recordset(list(DUE_DATE_FIELDS))
+        self.env.cr.execute("""
+            WITH wanted AS (
+                SELECT picking.id AS picking_id, due.due_type, due.due_date
+                  FROM stock_picking picking
+                 CROSS JOIN LATERAL (
+                        VALUES ('trial_end', CASE WHEN picking.loan_state = 'in_trial'
+                                                  THEN picking.trial_end_date END),
+                               ('expected_return', CASE WHEN picking.loan_state != 'in_trial'
+                                                        THEN picking.loan_expected_return_date END)
+                       ) AS due(due_type, due_date)
+                 WHERE picking.id IN %(ids)s
+                   AND picking.is_loan
+                   AND picking.loan_return_origin_id IS NULL
+                   AND picking.loan_state IN %(open_states)s
+                   AND due.due_date IS NOT NULL
+            ),
+            removed AS (
+                DELETE FROM loan_due_date entry
+                 WHERE entry.picking_id IN %(ids)s
+                   AND NOT EXISTS (
+                        SELECT 1 FROM wanted
+                         WHERE wanted.picking_id = entry.picking_id
+                           AND wanted.due_type = entry.due_type
+                       )
+            )
+            INSERT INTO loan_due_date (picking_id, due_type, due_date, state,
+                                       create_uid, create_date, write_uid, write_date)
+            SELECT picking_id, due_type, due_date, 'pending',
+                   %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+              FROM wanted
+            ON CONFLICT (picking_id, due_type) DO UPDATE
+               SET due_date = EXCLUDED.due_date,
+                   state = CASE WHEN loan_due_date.due_date = EXCLUDED.due_date
+                                THEN loan_due_date.state
+                                WHEN COALESCE(loan_due_date.reminder_disabled, FALSE)
+                                THEN 'reminded'
+                                ELSE 'pending' END,
+                   attempt_count = CASE WHEN loan_due_date.due_date = EXCLUDED.due_date
+                                        THEN loan_due_date.attempt_count ELSE 0 END,
+                   next_attempt_date = CASE WHEN loan_due_date.due_date = EXCLUDED.due_date
+                                            THEN loan_due_date.next_attempt_date END,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+        """, {
+            'ids': tuple(pickings.ids),
+            'open_states': OPEN_LOAN_STATES,
+            'uid': self.env.uid,
+        })
+        self.invalidate_model()
+
+    @api.model
+    def _get_window_days(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'product_loans.due_window_days', DEFAULT_DUE_WINDOW_DAYS
+        ))
+
+    @api.model
+    def _is_auto_convert_enabled(self):
+        return tools.str2bool(self.env['ir.config_parameter'].sudo().get_param(
+            'product_loans.trial_auto_convert', 'False'
+        ))
+
+    @api.model
+    def _cron_process_due_loans(self):
+        """Procesar solo los préstamos que vencen dentro de la ventana.
+
+        1. Recordatorio para cada vencimiento pendiente en los próximos días.
+        2. Con product_loans.trial_auto_convert activo, los períodos de prueba
+           ya vencidos se convierten a venta con el asistente de resolución.
+           Una conversión fallida se reintenta con espera creciente y, tras
+           MAX_AUTO_CONVERT_ATTEMPTS intentos, queda como fallida para el
+           responsable.
+        """
+        today = fields.Date.context_today(self)
+        horizon = today + timedelta(days=self._get_window_days())
+
+        while True:
+            entries = self.search([('state', '=', 'pending'), ('due_date', '<=', horizon)], limit=DUE_BATCH_SIZE)
+            if not entries:
+                break
+            # Préstamos cerrados después de indexar su vencimiento
+            closed = entries.filtered(lambda e: e.picking_id.loan_state not in OPEN_LOAN_STATES)
+            closed.write({'state': 'done'})
+            (entries - closed)._create_due_activities(today)
+            (entries - closed).write({'state': 'reminded'})
+            self._commit_progress()
+
+        if self._is_auto_convert_enabled():
+            expired = self.search([
+                ('due_type', '=', 'trial_end'),
+                ('state', 'in', ('pending', 'reminded')),
+                ('due_date', '<', today),
+                '|', ('next_attempt_date', '=', False), ('next_attempt_date', '<=', today),
+            ])
+            for entry in expired:
+                entry._auto_convert_trial()
+                self._commit_progress()
+
+    @api.model
+    def _configure_trial_reminder(self, picking, user=None, notes=None):
+        """Asignar el responsable del recordatorio del período de prueba, o desactivarlo"""
+        entry = self.search([('picking_id', '=', picking.id), ('due_type', '=', 'trial_end')])
+        entry.write({'notes': notes or False})
+        if user:
+            entry.filtered('reminder_disabled').write({'state': 'pending'})
+            entry.write({'user_id': user.id, 'reminder_disabled': False})
+        else:
+            entry.filtered(lambda e: e.state == 'pending').write({'state': 'reminded'})
+            entry.write({'reminder_disabled': True})
+
+    def _commit_progress(self):
+        if not modules.module.current_test:
+            self.env.cr.commit()
+
+    def _create_due_activities(self, today):
+        """Crear los recordatorios del lote con una sola llamada a create"""
+        activity_type = self.env.ref('mail.mail_activity_data_todo', False) \
+            or self.env['mail.activity.type'].search([], limit=1)
+        model_id = self.env['ir.model']._get_id('stock.picking')
+        self.env['mail.activity'].create([{
+            'activity_type_id': activity_type.id,
+            'res_model_id': model_id,
+            'res_id': entry.picking_id.id,
+            'summary': entry._get_activity_summary(),
+            'note': entry._get_activity_note(),
+            'date_deadline': max(entry.due_date - timedelta(days=1), today),
+            'user_id': (entry.user_id or entry.picking_id.user_id or self.env.ref('base.user_admin')).id,
+        } for entry in self])
+
+    def _get_activity_summary(self):
+        if self.due_type == 'trial_end':
+            return f'Período de Prueba Finaliza - {self.picking_id.name}'
+        return f'Devolución Esperada - {self.picking_id.name}'
+
+    def _get_activity_note(self):
+        if self.due_type == 'trial_end':
+            headline = 'El período de prueba está por finalizar'
+            actions = '''
+                    <li>Contactar al cliente para conocer su decisión</li>
+                    <li>Usar "Resolver Préstamo" para procesar compras/devoluciones</li>
+                    <li>Extender período si es necesario</li>'''
+        else:
+            headline = 'El préstamo debe ser devuelto'
+            actions = '''
+                    <li>Coordinar la devolución con el cliente</li>
+                    <li>Ofrecer la compra de los productos</li>'''
+        notes = f'''
+                <p>Notas: {self.notes or 'N/A'}</p>''' if self.due_type == 'trial_end' else ''
+        return f'''
+                <p><strong>{headline}</strong></p>
+                <p>Cliente: {self.partner_id.name}</p>
+                <p>Fecha de vencimiento: {self.due_date}</p>
+                <p>Acciones recomendadas:</p>
+                <ul>{actions}
+                </ul>{notes}
+            '''
+
+    def _auto_convert_trial(self):
+        """Convertir a venta un período de prueba vencido sin decisión del cliente"""
+        self.ensure_one()
+        picking = self.picking_id
+        if picking.loan_state != 'in_trial':
+            self.state = 'done'
+            return
+        try:
+            with self.env.cr.savepoint():
+                Wizard = self.env['loan.resolution.wizard'].with_context(active_id=picking.id)
+                values = Wizard.default_get(list(Wizard._fields))
+                if not values.get('resolution_line_ids'):
+                    self.state = 'done'
+                    return
+                values['picking_id'] = picking.id
+                values['notes'] = _("Conversión automática al vencer el período de prueba.")
+                for _command, _id, line_vals in values['resolution_line_ids']:
+                    line_vals['resolution_type'] = 'buy'
+                Wizard.create(values).action_process_resolution()
+                self.state = 'done'
+        except Exception as e:
+            _logger.exception("No se pudo convertir automáticamente el préstamo %s", picking.name)
+            self._record_auto_convert_failure(e)
+
+    def _record_auto_convert_failure(self, error):
+        """Registrar el error y esperar el doble antes del siguiente intento"""
+        self.ensure_one()
+        attempts = self.attempt_count + 1
+        vals = {
+            'attempt_count': attempts,
+            'last_error': str(error),
+            'next_attempt_date': fields.Date.context_today(self) + timedelta(days=2 ** (attempts - 1)),
+        }
+        if attempts >= MAX_AUTO_CONVERT_ATTEMPTS:
+            vals.update({'state': 'failed', 'next_attempt_date': False})
+            self.picking_id.message_post(body=_(
+                "La conversión automática del período de prueba falló %(attempts)s veces "
+                "y no se reintentará: %(error)s. Resuelva el préstamo manualmente.",
+                attempts=attempts, error=error,
+            ))
+        self.write(vals)
+
+
+class StockPicking(models.Model):
+    _inherit = 'stock.picking'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        pickings = super().create(vals_list)
+        self.env['loan.due.date']._sync_from_pickings(pickings.filtered('is_loan'))
+        return pickings
+
+    def write(self, vals):
+        res = super().write(vals)
+        if DUE_DATE_FIELDS.intersection(vals):
+            self.env['loan.due.date']._sync_from_pickings(self)
+        return res
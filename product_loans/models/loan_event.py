@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, fields, models, tools, _
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+import logging
+
+_logger = logging.getLogger(__name__)
+
+LOAN_EVENT_TYPES = [
+    ('lent', 'Prestado'),
+    ('trial_started', 'Prueba Iniciada'),
+    ('extended', 'Préstamo Extendido'),
+    ('sold', 'Vendido'),
+    ('returned', 'Devuelto'),
+]
+
+# Eventos que cierran la decisión del cliente sobre un artículo
+DECISION_EVENT_TYPES = ('sold', 'returned')
+
+
+class LoanEvent(models.Model):
+    _name = 'loan.event'
+    _description = 'Evento de Préstamo'
+    _order = 'date desc, id desc'
+
+    event_type = fields.Selection(LOAN_EVENT_TYPES, string='Evento', required=True, readonly=True, index=True)
+    date = fields.Datetime(string='Fecha', required=True, readonly=True, index=True, default=fields.Datetime.now)
+    picking_id = fields.Many2one('stock.picking', string='Préstamo', readonly=True, index=True, ondelete='set null')
+    partner_id = fields.Many2one('res.partner', string='Cliente', required=True, readonly=True, index=True)
+    product_id = fields.Many2one('product.product', string='Producto', readonly=True, index=True)
+    lot_id = fields.Many2one('stock.lot', string='Número de Serie', readonly=True)
+    tracking_detail_id = fields.Many2one(
+        'loan.tracking.detail',
+        string='Detalle de Seguimiento',
+        readonly=True,
+        ondelete='set null'
+    )
+    quantity = fields.Float(string='Cantidad', readonly=True, digits='Product Unit of Measure')
+    amount = fields.Float(string='Importe', readonly=True, digits='Product Price')
+    loan_date = fields.Datetime(string='Fecha del Préstamo', readonly=True)
+    decision_days = fields.Integer(
+        string='Días hasta Decisión',
+        readonly=True,
+        help="Días entre el préstamo y la venta o devolución"
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get('event_type') in DECISION_EVENT_TYPES and vals.get('loan_date'):
+                delta = fields.Datetime.to_datetime(vals.get('date') or fields.Datetime.now()) \
+                    - fields.Datetime.to_datetime(vals['loan_date'])
+                vals['decision_days'] = max(delta.days, 0)
+        events = super().create(vals_list)
+        self.env['loan.event.rollup']._add_events(events)
+        return events
+
+    def write(self, vals):
+        raise UserError(_("Los eventos de préstamo no se pueden modificar."))
+
+    def unlink(self):
+        if not self.env.su:
+            raise UserError(_("Los eventos de préstamo no se pueden eliminar."))
+        res = super().unlink()
+        self.env['loan.event.rollup']._rebuild()
+        return res
+
+    @api.model
+    def _prepare_detail_event(self, event_type, detail, quantity=None, amount=0.0, date=None):
+        """Valores de un evento a partir de un detalle de seguimiento"""
+        return {
+            'event_type': event_type,
+            'date': date or fields.Datetime.now(),
+            'picking_id': detail.picking_id.id,
+            'partner_id': detail.partner_id.id or detail.picking_id.loaned_to_partner_id.id,
+            'product_id': detail.product_id.id,
+            'lot_id': detail.lot_id.id,
+            'tracking_detail_id': detail.id,
+            'quantity': detail.quantity if quantity is None else quantity,
+            'amount': amount,
+            'loan_date': detail.loan_date or detail.picking_id.date_done,
+        }
+
+    @api.model
+    def _log_events(self, vals_list):
+        vals_list = [vals for vals in vals_list if vals.get('partner_id')]
+        if not vals_list:
+            return self.browse()
+        return self.sudo().create(vals_list)
+
+    @api.model
+    def _backfill_from_tracking(self):
+        """Generar el historial de eventos desde los detalles existentes (instalación)"""
+        if self.search_count([], limit=1):
+            return
+        self.env['loan.tracking.detail'].flush_model()
+        self.env['stock.picking'].flush_model(['loaned_to_partner_id', 'date_done'])
+        self.env.cr.execute("""
+            INSERT INTO loan_event (event_type, date, picking_id, partner_id, product_id, lot_id,
+                                    tracking_detail_id, quantity, amount, loan_date, decision_days,
+                                    create_uid, create_date, write_uid, write_date)
+            SELECT event.event_type, event.date, detail.picking_id,
+                   COALESCE(detail.partner_id, picking.loaned_to_partner_id),
+                   detail.product_id, detail.lot_id, detail.id, detail.quantity, event.amount,
+                   COALESCE(detail.loan_date, picking.date_done), event.decision_days,
+                   %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+              FROM loan_tracking_detail detail
+              JOIN stock_picking picking ON picking.id = detail.picking_id
+             CROSS JOIN LATERAL (
+                    SELECT 'lent' AS event_type,
+                           COALESCE(detail.loan_date, picking.date_done) AS date,
+                           0.0 AS amount, 0 AS decision_days
+                     UNION ALL
+                    SELECT CASE WHEN detail.status = 'sold' THEN 'sold' ELSE 'returned' END,
+                           detail.resolution_date,
+                           CASE WHEN detail.status = 'sold'
+                                THEN detail.quantity * COALESCE(detail.sale_price, 0) ELSE 0.0 END,
+                           GREATEST(DATE_PART('day', detail.resolution_date
+                                    - COALESCE(detail.loan_date, picking.date_done))::int, 0)
+                     WHERE detail.resolution_date IS NOT NULL
+                       AND detail.status IN ('sold', 'returned_good', 'returned_damaged', 'returned_defective')
+                   ) event
+             WHERE COALESCE(detail.partner_id, picking.loaned_to_partner_id) IS NOT NULL
+               AND event.date IS NOT NULL
+        """, {'uid': self.env.uid})
+        _logger.info("Historial de préstamos: %s eventos generados", self.env.cr.rowcount)
+        self.env['loan.event.rollup']._rebuild()
+
+    @api.model
+    def get_conversion_funnel(self, date_from=None, date_to=None, partner_ids=None):
+        """Embudo de conversión y percentiles de tiempo de decisión en una ventana.
+
+        Se calcula desde los acumulados diarios, por lo que el costo depende del
+        número de días de la ventana y no del volumen del historial.
+        """
+        rows = self.env['loan.event.rollup']._read_window(date_from, date_to, partner_ids)
+
+        counts = {event_type: 0 for event_type, _label in LOAN_EVENT_TYPES}
+        quantities = dict(counts)
+        sold_amount = 0.0
+        decision_histogram = {'sold': {}, 'returned': {}}
+        for event_type, decision_days, event_count, quantity, amount in rows:
+            counts[event_type] += event_count
+            quantities[event_type] += quantity
+            if event_type == 'sold':
+                sold_amount += amount
+            if event_type in DECISION_EVENT_TYPES:
+                histogram = decision_histogram[event_type]
+                histogram[decision_days] = histogram.get(decision_days, 0) + event_count
+
+        decided = counts['sold'] + counts['returned']
+        all_decisions = dict(decision_histogram['sold'])
+        for days, count in decision_histogram['returned'].items():
+            all_decisions[days] = all_decisions.get(days, 0) + count
+
+        return {
+            'date_from': date_from,
+            'date_to': date_to,
+            'counts': counts,
+            'quantities': quantities,
+            'decided': decided,
+            'sold_amount': sold_amount,
+            'conversion_rate': (counts['sold'] / decided * 100.0) if decided else 0.0,
+            'trial_rate': (counts['trial_started'] / counts['lent'] * 100.0) if counts['lent'] else 0.0,
+            'time_to_decision': self._percentiles(all_decisions),
+            'time_to_sale': self._percentiles(decision_histogram['sold']),
+            'time_to_return': self._percentiles(decision_histogram['returned']),
+        }
+
+    @api.model
+    def get_conversion_trends(self, months=12, partner_ids=None):
+        """Embudo mensual de los últimos meses, leído de los acumulados diarios"""
+        date_from = fields.Date.context_today(self).replace(day=1) - relativedelta(months=max(months, 1) - 1)
+        trends = []
+        for month, counts, sold_amount in self.env['loan.event.rollup']._read_months(date_from, partner_ids):
+            decided = counts['sold'] + counts['returned']
+            trends.append({
+                'period': fields.Date.to_string(month),
+                'counts': counts,
+                'decided': decided,
+                'sold_amount': sold_amount,
+                'conversion_rate': (counts['sold'] / decided * 100.0) if decided else 0.0,
+                'trial_rate': (counts['trial_started'] / counts['lent'] * 100.0) if counts['lent'] else 0.0,
+            })
+        return trends
+
+    @staticmethod
+    def _percentiles(histogram, points=(50, 75, 90)):
+        """Percentiles por rango más cercano sobre un histograma {días: cantidad}"""
+        total = sum(histogram.values())
+        if not total:
+            return {f'p{point}': 0 for point in points}
+        result = {}
+        ordered = sorted(histogram.items())
+        for point in points:
+            rank = max(1, -(-point * total // 100))
+            cumulative = 0
+            for days, count in ordered:
+                cumulative += count
+                if cumulative >= rank:
+                    result[f'p{point}'] = days
+                    break
+        return result
+
+
+class LoanEventRollup(models.Model):
+    _name = 'loan.event.rollup'
+    _description = 'Acumulado Diario de Eventos de Préstamo'
+    _log_access = False
+    _order = 'day desc'
+
+    day = fields.Date(string='Día', required=True, readonly=True, index=True)
+    event_type = fields.Selection(LOAN_EVENT_TYPES, string='Evento', required=True, readonly=True)
+    partner_id = fields.Many2one('res.partner', string='Cliente', required=True, readonly=True, ondelete='cascade')
+    decision_days = fields.Integer(string='Días hasta Decisión', readonly=True, default=0)
+    event_count = fields.Integer(string='Eventos', readonly=True)
+    quantity = fields.Float(string='Cantidad', readonly=True, digits='Product Unit of Measure')
+    amount = fields.Float(string='Importe', readonly=True, digits='Product Price')
+
+    _sql_constraints = [
+        ('bucket_unique', 'unique(day, event_type, partner_id, decision_days)',
+         'Solo puede existir un acumulado por día, evento, cliente y días de decisión.'),
+    ]
+
+    _ROLLUP_SELECT = """
+        SELECT (event.date AT TIME ZONE 'UTC')::date AS day, event.event_type, event.partner_id,
+               COALESCE(event.decision_days, 0) AS decision_days,
+               COUNT(*) AS event_count,
+               SUM(COALESCE(event.quantity, 0)) AS quantity,
+               SUM(COALESCE(event.amount, 0)) AS amount
+          FROM loan_event event
+    """
+
+    @api.model
+    def _add_events(self, events):
+        """Sumar los eventos nuevos a sus acumulados con un solo UPSERT"""
+        if not events:
+            return
+        events.flush_recordset()
+        self.env.cr.execute(f"""
+            INSERT INTO loan_event_rollup (day, event_type, partner_id, decision_days, event_count, quantity, amount)
+            {self._ROLLUP_SELECT}
+             WHERE event.id IN %s
+          GROUP BY 1, 2, 3, 4
+            ON CONFLICT (day, event_type, partner_id, decision_days) DO UPDATE
+               SET event_count = loan_event_rollup.event_count + EXCLUDED.event_count,
+                   quantity = loan_event_rollup.quantity + EXCLUDED.quantity,
+                   amount = loan_event_rollup.amount + EXCLUDED.amount
+        """, (tuple(events.ids),))
+        self.invalidate_model()
+
+    @api.model
+    def _rebuild(self):
+        """Reconstruir todos los acumulados desde el registro de eventos"""
+        self.env['loan.event'].flush_model()
+        self.env.cr.execute("DELETE FROM loan_event_rollup")
+        self.env.cr.execute(f"""
+            INSERT INTO loan_event_rollup (day, event_type, partner_id, decision_days, event_count, quantity, amount)
+            {self._ROLLUP_SELECT}
+          GROUP BY 1, 2, 3, 4
+        """)
+        self.invalidate_model()
+
+    @api.model
+    def _read_window(self, date_from=None, date_to=None, partner_ids=None):
+        """Filas (evento, días, eventos, cantidad, importe) agregadas en la ventana"""
+        self.flush_model()
+        conditions, params = ["TRUE"], []
+        if date_from:
+            conditions.append("day >= %s")
+            params.append(fields.Date.to_date(date_from))
+        if date_to:
+            conditions.append("day <= %s")
+            params.append(fields.Date.to_date(date_to))
+        if partner_ids:
+            conditions.append("partner_id IN %s")
+            params.append(tuple(partner_ids))
+        self.env.cr.execute(f"""
+            SELECT event_type, decision_days, SUM(event_count), SUM(quantity), SUM(amount)
+              FROM loan_event_rollup
+             WHERE {' AND '.join(conditions)}
+          GROUP BY event_type, decision_days
+        """, params)
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _read_months(self, date_from, partner_ids=None):
+        """[(mes, {evento: eventos}, importe vendido)] desde date_from, en una consulta"""
+        self.flush_model()
+        partner_condition = SQL("partner_id = ANY(%s)", list(partner_ids)) if partner_ids else SQL("TRUE")
+        rows = self.env.execute_query(SQL("""
+            SELECT date_trunc('month', day)::date, event_type, SUM(event_count),
+                   SUM(amount) FILTER (WHERE event_type = 'sold')
+              FROM loan_event_rollup
+             WHERE day >= %s AND %s
+          GROUP BY 1, 2
+          ORDER BY 1
+        """, date_from, partner_condition))
+        months = {}
+        for month, event_type, event_count, amount in rows:
+            counts, sold_amount = months.get(month, ({event_type: 0 for event_type, _label in LOAN_EVENT_TYPES}, 0.0))
+            counts[event_type] += event_count
+            months[month] = (counts, sold_amount + (amount or 0.0))
+        return [(month, counts, sold_amount) for month, (counts, sold_amount) in months.items()]
+
+
+class LoanConversionReport(models.Model):
+    _name = 'loan.conversion.report'
+    _description = 'Análisis de Conversión de Préstamos'
+    _auto = False
+    _order = 'period desc'
+
+    period = fields.Date(string='Período', readonly=True)
+    partner_id = fields.Many2one('res.partner', string='Cliente', readonly=True)
+    total_loans = fields.Integer(string='Artículos Prestados', readonly=True)
+    trial_count = fields.Integer(string='Pruebas Iniciadas', readonly=True)
+    sold_count = fields.Integer(string='Vendidos', readonly=True)
+    returned_count = fields.Integer(string='Devueltos', readonly=True)
+    converted_value = fields.Float(string='Valor Convertido', readonly=True, digits='Product Price')
+    conversion_rate = fields.Float(
+        string='Tasa de Conversión (%)',
+        readonly=True,
+        aggregator='avg',
+        help="Vendidos sobre decididos (vendidos + devueltos) en el mes"
+    )
+
+    def init(self):
+        # Vista mensual sobre los acumulados: su costo no crece con el historial
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(SQL("""
+            CREATE VIEW %s AS (
+                SELECT MIN(rollup.id) AS id,
+                       date_trunc('month', rollup.day)::date AS period,
+                       rollup.partner_id,
+                       COALESCE(SUM(rollup.event_count) FILTER (WHERE rollup.event_type = 'lent'), 0) AS total_loans,
+                       COALESCE(SUM(rollup.event_count) FILTER (WHERE rollup.event_type = 'trial_started'), 0) AS trial_count,
+                       COALESCE(SUM(rollup.event_count) FILTER (WHERE rollup.event_type = 'sold'), 0) AS sold_count,
+                       COALESCE(SUM(rollup.event_count) FILTER (WHERE rollup.event_type = 'returned'), 0) AS returned_count,
+                       COALESCE(SUM(rollup.amount) FILTER (WHERE rollup.event_type = 'sold'), 0) AS converted_value,
+                       COALESCE(
+                           100.0 * SUM(rollup.event_count) FILTER (WHERE rollup.event_type = 'sold')
+                           / NULLIF(SUM(rollup.event_count) FILTER (WHERE rollup.event_type IN ('sold', 'returned')), 0),
+                           0
+                       ) AS conversion_rate
+                  FROM loan_event_rollup rollup
+              GROUP BY 2, 3
+            )
+        """, SQL.identifier(self._table)))
+
+
+class StockPicking(models.Model):
+    _inherit = 'stock.picking'
+
+    def _action_done(self):
+        res = super()._action_done()
+        loans = self.filtered(lambda p: p.is_loan and not p.loan_return_origin_id and p.state == 'done')
+        self.env['loan.event']._log_events([{
+            'event_type': 'lent',
+            'date': loan.date_done,
+            'picking_id': loan.id,
+            'partner_id': loan.loaned_to_partner_id.id,
+            'product_id': move_line.product_id.id,
+            'lot_id': move_line.lot_id.id,
+            'quantity': move_line.quantity,
+            'loan_date': loan.date_done,
+        } for loan in loans for move_line in loan.move_line_ids])
+        return res
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, models, tools
+
+from .cache_version import bump_cache_version, create_version_sequence, get_cache_version
+
+# Campos cuyo cambio altera la resolución de ubicaciones de préstamo
+WAREHOUSE_RESOLVER_FIELDS = {'warehouse_type', 'lot_stock_id', 'company_id', 'active', 'sequence'}
+LOCATION_RESOLVER_FIELDS = {'active', 'usage', 'location_id', 'company_id'}
+PARTNER_RESOLVER_FIELDS = {'dedicated_loan_location_id', 'company_id'}
+
+# Versión de la caché de resolución (ver cache_version)
+RESOLVER_VERSION_SEQUENCE = 'loan_location_resolver_version'
+
+
+class LoanLocationResolver(models.AbstractModel):
+    _name = 'loan.location.resolver'
+    _description = 'Resolución de Ubicaciones de Préstamo'
+
+    def init(self):
+        super().init()
+        create_version_sequence(self.env.cr, RESOLVER_VERSION_SEQUENCE)
+
+    @api.model
+    @tools.ormcache('self._get_cache_version()', 'company_id', 'partner_id')
+    def _resolve_location_ids(self, company_id, partner_id):
+        """Ids de ubicación (origen, destino, devolución) por compañía y cliente.
+
+        - Origen y devolución: stock del almacén principal (no de préstamos).
+        - Destino: ubicación dedicada del cliente si la tiene, si no el stock
+          del almacén de préstamos.
+        Se cachea por proceso bajo la versión vigente, que se incrementa al
+        modificar almacenes, ubicaciones o la ubicación dedicada de un cliente.
+        """
+        Warehouse = self.env['stock.warehouse'].sudo().with_context(active_test=True)
+        company_domain = [('company_id', '=', company_id)] if company_id else []
+
+        main_warehouse = Warehouse.search(company_domain + [('warehouse_type', '!=', 'loans')], limit=1)
+        if not main_warehouse and company_id:
+            # Mismo criterio que usaban los asistentes cuando no hay almacén en la compañía
+            main_warehouse = Warehouse.search([('warehouse_type', '!=', 'loans')], limit=1)
+
+        destination = self.env['stock.location']
+        if partner_id:
+            destination = self.env['res.partner'].sudo().browse(partner_id).dedicated_loan_location_id
+        if not destination:
+            loan_warehouse = Warehouse.search(company_domain + [('warehouse_type', '=', 'loans')], limit=1)
+            destination = loan_warehouse.lot_stock_id
+
+        main_stock_id = main_warehouse.lot_stock_id.id or False
+        return main_stock_id, destination.id or False, main_stock_id
+
+    @api.model
+    def resolve(self, company=None, partner=None):
+        """Ubicaciones de préstamo como registros: {'source', 'destination', 'return'}"""
+        company = company or self.env.company
+        source_id, destination_id, return_id = self._resolve_location_ids(
+            company.id, partner.id if partner else False
+        )
+        Location = self.env['stock.location']
+        return {
+            'source': Location.browse(source_id),
+            'destination': Location.browse(destination_id),
+            'return': Location.browse(return_id),
+        }
+
+    @api.model
+    def _get_cache_version(self):
+        return get_cache_version(self.env, RESOLVER_VERSION_SEQUENCE)
+
+    @api.model
+    def _invalidate_cache(self):
+        bump_cache_version(self.env, RESOLVER_VERSION_SEQUENCE)
+
+
+class StockWarehouse(models.Model):
+    _inherit = 'stock.warehouse'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['loan.location.resolver']._invalidate_cache()
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if WAREHOUSE_RESOLVER_FIELDS.intersection(vals):
+            self.env['loan.location.resolver']._invalidate_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['loan.location.resolver']._invalidate_cache()
+        return res
+
+
+class StockLocation(models.Model):
+    _inherit = 'stock.location'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if LOCATION_RESOLVER_FIELDS.intersection(vals):
+            self.env['loan.location.resolver']._invalidate_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['loan.location.resolver']._invalidate_cache()
+        return res
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if PARTNER_RESOLVER_FIELDS.intersection(vals):
+            self.env['loan.location.resolver']._invalidate_cache()
+        return res
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, fields, models, modules, Command, _
+from odoo.exceptions import UserError
+import logging
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_NOTIFICATION_BATCH_SIZE = 200
+
+
+class LoanNotificationJob(models.Model):
+    _name = 'loan.notification.job'
+    _description = 'Envío de Notificaciones de Préstamos en Segundo Plano'
+    _order = 'create_date desc, id desc'
+
+    name = fields.Char(
+        string='Referencia',
+        required=True,
+        readonly=True,
+        copy=False,
+        default=lambda self: _('Nuevo')
+    )
+
+    notification_type = fields.Selection(
+        selection=lambda self: self.env['loan.notification.wizard']._fields['notification_type'].selection,
+        string='Tipo de Notificación',
+        required=True,
+        readonly=True
+    )
+
+    template_id = fields.Many2one(
+        'mail.template',
+        string='Plantilla de Email',
+        required=True,
+        readonly=True,
+        ondelete='restrict'
+    )
+
+    user_id = fields.Many2one(
+        'res.users',
+        string='Solicitado por',
+        default=lambda self: self.env.user,
+        readonly=True
+    )
+
+    picking_ids = fields.Many2many(
+        'stock.picking',
+        'loan_notification_job_picking_rel',
+        'job_id',
+        'picking_id',
+        string='Préstamos',
+        readonly=True
+    )
+
+    pending_picking_ids = fields.Many2many(
+        'stock.picking',
+        'loan_notification_job_pending_rel',
+        'job_id',
+        'picking_id',
+        string='Préstamos Pendientes',
+        readonly=True
+    )
+
+    state = fields.Selection([
+        ('queued', 'En Cola'),
+        ('running', 'Procesando'),
+        ('done', 'Completado'),
+        ('failed', 'Fallido'),
+    ], string='Estado', default='queued', required=True, readonly=True)
+
+    total_count = fields.Integer(string='Total', readonly=True)
+    sent_count = fields.Integer(string='Emails Encolados', readonly=True)
+    skipped_count = fields.Integer(
+        string='Omitidos',
+        readonly=True,
+        help="Préstamos cuyo cliente no tiene email"
+    )
+
+    progress = fields.Float(
+        string='Progreso',
+        compute='_compute_progress',
+        help="Porcentaje de préstamos procesados"
+    )
+
+    date_done = fields.Datetime(string='Fecha de Finalización', readonly=True)
+    error_message = fields.Text(string='Error', readonly=True)
+
+    @api.depends('total_count', 'sent_count', 'skipped_count')
+    def _compute_progress(self):
+        for job in self:
+            processed = job.sent_count + job.skipped_count
+            job.progress = (processed / job.total_count * 100.0) if job.total_count else 100.0
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get('name', _('Nuevo')) == _('Nuevo'):
+                vals['name'] = self.env['ir.sequence'].next_by_code('loan.notification.job') or _('Nuevo')
+        return super().create(vals_list)
+
+    @api.model
+    def _enqueue(self, notification_type, loans):
+        """Crear un trabajo de envío y despertar el cron que lo procesa"""
+        template = self.env.ref('product_loans.mail_template_loan_notification', raise_if_not_found=False)
+        if not template:
+            raise UserError(_("No se encontró la plantilla de email para notificaciones de préstamos."))
+
+        job = self.create({
+            'notification_type': notification_type,
+            'template_id': template.id,
+            'picking_ids': [Command.set(loans.ids)],
+            'pending_picking_ids': [Command.set(loans.ids)],
+            'total_count': len(loans),
+        })
+        self.env.ref('product_loans.cron_process_loan_notification_jobs')._trigger()
+        return job
+
+    def _get_batch_size(self):
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'product_loans.notification_batch_size', DEFAULT_NOTIFICATION_BATCH_SIZE
+        ))
+
+    def _process_batch(self, batch_size):
+        """Renderizar y encolar un lote de emails con una sola llamada a la plantilla"""
+        self.ensure_one()
+        batch = self.pending_picking_ids[:batch_size]
+        # Una lectura para todo el lote en lugar de una por préstamo
+        recipients = batch.filtered(lambda loan: loan.loaned_to_partner_id.email)
+
+        if recipients:
+            self.template_id.with_context(notification_type=self.notification_type).send_mail_batch(
+                recipients.ids,
+                email_layout_xmlid='mail.mail_notification_light',
+            )
+
+        vals = {
+            'state': 'running',
+            'sent_count': self.sent_count + len(recipients),
+            'skipped_count': self.skipped_count + len(batch) - len(recipients),
+            'pending_picking_ids': [Command.unlink(loan_id) for loan_id in batch.ids],
+        }
+        if len(batch) == len(self.pending_picking_ids):
+            vals.update({'state': 'done', 'date_done': fields.Datetime.now()})
+        self.write(vals)
+
+    @api.model
+    def _cron_process_notification_jobs(self):
+        """Procesar trabajos en cola por lotes, confirmando tras cada lote"""
+        jobs = self.search([('state', 'in', ('queued', 'running'))], order='id')
+        for job in jobs:
+            batch_size = job._get_batch_size()
+            while job.state in ('queued', 'running'):
+                try:
+                    with self.env.cr.savepoint():
+                        job._process_batch(batch_size)
+                except Exception as e:
+                    _logger.exception("Error procesando el envío de notificaciones %s", job.name)
+                    job.write({'state': 'failed', 'error_message': str(e)})
+                # Hacer visible el progreso y no perder lotes ya encolados
+                if not modules.module.current_test:
+                    self.env.cr.commit()
+
+    def action_retry(self):
+        """Reanudar un envío fallido desde los préstamos pendientes"""
+        self.filtered(lambda job: job.state == 'failed').write({
+            'state': 'queued',
+            'error_message': False,
+        })
+        self.env.ref('product_loans.cron_process_loan_notification_jobs')._trigger()
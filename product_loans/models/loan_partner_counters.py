@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+from collections import defaultdict
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+import logging
+
+from .loan_stock_reservation import ACTIVE_TRACKING_STATUSES
+
+_logger = logging.getLogger(__name__)
+
+# Campos de loan.tracking.detail que alteran los contadores del cliente
+LOAN_COUNTER_FIELDS = {'status', 'quantity', 'original_cost', 'partner_id', 'picking_id'}
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    loan_open_items = fields.Float(
+        string='Artículos en Préstamo',
+        digits='Product Unit of Measure',
+        readonly=True,
+        copy=False,
+        default=0.0,
+        help="Contador acumulado de unidades prestadas pendientes de resolución"
+    )
+
+    loan_open_value = fields.Float(
+        string='Valor en Préstamo',
+        digits='Product Price',
+        readonly=True,
+        copy=False,
+        default=0.0,
+        help="Contador acumulado del costo original de las unidades prestadas"
+    )
+
+    loan_overdue_items = fields.Integer(
+        string='Artículos Vencidos',
+        readonly=True,
+        copy=False,
+        default=0,
+        help="Detalles de préstamo vencidos. Depende de la fecha, por lo que "
+             "solo lo actualiza el recálculo diario"
+    )
+
+    @api.model
+    def _apply_loan_counter_deltas(self, deltas):
+        """Aplicar incrementos {partner_id: [items, value]} en SQL.
+
+        Se usa UPDATE relativo para que dos transacciones que modifican el
+        mismo cliente no se pisen y el costo sea constante por cliente.
+        Los vencidos no se incrementan: cambian con la fecha y no con las
+        escrituras, así que los fija ``_recompute_loan_counters``.
+        """
+        deltas = {
+            partner_id: delta for partner_id, delta in deltas.items()
+            if partner_id and any(delta)
+        }
+        if not deltas:
+            return
+        # Orden fijo de actualización para evitar deadlocks entre sesiones
+        for partner_id in sorted(deltas):
+            items, value = deltas[partner_id]
+            self.env.cr.execute("""
+                UPDATE res_partner
+                   SET loan_open_items = COALESCE(loan_open_items, 0) + %s,
+                       loan_open_value = COALESCE(loan_open_value, 0) + %s
+                 WHERE id = %s
+            """, (items, value, partner_id))
+        self.browse(list(deltas)).invalidate_recordset(['loan_open_items', 'loan_open_value'])
+
+    @api.model
+    def _recompute_loan_counters(self):
+        """Recalcular todos los contadores desde los detalles de seguimiento.
+
+        Llamado por el cron diario (los vencimientos dependen de la fecha) y
+        en la instalación; corrige además cualquier desviación acumulada.
+        """
+        self.env['loan.tracking.detail'].flush_model()
+        today = fields.Date.context_today(self)
+        self.env.cr.execute("""
+            WITH counters AS (
+                SELECT partner_id,
+                       SUM(quantity) AS items,
+                       SUM(quantity * COALESCE(original_cost, 0)) AS value,
+                       COUNT(*) FILTER (WHERE expected_return_date < %s) AS overdue
+                  FROM loan_tracking_detail
+                 WHERE status IN %s
+                   AND partner_id IS NOT NULL
+              GROUP BY partner_id
+            )
+            UPDATE res_partner partner
+               SET loan_open_items = source.items,
+                   loan_open_value = source.value,
+                   loan_overdue_items = source.overdue
+              FROM (
+                    SELECT target.id,
+                           COALESCE(counters.items, 0) AS items,
+                           COALESCE(counters.value, 0) AS value,
+                           COALESCE(counters.overdue, 0) AS overdue
+                      FROM res_partner target
+                 LEFT JOIN counters ON counters.partner_id = target.id
+                     WHERE counters.partner_id IS NOT NULL
+                        OR target.loan_open_items != 0
+                        OR target.loan_open_value != 0
+                        OR target.loan_overdue_items != 0
+                   ) source
+             WHERE partner.id = source.id
+        """, (today, ACTIVE_TRACKING_STATUSES))
+        _logger.info("Contadores de préstamos recalculados para %s clientes", self.env.cr.rowcount)
+        self.invalidate_model(['loan_open_items', 'loan_open_value', 'loan_overdue_items'])
+
+    def _check_loan_limits(self, extra_items=0.0, extra_value=0.0):
+        """Validar límites del cliente usando los contadores acumulados"""
+        for partner in self:
+            if partner.max_loan_items and partner.loan_open_items + extra_items > partner.max_loan_items:
+                raise UserError(_(
+                    f"El cliente {partner.name} excede su límite de artículos en préstamo.\n"
+                    f"- Límite: {partner.max_loan_items}\n"
+                    f"- En préstamo: {partner.loan_open_items}\n"
+                    f"- Nuevo préstamo: {extra_items}"
+                ))
+            if partner.max_loan_value and partner.loan_open_value + extra_value > partner.max_loan_value:
+                raise UserError(_(
+                    f"El cliente {partner.name} excede su límite de valor en préstamo.\n"
+                    f"- Límite: {partner.max_loan_value}\n"
+                    f"- En préstamo: {partner.loan_open_value}\n"
+                    f"- Nuevo préstamo: {extra_value}"
+                ))
+
+
+class LoanTrackingDetail(models.Model):
+    _inherit = 'loan.tracking.detail'
+
+    def _get_loan_counter_contribution(self):
+        """Aporte de estos detalles a los contadores: {partner_id: [items, value]}"""
+        contributions = defaultdict(lambda: [0.0, 0.0])
+        for detail in self:
+            if detail.status not in ACTIVE_TRACKING_STATUSES or not detail.partner_id:
+                continue
+            contribution = contributions[detail.partner_id.id]
+            contribution[0] += detail.quantity
+            contribution[1] += detail.quantity * (detail.original_cost or 0.0)
+        return contributions
+
+    @staticmethod
+    def _diff_loan_counters(after, before):
+        deltas = defaultdict(lambda: [0.0, 0.0])
+        for sign, contributions in ((1, after), (-1, before)):
+            for partner_id, (items, value) in contributions.items():
+                delta = deltas[partner_id]
+                delta[0] += sign * items
+                delta[1] += sign * value
+        return deltas
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['res.partner']._apply_loan_counter_deltas(records._get_loan_counter_contribution())
+        return records
+
+    def write(self, vals):
+        if not LOAN_COUNTER_FIELDS.intersection(vals):
+            return super().write(vals)
+        before = self._get_loan_counter_contribution()
+        res = super().write(vals)
+        after = self._get_loan_counter_contribution()
+        self.env['res.partner']._apply_loan_counter_deltas(self._diff_loan_counters(after, before))
+        return res
+
+    def unlink(self):
+        before = self._get_loan_counter_contribution()
+        res = super().unlink()
+        self.env['res.partner']._apply_loan_counter_deltas(self._diff_loan_counters({}, before))
+        return res
+
+
+class StockPicking(models.Model):
+    _inherit = 'stock.picking'
+
+    def _check_loan_partner_limits(self):
+        """Validar límites por cliente en O(1) con los contadores acumulados"""
+        totals = defaultdict(lambda: [0.0, 0.0])
+        for picking in self:
+            partner = picking.loaned_to_partner_id
+            if not partner:
+                continue
+            for move_line in picking.move_line_ids:
+                total = totals[partner]
+                total[0] += move_line.quantity
+                total[1] += move_line.quantity * move_line.product_id.standard_price
+        for partner, (items, value) in totals.items():
+            partner._check_loan_limits(items, value)
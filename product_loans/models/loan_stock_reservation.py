@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, models, _
+from odoo.exceptions import UserError
+from psycopg2 import errors as pg_errors
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Espacio de nombres para los advisory locks del módulo ('LOAN' en ASCII),
+# evita colisiones con locks tomados por otros módulos sobre la misma clave.
+LOAN_LOCK_NAMESPACE = 0x4C4F414E
+
+ACTIVE_TRACKING_STATUSES = ('active', 'pending_resolution')
+
+
+class LoanStockReservation(models.AbstractModel):
+    _name = 'loan.stock.reservation'
+    _description = 'Reserva Concurrente de Stock para Préstamos'
+
+    @api.model
+    def _lock_key(self, product_id, lot_id=False):
+        """Clave textual del lock para un par (producto, lote)"""
+        return f"product_loans:{product_id}:{lot_id or 0}"
+
+    @api.model
+    def _acquire_locks(self, keys):
+        """Tomar advisory locks transaccionales por (producto, lote).
+
+        Si otra sesión tiene la clave se espera a que termine su transacción:
+        dos usuarios que prestan el mismo producto se atienden por turnos.
+        Las claves se ordenan antes de bloquear para que dos sesiones que
+        presten los mismos productos no se bloqueen mutuamente (deadlock).
+        Los locks se liberan automáticamente al terminar la transacción.
+        """
+        lock_keys = sorted({self._lock_key(product_id, lot_id) for product_id, lot_id in keys})
+        for lock_key in lock_keys:
+            self.env.cr.execute(
+                "SELECT pg_advisory_xact_lock(%s, hashtext(%s))",
+                (LOAN_LOCK_NAMESPACE, lock_key)
+            )
+        return lock_keys
+
+    @api.model
+    def _lock_rows(self, table, ids, message):
+        """Bloquear filas con FOR UPDATE NOWAIT dentro de un savepoint.
+
+        Con aislamiento REPEATABLE READ, si otra transacción modificó y confirmó
+        alguna fila después de nuestro snapshot PostgreSQL lanza un error de
+        serialización; en ambos casos se informa al usuario sin abortar el cursor.
+        """
+        if not ids:
+            return
+        try:
+            with self.env.cr.savepoint(flush=False):
+                self.env.cr.execute(
+                    f'SELECT id FROM "{table}" WHERE id IN %s ORDER BY id FOR UPDATE NOWAIT',
+                    (tuple(ids),)
+                )
+        except (pg_errors.LockNotAvailable, pg_errors.SerializationFailure):
+            raise UserError(message)
+
+    @api.model
+    def lock_tracking_details(self, tracking_details):
+        """Reservar detalles de seguimiento antes de resolverlos o devolverlos.
+
+        Impide que dos asistentes abiertos sobre el mismo préstamo procesen
+        las mismas líneas. Tras obtener el lock se invalida la caché para que
+        las validaciones posteriores lean el estado real de la base de datos.
+        """
+        tracking_details = tracking_details.exists()
+        if not tracking_details:
+            return tracking_details
+        tracking_details.flush_recordset()
+        self._lock_rows(
+            'loan_tracking_detail',
+            tracking_details.ids,
+            _("Otro usuario está procesando este préstamo en este momento. "
+              "Cierre el asistente y vuelva a abrirlo para ver el estado actualizado.")
+        )
+        tracking_details.invalidate_recordset()
+        return tracking_details
+
+    @api.model
+    def reserve_loan_move_lines(self, move_lines):
+        """Reservar los pares (producto, lote) de un préstamo a validar.
+
+        1. Advisory lock por (producto, lote): solo se serializan las sesiones
+           que prestan lo mismo, nunca el almacén completo.
+        2. Lock de los quants de origen: si otra sesión ya movió la serie o
+           consumió la cantidad, PostgreSQL lo detecta en lugar de duplicarla.
+        3. Verificación de que cada serie no esté ya en otro préstamo activo.
+        """
+        move_lines = move_lines.filtered(lambda ml: ml.product_id)
+        if not move_lines:
+            return
+
+        self._acquire_locks([(ml.product_id.id, ml.lot_id.id) for ml in move_lines])
+
+        self.env['stock.quant'].flush_model()
+        quant_ids = set()
+        for ml in move_lines:
+            quants = self.env['stock.quant']._gather(
+                ml.product_id, ml.location_id, lot_id=ml.lot_id, strict=True
+            )
+            quant_ids.update(quants.ids)
+        self._lock_rows(
+            'stock_quant',
+            list(quant_ids),
+            _("El stock de alguno de los productos acaba de ser modificado por otro usuario. "
+              "Actualice el préstamo y vuelva a validarlo.")
+        )
+
+        lots = move_lines.lot_id
+        if not lots:
+            return
+        pickings = move_lines.picking_id
+        self.env['loan.tracking.detail'].flush_model(['lot_id', 'status', 'picking_id'])
+        self.env.cr.execute("""
+            SELECT lot.name, picking.name
+              FROM loan_tracking_detail detail
+              JOIN stock_lot lot ON lot.id = detail.lot_id
+              JOIN stock_picking picking ON picking.id = detail.picking_id
+             WHERE detail.lot_id IN %s
+               AND detail.status IN %s
+               AND detail.picking_id NOT IN %s
+        """, (tuple(lots.ids), ACTIVE_TRACKING_STATUSES, tuple(pickings.ids) or (0,)))
+        busy = self.env.cr.fetchall()
+        if busy:
+            raise UserError(_(
+                "Los siguientes números de serie ya están prestados:\n%s",
+                "\n".join(f"- {lot_name} ({picking_name})" for lot_name, picking_name in busy)
+            ))
+
+
+class StockPicking(models.Model):
+    _inherit = 'stock.picking'
+
+    def _action_done(self):
+        """Reservar stock de forma concurrente antes de validar préstamos"""
+        loans = self.filtered(lambda p: p.is_loan and not p.loan_return_origin_id)
+        if loans:
+            self.env['loan.stock.reservation'].reserve_loan_move_lines(loans.move_line_ids)
+            loans._check_loan_partner_limits()
+        return super()._action_done()
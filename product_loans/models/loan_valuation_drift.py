@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, fields, models
+from odoo.tools import SQL
+import logging
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_SIGNIFICANT_DIFFERENCE = 10.0
+
+
+class LoanValuationTracker(models.Model):
+    _inherit = 'loan.valuation.tracker'
+
+    # Valores almacenados: se actualizan en bloque por el cron en lugar de
+    # calcularse registro por registro en cada renderizado de la lista.
+    current_cost = fields.Float(
+        string='Costo Actual',
+        compute=False,
+        store=True,
+        readonly=True,
+        digits='Product Price',
+        help="Último costo unitario registrado en la valoración de inventario"
+    )
+
+    valuation_difference = fields.Float(
+        string='Diferencia de Valoración',
+        compute=False,
+        store=True,
+        readonly=True,
+        digits='Product Price',
+        help="Costo actual menos costo original"
+    )
+
+    is_significant_difference = fields.Boolean(
+        string='Diferencia Significativa',
+        readonly=True,
+        index=True,
+        help="La diferencia supera el umbral configurado en "
+             "product_loans.valuation_significant_threshold"
+    )
+
+    valuation_refresh_date = fields.Datetime(
+        string='Última Actualización de Costo',
+        readonly=True
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._refresh_valuation_drift()
+        return records
+
+    @api.model
+    def _get_significant_threshold(self):
+        return float(self.env['ir.config_parameter'].sudo().get_param(
+            'product_loans.valuation_significant_threshold', DEFAULT_SIGNIFICANT_DIFFERENCE
+        ))
+
+    def _refresh_valuation_drift(self):
+        """Actualizar costo actual, diferencia y umbral con una sola consulta.
+
+        Toma el costo unitario de la última capa de valoración con cantidad de
+        cada producto en la compañía del préstamo; las capas de revaluación o
+        de costos en destino (cantidad 0) no fijan el costo. Sin capas se
+        conserva el costo vigente. Solo se escriben las filas cuyo valor
+        cambió. Sin registros en self se procesan todos los seguimientos no
+        resueltos.
+        """
+        self.env['stock.valuation.layer'].flush_model(['product_id', 'company_id', 'quantity', 'unit_cost'])
+        self.flush_model()
+
+        def selected(alias):
+            if self:
+                return SQL("%s = ANY(%s)", SQL.identifier(alias, 'id'), self.ids)
+            return SQL("NOT COALESCE(%s, FALSE)", SQL.identifier(alias, 'is_resolved'))
+
+        threshold = self._get_significant_threshold()
+        rows = self.env.execute_query(SQL("""
+            WITH latest_cost AS (
+                SELECT DISTINCT ON (layer.product_id, layer.company_id)
+                       layer.product_id, layer.company_id, layer.unit_cost
+                  FROM stock_valuation_layer layer
+                 WHERE layer.quantity <> 0
+                   AND layer.product_id IN (
+                        SELECT pending.product_id FROM loan_valuation_tracker pending WHERE %(pending)s
+                       )
+              ORDER BY layer.product_id, layer.company_id, layer.create_date DESC, layer.id DESC
+            ),
+            drift AS (
+                SELECT tracker.id,
+                       COALESCE(latest_cost.unit_cost, tracker.current_cost, tracker.original_cost, 0) AS cost,
+                       COALESCE(tracker.original_cost, 0) AS original
+                  FROM loan_valuation_tracker tracker
+                  JOIN stock_picking picking ON picking.id = tracker.picking_id
+             LEFT JOIN latest_cost ON latest_cost.product_id = tracker.product_id
+                                  AND latest_cost.company_id = picking.company_id
+                 WHERE NOT COALESCE(tracker.is_resolved, FALSE)
+                   AND %(selected)s
+            )
+            UPDATE loan_valuation_tracker tracker
+               SET current_cost = drift.cost,
+                   valuation_difference = drift.cost - drift.original,
+                   is_significant_difference = ABS(drift.cost - drift.original) > %(threshold)s,
+                   valuation_refresh_date = NOW() AT TIME ZONE 'UTC'
+              FROM drift
+             WHERE tracker.id = drift.id
+               AND (tracker.current_cost IS DISTINCT FROM drift.cost
+                    OR tracker.valuation_difference IS DISTINCT FROM drift.cost - drift.original
+                    OR tracker.is_significant_difference IS DISTINCT FROM
+                       (ABS(drift.cost - drift.original) > %(threshold)s))
+         RETURNING tracker.id
+        """, pending=selected('pending'), selected=selected('tracker'), threshold=threshold))
+        _logger.info("Valoración de préstamos actualizada en %s seguimientos", len(rows))
+        self.invalidate_model([
+            'current_cost', 'valuation_difference', 'is_significant_difference', 'valuation_refresh_date',
+        ])
+
+    @api.model
+    def _cron_refresh_valuation_drift(self):
+        self.browse()._refresh_valuation_drift()
+
+    def action_refresh_valuation(self):
+        """Actualizar la valoración desde la lista"""
+        self.browse()._refresh_valuation_drift()
+        return {'type': 'ir.actions.client', 'tag': 'reload'}
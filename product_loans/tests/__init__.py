@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+
+from . import test_loan_stock_reservation
+from . import test_loan_benchmarks
+from . import test_loan_event
+from . import test_loan_resolution_wizard
+from . import test_loan_due_scheduler
+from . import test_loan_return_wizard
+from . import test_loan_partner_counters
+from . import test_loan_location_resolver
+from . import test_loan_notification_job
+from . import test_loan_valuation_drift
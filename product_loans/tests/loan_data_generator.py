@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+import random
+from datetime import timedelta
+
+from odoo import Command, fields
+
+# Distribución de estados de los detalles de seguimiento observada en producción
+STATUS_DISTRIBUTION = [
+    ('active', 0.55),
+    ('pending_resolution', 0.10),
+    ('sold', 0.15),
+    ('returned_good', 0.12),
+    ('returned_damaged', 0.05),
+    ('returned_defective', 0.03),
+]
+
+OVERDUE_RATIO = 0.20
+TRIAL_RATIO = 0.15
+MAX_ITEMS_PER_LOAN = 6
+
+
+class LoanDataGenerator:
+    """Generador de volumen para pruebas de rendimiento de préstamos.
+
+    Crea clientes, productos con número de serie y préstamos validados con
+    sus detalles de seguimiento, usando creaciones en lote. El estado
+    'done' de pickings y movimientos se fija por SQL: el objetivo es medir
+    la lógica de préstamos, no la validación estándar de inventario.
+    """
+
+    def __init__(self, env, seed=42):
+        self.env = env
+        self.random = random.Random(seed)
+        self.today = fields.Date.context_today(env['res.partner'])
+
+    def generate(self, partners=100, products=50, loans=500):
+        partner_records = self._create_partners(partners)
+        product_records = self._create_products(products)
+        loan_records = self._create_loans(partner_records, product_records, loans)
+        self.env.flush_all()
+        self.env.invalidate_all()
+        return {
+            'partners': partner_records,
+            'products': product_records,
+            'loans': loan_records,
+        }
+
+    def _create_partners(self, count):
+        return self.env['res.partner'].create([{
+            'name': f'Cliente Préstamo {index:05d}',
+            'email': f'cliente{index:05d}@example.com',
+            'is_company': True,
+        } for index in range(count)])
+
+    def _create_products(self, count):
+        return self.env['product.product'].create([{
+            'name': f'Equipo Demo {index:04d}',
+            'default_code': f'LOAN-{index:04d}',
+            'type': 'consu',
+            'is_storable': True,
+            'tracking': 'serial',
+            'list_price': self.random.randint(100, 5000),
+            'standard_price': self.random.randint(50, 3000),
+        } for index in range(count)])
+
+    def _get_locations(self):
+        company = self.env.company
+        main_warehouse = self.env['stock.warehouse'].search([
+            ('company_id', '=', company.id), ('warehouse_type', '!=', 'loans')
+        ], limit=1)
+        loan_warehouse = self.env['stock.warehouse'].search([
+            ('company_id', '=', company.id), ('warehouse_type', '=', 'loans')
+        ], limit=1)
+        if not loan_warehouse:
+            loan_warehouse = self.env['stock.warehouse'].create({
+                'name': 'Almacén Préstamos Benchmark',
+                'code': 'LBNC',
+                'warehouse_type': 'loans',
+                'company_id': company.id,
+            })
+        return main_warehouse, loan_warehouse
+
+    def _pick_status(self):
+        threshold = self.random.random()
+        cumulative = 0.0
+        for status, ratio in STATUS_DISTRIBUTION:
+            cumulative += ratio
+            if threshold <= cumulative:
+                return status
+        return STATUS_DISTRIBUTION[0][0]
+
+    @staticmethod
+    def _loan_state(statuses, in_trial):
+        open_items = [s for s in statuses if s in ('active', 'pending_resolution')]
+        if not open_items:
+            return 'completed'
+        if len(open_items) < len(statuses):
+            return 'partially_resolved'
+        return 'in_trial' if in_trial else 'active'
+
+    def _create_loans(self, partners, products, count):
+        main_warehouse, loan_warehouse = self._get_locations()
+        picking_type = main_warehouse.out_type_id
+        source = main_warehouse.lot_stock_id
+        destination = loan_warehouse.lot_stock_id
+
+        # Una serie por unidad prestada, creadas todas de una vez
+        product_list = list(products)
+        plan = []
+        for index in range(count):
+            items = self.random.sample(product_list, self.random.randint(1, min(MAX_ITEMS_PER_LOAN, len(product_list))))
+            statuses = [self._pick_status() for _product in items]
+            loan_date = self.today - timedelta(days=self.random.randint(1, 120))
+            if self.random.random() < OVERDUE_RATIO:
+                expected = self.today - timedelta(days=self.random.randint(1, 30))
+            else:
+                expected = self.today + timedelta(days=self.random.randint(0, 30))
+            plan.append((index, self.random.choice(partners), items, statuses, loan_date, expected,
+                         self.random.random() < TRIAL_RATIO))
+
+        lots = self.env['stock.lot'].create([{
+            'name': f'SN-{index:06d}-{position}',
+            'product_id': product.id,
+            'company_id': self.env.company.id,
+        } for index, _partner, items, *_rest in plan for position, product in enumerate(items)])
+        lot_iter = iter(lots)
+        lots_by_loan = [[next(lot_iter) for _product in items] for _index, _partner, items, *_rest in plan]
+
+        pickings = self.env['stock.picking'].create([{
+            'picking_type_id': picking_type.id,
+            'location_id': source.id,
+            'location_dest_id': destination.id,
+            'partner_id': partner.id,
+            'is_loan': True,
+            'loaned_to_partner_id': partner.id,
+            'loan_expected_return_date': expected,
+            'trial_end_date': expected if in_trial else False,
+            'origin': f'Benchmark {index:06d}',
+            'move_ids_without_package': [Command.create({
+                'name': product.display_name,
+                'product_id': product.id,
+                'product_uom_qty': 1.0,
+                'product_uom': product.uom_id.id,
+                'location_id': source.id,
+                'location_dest_id': destination.id,
+                'move_line_ids': [Command.create({
+                    'product_id': product.id,
+                    'lot_id': lot.id,
+                    'quantity': 1.0,
+                    'location_id': source.id,
+                    'location_dest_id': destination.id,
+                })],
+            }) for product, lot in zip(items, loan_lots)],
+        } for (index, partner, items, _statuses, _loan_date, expected, in_trial), loan_lots
+            in zip(plan, lots_by_loan)])
+
+        self.env.flush_all()
+        self.env.cr.execute("UPDATE stock_move SET state = 'done', picked = TRUE WHERE picking_id IN %s",
+                            (tuple(pickings.ids),))
+        self.env.cr.execute("UPDATE stock_move_line SET state = 'done', picked = TRUE WHERE picking_id IN %s",
+                            (tuple(pickings.ids),))
+        self.env.invalidate_all()
+
+        detail_vals = []
+        for picking, (index, partner, items, statuses, loan_date, expected, in_trial), loan_lots in zip(
+                pickings, plan, lots_by_loan):
+            picking.write({
+                'state': 'done',
+                'date_done': fields.Datetime.to_datetime(loan_date),
+                'loan_state': self._loan_state(statuses, in_trial),
+            })
+            for product, lot, status in zip(items, loan_lots, statuses):
+                resolved = status not in ('active', 'pending_resolution')
+                detail_vals.append({
+                    'picking_id': picking.id,
+                    'partner_id': partner.id,
+                    'product_id': product.id,
+                    'lot_id': lot.id,
+                    'quantity': 1.0,
+                    'status': status,
+                    'loan_date': fields.Datetime.to_datetime(loan_date),
+                    'expected_return_date': expected,
+                    'original_cost': product.standard_price,
+                    'resolution_date': fields.Datetime.now() if resolved else False,
+                })
+        self.env['loan.tracking.detail'].create(detail_vals)
+        return pickings
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+from .loan_data_generator import LoanDataGenerator
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install', '-standard', 'loan_benchmark')
+class TestLoanBenchmarks(TransactionCase):
+    """Mediciones de consultas y tiempos del ciclo de préstamos a volumen.
+
+    No corre con la suite estándar. Ejecutar con:
+        odoo-bin -d <db> -i product_loans --test-tags loan_benchmark
+    El volumen se escala con PRODUCT_LOANS_BENCHMARK_SCALE (por defecto 1).
+    """
+
+    PARTNERS = 200
+    PRODUCTS = 50
+    LOANS = 1000
+    MASS_RESOLUTION_LOANS = 20
+
+    # Máximo de consultas por medición. Las mediciones sin presupuesto solo
+    # se reportan; al fijar uno, superarlo hace fallar la prueba.
+    QUERY_BUDGETS = {
+        'resolution_wizard.default_get': 20,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        scale = float(os.environ.get('PRODUCT_LOANS_BENCHMARK_SCALE', 1))
+        started = time.perf_counter()
+        cls.data = LoanDataGenerator(cls.env).generate(
+            partners=int(cls.PARTNERS * scale),
+            products=int(cls.PRODUCTS * scale),
+            loans=int(cls.LOANS * scale),
+        )
+        cls.results = []
+        _logger.info(
+            "Datos de benchmark generados en %.2fs: %s clientes, %s productos, %s préstamos",
+            time.perf_counter() - started,
+            len(cls.data['partners']), len(cls.data['products']), len(cls.data['loans']),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        lines = [f"{'Medición':<40} {'Consultas':>10} {'Tiempo (ms)':>12}"]
+        lines += [f"{name:<40} {queries:>10} {elapsed * 1000:>12.1f}" for name, queries, elapsed in cls.results]
+        _logger.info("Resultados de benchmark de préstamos:\n%s", "\n".join(lines))
+        super().tearDownClass()
+
+    @contextmanager
+    def _measure(self, name):
+        """Medir consultas SQL y tiempo, incluyendo las escrituras pendientes"""
+        self.env.invalidate_all()
+        queries_before = self.env.cr.sql_log_count
+        started = time.perf_counter()
+        yield
+        self.env.flush_all()
+        elapsed = time.perf_counter() - started
+        queries = self.env.cr.sql_log_count - queries_before
+        self.results.append((name, queries, elapsed))
+        budget = self.QUERY_BUDGETS.get(name)
+        if budget is not None:
+            self.assertLessEqual(queries, budget, f"{name}: {queries} consultas, presupuesto {budget}")
+
+    def _open_loans(self):
+        return self.data['loans'].filtered(
+            lambda loan: loan.loan_state in ('active', 'in_trial', 'partially_resolved')
+        )
+
+    def _largest_open_loan(self):
+        return max(self._open_loans(), key=lambda loan: len(loan.move_ids_without_package))
+
+    def test_resolution_wizard_default_get(self):
+        loan = self._largest_open_loan()
+        Wizard = self.env['loan.resolution.wizard'].with_context(active_id=loan.id)
+        fields_list = list(Wizard._fields)
+        with self._measure('resolution_wizard.default_get'):
+            values = Wizard.default_get(fields_list)
+        self.assertTrue(values.get('resolution_line_ids'))
+
+    def test_mass_resolution(self):
+        loans = self._open_loans()[:self.MASS_RESOLUTION_LOANS]
+        wizards = self.env['loan.resolution.wizard']
+        for loan in loans:
+            Wizard = self.env['loan.resolution.wizard'].with_context(active_id=loan.id)
+            values = Wizard.default_get(list(Wizard._fields))
+            if not values.get('resolution_line_ids'):
+                continue
+            values['picking_id'] = loan.id
+            # Devolver la mitad de las líneas y mantener el resto en préstamo
+            for position, (_command, _id, line_vals) in enumerate(values['resolution_line_ids']):
+                line_vals['resolution_type'] = 'return' if position % 2 == 0 else 'keep_loan'
+            wizards |= Wizard.create(values)
+
+        with self._measure(f'resolution_wizard.mass_resolution[{len(wizards)}]'):
+            for wizard in wizards:
+                wizard.action_process_resolution()
+
+    def test_overdue_cron(self):
+        with self._measure('stock_picking._cron_check_overdue_loans'):
+            self.env['stock.picking']._cron_check_overdue_loans()
+
+    def test_notification_wizard(self):
+        for dispatch_mode in ('queued', 'immediate'):
+            wizard = self.env['loan.notification.wizard'].create({
+                'notification_type': 'overdue',
+                'create_activities': True,
+                'send_emails': True,
+                'email_dispatch_mode': dispatch_mode,
+            })
+            with self._measure(f'notification_wizard.{dispatch_mode}'):
+                wizard.action_send_notifications()
+
+    def test_notification_job_processing(self):
+        loans = self._open_loans()
+        self.env['loan.notification.job']._enqueue('overdue', loans)
+        with self._measure(f'notification_job.cron[{len(loans)}]'):
+            self.env['loan.notification.job']._cron_process_notification_jobs()
+
+    def test_dashboard_data(self):
+        with self._measure('analytics_dashboard.get_dashboard_data'):
+            data = self.env['loan.analytics.dashboard'].get_dashboard_data()
+        self.assertTrue(data)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.addons.product_loans.models.loan_due_scheduler import MAX_AUTO_CONVERT_ATTEMPTS
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestLoanDueScheduler(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.today = fields.Date.today()
+        cls.partner = cls.env['res.partner'].create({'name': 'Cliente Vencimientos'})
+        warehouse = cls.env['stock.warehouse'].search([('company_id', '=', cls.env.company.id)], limit=1)
+        cls.picking_type = warehouse.out_type_id
+
+    def _create_loan(self, expected_days, loan_state='active'):
+        return self.env['stock.picking'].create({
+            'picking_type_id': self.picking_type.id,
+            'location_id': self.picking_type.default_location_src_id.id,
+            'location_dest_id': self.env.ref('stock.stock_location_customers').id,
+            'partner_id': self.partner.id,
+            'is_loan': True,
+            'loaned_to_partner_id': self.partner.id,
+            'loan_state': loan_state,
+            'loan_expected_return_date': self.today + timedelta(days=expected_days),
+        })
+
+    def _entries(self, loans):
+        return self.env['loan.due.date'].search([('picking_id', 'in', loans.ids)])
+
+    def test_index_follows_loan_dates(self):
+        loan = self._create_loan(10)
+        entry = self._entries(loan)
+        self.assertEqual(entry.due_type, 'expected_return')
+        self.assertEqual(entry.due_date, self.today + timedelta(days=10))
+
+        loan.write({'loan_state': 'in_trial', 'trial_end_date': self.today + timedelta(days=3)})
+        entry = self._entries(loan)
+        self.assertEqual(entry.due_type, 'trial_end')
+        self.assertEqual(entry.due_date, self.today + timedelta(days=3))
+
+        loan.write({'loan_state': 'completed'})
+        self.assertFalse(self._entries(loan))
+
+    def test_cron_only_fires_loans_in_window(self):
+        due_soon = self._create_loan(1)
+        due_later = self._create_loan(15)
+        self.env['loan.due.date']._cron_process_due_loans()
+
+        self.assertEqual(self._entries(due_soon).state, 'reminded')
+        self.assertEqual(self._entries(due_later).state, 'pending')
+        self.assertEqual(len(due_soon.activity_ids), 1)
+        self.assertFalse(due_later.activity_ids)
+
+        # Una segunda ejecución no duplica recordatorios
+        self.env['loan.due.date']._cron_process_due_loans()
+        self.assertEqual(len(due_soon.activity_ids), 1)
+
+    def test_rescheduled_loan_is_reminded_again(self):
+        loan = self._create_loan(1)
+        self.env['loan.due.date']._cron_process_due_loans()
+        loan.write({'loan_expected_return_date': self.today + timedelta(days=20)})
+        self.assertEqual(self._entries(loan).state, 'pending')
+
+    def test_disabled_trial_reminder_stays_off(self):
+        loan = self._create_loan(10)
+        loan.write({'loan_state': 'in_trial', 'trial_end_date': self.today + timedelta(days=1)})
+        self.env['loan.due.date']._configure_trial_reminder(loan)
+        loan.write({'trial_end_date': self.today + timedelta(days=2)})
+        self.env['loan.due.date']._cron_process_due_loans()
+        self.assertEqual(self._entries(loan).state, 'reminded')
+        self.assertFalse(loan.activity_ids)
+
+    def test_trial_reminder_keeps_notes(self):
+        loan = self._create_loan(10)
+        loan.write({'loan_state': 'in_trial', 'trial_end_date': self.today + timedelta(days=1)})
+        self.env['loan.due.date']._configure_trial_reminder(loan, self.env.user, 'Cliente evalúa dos unidades')
+        self.env['loan.due.date']._cron_process_due_loans()
+        self.assertIn('Cliente evalúa dos unidades', str(loan.activity_ids.note))
+        self.assertEqual(loan.activity_ids.user_id, self.env.user)
+
+    def test_failed_auto_convert_backs_off(self):
+        self.env['ir.config_parameter'].sudo().set_param('product_loans.trial_auto_convert', 'True')
+        loan = self._create_loan(10)
+        loan.write({'loan_state': 'in_trial', 'trial_end_date': self.today - timedelta(days=1)})
+        entry = self._entries(loan)
+        Wizard = self.env.registry['loan.resolution.wizard']
+        with patch.object(Wizard, 'default_get', side_effect=Exception('Sin stock para facturar')):
+            self.env['loan.due.date']._cron_process_due_loans()
+            self.assertEqual(entry.attempt_count, 1)
+            self.assertEqual(entry.next_attempt_date, self.today + timedelta(days=1))
+            self.assertIn('Sin stock para facturar', entry.last_error)
+
+            # Antes del próximo intento el cron no lo vuelve a procesar
+            self.env['loan.due.date']._cron_process_due_loans()
+            self.assertEqual(entry.attempt_count, 1)
+
+            entry.write({'attempt_count': MAX_AUTO_CONVERT_ATTEMPTS - 1, 'next_attempt_date': self.today})
+            self.env['loan.due.date']._cron_process_due_loans()
+        self.assertEqual(entry.state, 'failed')
+        self.assertFalse(entry.next_attempt_date)
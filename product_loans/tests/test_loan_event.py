@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestLoanEventAnalytics(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.partner = cls.env['res.partner'].create({'name': 'Cliente Embudo'})
+        cls.LoanEvent = cls.env['loan.event']
+
+    def _event(self, event_type, date, loan_date=None, amount=0.0):
+        return {
+            'event_type': event_type,
+            'date': date,
+            'partner_id': self.partner.id,
+            'quantity': 1.0,
+            'amount': amount,
+            'loan_date': loan_date,
+        }
+
+    def test_funnel_from_rollups(self):
+        loan_date = datetime(2025, 1, 1)
+        self.LoanEvent._log_events(
+            [self._event('lent', loan_date, loan_date) for _i in range(4)]
+            + [self._event('trial_started', datetime(2025, 1, 2), loan_date)]
+            + [self._event('sold', datetime(2025, 1, 3), loan_date, amount=100.0)]
+            + [self._event('sold', datetime(2025, 1, 11), loan_date, amount=50.0)]
+            + [self._event('returned', datetime(2025, 1, 21), loan_date)]
+        )
+        funnel = self.LoanEvent.get_conversion_funnel('2025-01-01', '2025-01-31', [self.partner.id])
+
+        self.assertEqual(funnel['counts']['lent'], 4)
+        self.assertEqual(funnel['decided'], 3)
+        self.assertAlmostEqual(funnel['conversion_rate'], 200.0 / 3)
+        self.assertAlmostEqual(funnel['sold_amount'], 150.0)
+        self.assertEqual(funnel['time_to_decision'], {'p50': 10, 'p75': 20, 'p90': 20})
+        self.assertEqual(funnel['time_to_sale']['p50'], 2)
+
+        # Ventana arbitraria: solo las decisiones de la segunda quincena
+        late = self.LoanEvent.get_conversion_funnel('2025-01-15', '2025-01-31', [self.partner.id])
+        self.assertEqual(late['counts']['lent'], 0)
+        self.assertEqual(late['counts']['returned'], 1)
+
+    def test_rollup_matches_rebuild(self):
+        loan_date = datetime(2025, 2, 1)
+        for _i in range(3):
+            self.LoanEvent._log_events([self._event('sold', datetime(2025, 2, 5), loan_date, amount=10.0)])
+        before = self.LoanEvent.get_conversion_funnel('2025-02-01', '2025-02-28', [self.partner.id])
+        self.env['loan.event.rollup']._rebuild()
+        after = self.LoanEvent.get_conversion_funnel('2025-02-01', '2025-02-28', [self.partner.id])
+        self.assertEqual(before['counts'], after['counts'])
+        self.assertEqual(after['counts']['sold'], 3)
+
+    def test_reports_read_rollups(self):
+        loan_date = datetime(2025, 4, 1)
+        self.LoanEvent._log_events(
+            [self._event('lent', loan_date, loan_date) for _i in range(3)]
+            + [self._event('sold', datetime(2025, 4, 10), loan_date, amount=80.0)]
+            + [self._event('returned', datetime(2025, 5, 2), loan_date)]
+        )
+        report = self.env['loan.conversion.report'].search([('partner_id', '=', self.partner.id)])
+        by_period = {line.period.month: line for line in report}
+        self.assertEqual(by_period[4].total_loans, 3)
+        self.assertEqual(by_period[4].converted_value, 80.0)
+        self.assertEqual(by_period[4].conversion_rate, 100.0)
+        self.assertEqual(by_period[5].returned_count, 1)
+
+        months = self.env['loan.event.rollup']._read_months(datetime(2025, 4, 1).date(), [self.partner.id])
+        self.assertEqual([(month.month, counts['lent'], counts['sold'], counts['returned'], amount)
+                          for month, counts, amount in months],
+                         [(4, 3, 1, 0, 80.0), (5, 0, 0, 1, 0.0)])
+
+    def test_events_are_append_only(self):
+        event = self.LoanEvent._log_events([self._event('lent', datetime(2025, 3, 1))])
+        with self.assertRaises(UserError):
+            event.write({'quantity': 5.0})
+        with self.assertRaises(UserError):
+            event.with_user(self.env.ref('base.user_admin')).unlink()
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestLoanLocationResolver(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Resolver = cls.env['loan.location.resolver']
+        cls.company = cls.env.company
+        cls.main_warehouse = cls.env['stock.warehouse'].search([
+            ('company_id', '=', cls.company.id), ('warehouse_type', '!=', 'loans'),
+        ], limit=1)
+        cls.loan_warehouse = cls.env['stock.warehouse'].search([
+            ('company_id', '=', cls.company.id), ('warehouse_type', '=', 'loans'),
+        ], limit=1) or cls.env['stock.warehouse'].create({
+            'name': 'Almacén Préstamos Resolución',
+            'code': 'PRES',
+            'company_id': cls.company.id,
+            'warehouse_type': 'loans',
+        })
+        cls.partner = cls.env['res.partner'].create({'name': 'Cliente Resolución'})
+
+    def test_resolve_default_locations(self):
+        locations = self.Resolver.resolve(self.company, self.partner)
+        self.assertEqual(locations['source'], self.main_warehouse.lot_stock_id)
+        self.assertEqual(locations['return'], self.main_warehouse.lot_stock_id)
+        self.assertEqual(locations['destination'], self.loan_warehouse.lot_stock_id)
+
+    def test_resolution_is_cached_until_invalidated(self):
+        self.Resolver.resolve(self.company, self.partner)
+        with self.assertQueryCount(0):
+            self.Resolver.resolve(self.company, self.partner)
+
+        # Asignar una ubicación dedicada al cliente incrementa la versión
+        version = self.Resolver._get_cache_version()
+        dedicated = self.env['stock.location'].create({
+            'name': 'Ubicación Dedicada',
+            'usage': 'internal',
+            'location_id': self.loan_warehouse.view_location_id.id,
+        })
+        self.partner.dedicated_loan_location_id = dedicated
+        self.assertGreater(self.Resolver._get_cache_version(), version)
+        self.assertEqual(self.Resolver.resolve(self.company, self.partner)['destination'], dedicated)
+
+        # Los demás clientes siguen resolviendo al almacén de préstamos
+        other = self.env['res.partner'].create({'name': 'Otro Cliente Resolución'})
+        self.assertEqual(self.Resolver.resolve(self.company, other)['destination'], self.loan_warehouse.lot_stock_id)
+
+    def test_invalidation_bumps_once_after_commit(self):
+        self.Resolver._invalidate_cache()
+        self.Resolver._invalidate_cache()
+        bumps = [callback for callback in self.env.cr.postcommit._funcs
+                 if callback.__name__ == 'bump_after_commit']
+        self.assertEqual(len(bumps), 1)
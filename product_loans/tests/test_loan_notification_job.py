@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import patch
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestLoanNotificationJob(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Job = cls.env['loan.notification.job']
+        cls.env['ir.config_parameter'].sudo().set_param('product_loans.notification_batch_size', 2)
+        warehouse = cls.env['stock.warehouse'].search([('company_id', '=', cls.env.company.id)], limit=1)
+        partners = cls.env['res.partner'].create([
+            {'name': 'Cliente Aviso 1', 'email': 'aviso1@example.com'},
+            {'name': 'Cliente Aviso 2', 'email': 'aviso2@example.com'},
+            {'name': 'Cliente Aviso Sin Email'},
+        ])
+        cls.loans = cls.env['stock.picking'].create([{
+            'picking_type_id': warehouse.out_type_id.id,
+            'location_id': warehouse.lot_stock_id.id,
+            'location_dest_id': cls.env.ref('stock.stock_location_customers').id,
+            'partner_id': partner.id,
+            'is_loan': True,
+            'loaned_to_partner_id': partner.id,
+        } for partner in partners])
+        cls.cron = cls.env.ref('product_loans.cron_process_loan_notification_jobs')
+
+    def test_enqueue_queues_and_wakes_the_cron(self):
+        triggers = self.env['ir.cron.trigger'].search_count([('cron_id', '=', self.cron.id)])
+        job = self.Job._enqueue('overdue', self.loans)
+        self.assertEqual(job.state, 'queued')
+        self.assertEqual(job.total_count, 3)
+        self.assertEqual(job.pending_picking_ids, self.loans)
+        self.assertEqual(job.template_id, self.env.ref('product_loans.mail_template_loan_notification'))
+        self.assertEqual(self.env['ir.cron.trigger'].search_count([('cron_id', '=', self.cron.id)]), triggers + 1)
+
+    def test_process_batches(self):
+        job = self.Job._enqueue('overdue', self.loans)
+        job._process_batch(2)
+        self.assertEqual(job.state, 'running')
+        self.assertEqual(job.sent_count + job.skipped_count, 2)
+        self.assertEqual(len(job.pending_picking_ids), 1)
+
+        # El último lote termina el envío; el cliente sin email se omite
+        job._process_batch(2)
+        self.assertEqual(job.state, 'done')
+        self.assertEqual((job.sent_count, job.skipped_count), (2, 1))
+        self.assertFalse(job.pending_picking_ids)
+        self.assertTrue(job.date_done)
+        self.assertEqual(job.progress, 100.0)
+
+    def test_failure_and_retry(self):
+        job = self.Job._enqueue('overdue', self.loans)
+        MailTemplate = self.env.registry['mail.template']
+        with patch.object(MailTemplate, 'send_mail_batch', side_effect=Exception('Servidor de correo caído')):
+            self.Job._cron_process_notification_jobs()
+        self.assertEqual(job.state, 'failed')
+        self.assertIn('Servidor de correo caído', job.error_message)
+        # El lote fallido no se marca como procesado
+        self.assertEqual(job.pending_picking_ids, self.loans)
+
+        job.action_retry()
+        self.assertEqual(job.state, 'queued')
+        self.assertFalse(job.error_message)
+        self.Job._cron_process_notification_jobs()
+        self.assertEqual(job.state, 'done')
+        self.assertEqual((job.sent_count, job.skipped_count), (2, 1))
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+
+from odoo import fields
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestLoanPartnerCounters(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.today = fields.Date.today()
+        cls.partner = cls.env['res.partner'].create({'name': 'Cliente Contadores'})
+        cls.other_partner = cls.env['res.partner'].create({'name': 'Otro Cliente Contadores'})
+        cls.product = cls.env['product.product'].create({
+            'name': 'Equipo Contadores',
+            'type': 'consu',
+            'is_storable': True,
+        })
+        warehouse = cls.env['stock.warehouse'].search([('company_id', '=', cls.env.company.id)], limit=1)
+        cls.loan = cls.env['stock.picking'].create({
+            'picking_type_id': warehouse.out_type_id.id,
+            'location_id': warehouse.lot_stock_id.id,
+            'location_dest_id': cls.env.ref('stock.stock_location_customers').id,
+            'partner_id': cls.partner.id,
+            'is_loan': True,
+            'loaned_to_partner_id': cls.partner.id,
+        })
+
+    def _create_detail(self, quantity=2.0, cost=50.0, status='active', expected_days=10):
+        return self.env['loan.tracking.detail'].create({
+            'picking_id': self.loan.id,
+            'partner_id': self.partner.id,
+            'product_id': self.product.id,
+            'quantity': quantity,
+            'original_cost': cost,
+            'status': status,
+            'expected_return_date': self.today + timedelta(days=expected_days),
+        })
+
+    def _counters(self, partner=None):
+        partner = partner or self.partner
+        return partner.loan_open_items, partner.loan_open_value, partner.loan_overdue_items
+
+    def test_create_adds_open_details_only(self):
+        self._create_detail()
+        self._create_detail(quantity=1.0, cost=30.0, status='pending_resolution')
+        self._create_detail(quantity=5.0, status='returned_good')
+        self.assertEqual(self._counters(), (3.0, 130.0, 0))
+
+    def test_write_applies_the_difference(self):
+        detail = self._create_detail()
+        detail.write({'quantity': 3.0, 'original_cost': 40.0})
+        self.assertEqual(self._counters()[:2], (3.0, 120.0))
+
+        # Cambiar de cliente mueve el aporte de uno a otro
+        detail.partner_id = self.other_partner
+        self.assertEqual(self._counters()[:2], (0.0, 0.0))
+        self.assertEqual(self._counters(self.other_partner)[:2], (3.0, 120.0))
+
+    def test_return_and_unlink_release_the_counters(self):
+        returned, removed = self._create_detail(), self._create_detail(quantity=1.0, cost=10.0)
+        returned.status = 'returned_good'
+        self.assertEqual(self._counters()[:2], (1.0, 10.0))
+        removed.unlink()
+        self.assertEqual(self._counters()[:2], (0.0, 0.0))
+
+    def test_overdue_is_left_to_the_recompute(self):
+        overdue = self._create_detail(expected_days=-3)
+        self._create_detail(quantity=1.0, cost=10.0)
+        # Los vencidos dependen de la fecha: las escrituras no los tocan
+        self.assertEqual(self._counters(), (3.0, 110.0, 0))
+
+        self.env['res.partner']._recompute_loan_counters()
+        self.assertEqual(self._counters(), (3.0, 110.0, 1))
+
+        # El recálculo corrige también las desviaciones acumuladas
+        self.env.cr.execute(
+            "UPDATE res_partner SET loan_open_items = 99, loan_open_value = 99 WHERE id = %s",
+            [self.partner.id],
+        )
+        overdue.status = 'returned_good'
+        self.env['res.partner']._recompute_loan_counters()
+        self.assertEqual(self._counters(), (1.0, 10.0, 0))
+
+    def test_check_loan_limits(self):
+        self._create_detail(quantity=4.0, cost=25.0)
+        self.partner.write({'max_loan_items': 5, 'max_loan_value': 200.0})
+
+        self.partner._check_loan_limits(extra_items=1.0, extra_value=100.0)
+        with self.assertRaisesRegex(UserError, 'límite de artículos'):
+            self.partner._check_loan_limits(extra_items=2.0)
+        with self.assertRaisesRegex(UserError, 'límite de valor'):
+            self.partner._check_loan_limits(extra_items=1.0, extra_value=150.0)
+
+        # Sin límites configurados no se valida nada
+        self.partner.write({'max_loan_items': 0, 'max_loan_value': 0.0})
+        self.partner._check_loan_limits(extra_items=100.0, extra_value=1e6)
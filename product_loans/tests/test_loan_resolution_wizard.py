@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestLoanResolutionWizardDefaultGet(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.partner = cls.env['res.partner'].create({'name': 'Cliente Resolución'})
+        cls.products = cls.env['product.product'].create([{
+            'name': f'Equipo Resolución {index}',
+            'type': 'consu',
+            'is_storable': True,
+            'tracking': 'serial',
+            'list_price': 100.0 + index,
+        } for index in range(5)])
+        warehouse = cls.env['stock.warehouse'].search([('company_id', '=', cls.env.company.id)], limit=1)
+        cls.picking_type = warehouse.out_type_id
+
+    def _create_loan(self, line_count):
+        picking = self.env['stock.picking'].create({
+            'picking_type_id': self.picking_type.id,
+            'location_id': self.picking_type.default_location_src_id.id,
+            'location_dest_id': self.env.ref('stock.stock_location_customers').id,
+            'partner_id': self.partner.id,
+            'is_loan': True,
+            'loaned_to_partner_id': self.partner.id,
+        })
+        lots = self.env['stock.lot'].create([{
+            'name': f'RES-{picking.id}-{index}',
+            'product_id': self.products[index % len(self.products)].id,
+        } for index in range(line_count)])
+        self.env['loan.tracking.detail'].create([{
+            'picking_id': picking.id,
+            'partner_id': self.partner.id,
+            'product_id': lot.product_id.id,
+            'lot_id': lot.id,
+            'quantity': 1.0,
+            'status': 'active',
+        } for lot in lots])
+        self.env.flush_all()
+        return picking
+
+    def _count_default_get_queries(self, picking):
+        Wizard = self.env['loan.resolution.wizard'].with_context(active_id=picking.id)
+        fields_list = list(Wizard._fields)
+        self.env.invalidate_all()
+        queries_before = self.env.cr.sql_log_count
+        values = Wizard.default_get(fields_list)
+        return self.env.cr.sql_log_count - queries_before, values
+
+    def test_default_get_builds_lines_from_details(self):
+        picking = self._create_loan(3)
+        _queries, values = self._count_default_get_queries(picking)
+        lines = [line_vals for _command, _id, line_vals in values['resolution_line_ids']]
+        self.assertEqual(len(lines), 3)
+        for line_vals in lines:
+            product = self.env['product.product'].browse(line_vals['product_id'])
+            self.assertEqual(line_vals['unit_price'], product.list_price)
+            self.assertTrue(line_vals['lot_id'])
+            self.assertEqual(line_vals['resolution_type'], 'keep_loan')
+
+    def test_default_get_query_count_independent_of_lines(self):
+        """El número de consultas no crece con el número de líneas del préstamo"""
+        small_queries, small_values = self._count_default_get_queries(self._create_loan(2))
+        large_queries, large_values = self._count_default_get_queries(self._create_loan(60))
+        self.assertEqual(len(small_values['resolution_line_ids']), 2)
+        self.assertEqual(len(large_values['resolution_line_ids']), 60)
+        self.assertEqual(large_queries, small_queries)
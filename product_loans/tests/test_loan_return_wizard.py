@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import patch
+
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestLoanReturnWizardScan(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.partner = cls.env['res.partner'].create({'name': 'Cliente Devolución Escáner'})
+        cls.serial_product = cls.env['product.product'].create({
+            'name': 'Equipo Escáner',
+            'type': 'consu',
+            'is_storable': True,
+            'tracking': 'serial',
+        })
+        cls.lot_product = cls.env['product.product'].create({
+            'name': 'Consumible Escáner',
+            'type': 'consu',
+            'is_storable': True,
+            'tracking': 'lot',
+        })
+        warehouse = cls.env['stock.warehouse'].search([('company_id', '=', cls.env.company.id)], limit=1)
+        cls.picking_type = warehouse.out_type_id
+        cls.return_location = warehouse.lot_stock_id
+
+    def _create_loan(self, lots):
+        picking = self.env['stock.picking'].create({
+            'picking_type_id': self.picking_type.id,
+            'location_id': self.picking_type.default_location_src_id.id,
+            'location_dest_id': self.env.ref('stock.stock_location_customers').id,
+            'partner_id': self.partner.id,
+            'is_loan': True,
+            'loaned_to_partner_id': self.partner.id,
+        })
+        self.env['loan.tracking.detail'].create([{
+            'picking_id': picking.id,
+            'partner_id': self.partner.id,
+            'product_id': lot.product_id.id,
+            'lot_id': lot.id,
+            'quantity': quantity,
+            'status': 'active',
+        } for lot, quantity in lots])
+        return picking
+
+    def _create_lots(self, product, names):
+        return self.env['stock.lot'].create([{'name': name, 'product_id': product.id} for name in names])
+
+    def _scan(self, loan, serials):
+        wizard = self.env['loan.return.wizard.enhanced'].with_context(picking_id=loan.id).create({
+            'picking_id': loan.id,
+            'scan_mode': True,
+            'inspection_required': False,
+            'return_location_id': self.return_location.id,
+            'scanned_serials': "\n".join(serials),
+        })
+        wizard.action_match_scanned_serials()
+        return wizard
+
+    def test_scan_matches_serials_across_loans(self):
+        first_lots = self._create_lots(self.serial_product, ['SCAN-A1', 'SCAN-A2'])
+        second_lots = self._create_lots(self.serial_product, ['SCAN-B1'])
+        first_loan = self._create_loan([(lot, 1.0) for lot in first_lots])
+        second_loan = self._create_loan([(lot, 1.0) for lot in second_lots])
+
+        wizard = self._scan(first_loan, ['SCAN-A1', 'SCAN-B1', 'SCAN-UNKNOWN'])
+        self.assertEqual(wizard.return_line_ids.lot_id, first_lots[0] | second_lots)
+        self.assertEqual(wizard.unmatched_serials, 'SCAN-UNKNOWN')
+
+        wizard.action_process_return()
+        details = self.env['loan.tracking.detail'].search([('picking_id', 'in', (first_loan | second_loan).ids)])
+        returned = details.filtered(lambda d: d.status == 'returned_good')
+        self.assertEqual(returned.lot_id, first_lots[0] | second_lots)
+        self.assertEqual(second_loan.loan_state, 'completed')
+        self.assertEqual(first_loan.loan_state, 'partially_resolved')
+
+    def test_scan_goes_through_mark_as_returned(self):
+        lots = self._create_lots(self.serial_product, ['SCAN-C1', 'SCAN-C2'])
+        loan = self._create_loan([(lot, 1.0) for lot in lots])
+        wizard = self._scan(loan, ['SCAN-C1', 'SCAN-C2'])
+        wizard.return_line_ids[0].return_condition = 'damaged'
+
+        Detail = self.env.registry['loan.tracking.detail']
+        with patch.object(Detail, 'action_mark_as_returned', autospec=True,
+                          side_effect=Detail.action_mark_as_returned) as mark_as_returned:
+            wizard.action_process_return()
+        self.assertEqual(mark_as_returned.call_count, 2)
+        conditions = sorted(call.args[2] for call in mark_as_returned.call_args_list)
+        self.assertEqual(conditions, ['damaged', 'good'])
+
+    def test_partial_return_keeps_detail_open(self):
+        lot = self._create_lots(self.lot_product, ['SCAN-LOT-1'])
+        loan = self._create_loan([(lot, 5.0)])
+        wizard = self._scan(loan, ['SCAN-LOT-1'])
+        wizard.return_line_ids.return_qty = 2.0
+
+        wizard.action_process_return()
+        detail = self.env['loan.tracking.detail'].search([('picking_id', '=', loan.id)])
+        self.assertEqual(detail.status, 'active')
+        self.assertEqual(loan.loan_state, 'partially_resolved')
+        return_picking = self.env['stock.picking'].search([('loan_return_origin_id', '=', loan.id)])
+        self.assertEqual(return_picking.move_ids.product_uom_qty, 2.0)
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from datetime import timedelta
+
+from odoo import api, fields, Command, SUPERUSER_ID
+from odoo.exceptions import UserError
+from odoo.sql_db import db_connect
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestLoanStockReservationConcurrency(TransactionCase):
+    """Pruebas de estrés multi-hilo sobre los locks de reserva de préstamos.
+
+    Cada hilo abre su propio cursor real (fuera del cursor de pruebas), de
+    modo que los advisory locks compiten igual que en sesiones de usuario.
+    """
+
+    THREADS = 8
+
+    def _run_threads(self, target, count):
+        errors = []
+
+        def runner(index):
+            try:
+                target(index)
+            except Exception as e:  # pylint: disable=broad-except
+                errors.append(e)
+
+        threads = [threading.Thread(target=runner, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=60)
+        self.assertFalse(errors, f"Errores en hilos: {errors}")
+
+    def _with_env(self, callback):
+        """Ejecutar callback con un entorno sobre un cursor independiente"""
+        with db_connect(self.env.cr.dbname).cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            try:
+                return callback(env['loan.stock.reservation'])
+            finally:
+                # Rollback libera los advisory locks transaccionales
+                cr.rollback()
+
+    def test_same_serial_waits_its_turn(self):
+        """Las sesiones que reservan la misma serie esperan su turno, sin error"""
+        barrier = threading.Barrier(self.THREADS)
+        guard = threading.Lock()
+        state = {'inside': 0, 'max_inside': 0, 'acquired': 0}
+
+        def attempt(index):
+            def callback(reservation):
+                barrier.wait()
+                reservation._acquire_locks([(999001, 888001)])
+                with guard:
+                    state['inside'] += 1
+                    state['max_inside'] = max(state['max_inside'], state['inside'])
+                time.sleep(0.05)
+                with guard:
+                    state['inside'] -= 1
+                    state['acquired'] += 1
+            self._with_env(callback)
+
+        self._run_threads(attempt, self.THREADS)
+        self.assertEqual(state['max_inside'], 1)
+        self.assertEqual(state['acquired'], self.THREADS)
+
+    def test_distinct_products_do_not_block(self):
+        """Préstamos de productos distintos no se serializan entre sí"""
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+
+        def attempt(index):
+            def callback(reservation):
+                barrier.wait()
+                reservation._acquire_locks([(999100 + index, False)])
+                results.append(True)
+                barrier.wait()
+            self._with_env(callback)
+
+        self._run_threads(attempt, self.THREADS)
+        self.assertEqual(len(results), self.THREADS)
+
+    def test_stress_critical_section_exclusive(self):
+        """Bajo carga nunca hay dos sesiones dentro de la misma reserva"""
+        iterations = 25
+        guard = threading.Lock()
+        state = {'inside': 0, 'max_inside': 0, 'acquired': 0}
+
+        def worker(index):
+            for _i in range(iterations):
+                def callback(reservation):
+                    # Claves en distinto orden: el ordenamiento evita deadlocks
+                    keys = [(999200, 777001), (999201, False)]
+                    if index % 2:
+                        keys.reverse()
+                    reservation._acquire_locks(keys)
+                    with guard:
+                        state['inside'] += 1
+                        state['acquired'] += 1
+                        state['max_inside'] = max(state['max_inside'], state['inside'])
+                    time.sleep(0.001)
+                    with guard:
+                        state['inside'] -= 1
+                self._with_env(callback)
+
+        self._run_threads(worker, self.THREADS)
+        self.assertEqual(state['max_inside'], 1)
+        self.assertEqual(state['acquired'], self.THREADS * iterations)
+
+    def test_lock_key_ignores_empty_lot(self):
+        """Productos sin serie comparten una única clave por producto"""
+        reservation = self.env['loan.stock.reservation']
+        self.assertEqual(
+            reservation._lock_key(10, False),
+            reservation._lock_key(10, None),
+        )
+        self.assertNotEqual(
+            reservation._lock_key(10, 1),
+            reservation._lock_key(10, 2),
+        )
+
+
+def create_loan(env, partner, product, lot):
+    """Préstamo en borrador de una unidad de la serie indicada"""
+    picking_type = env['stock.warehouse'].search([('company_id', '=', env.company.id)], limit=1).out_type_id
+    source = picking_type.default_location_src_id
+    destination = env.ref('stock.stock_location_customers')
+    return env['stock.picking'].create({
+        'picking_type_id': picking_type.id,
+        'location_id': source.id,
+        'location_dest_id': destination.id,
+        'partner_id': partner.id,
+        'is_loan': True,
+        'loaned_to_partner_id': partner.id,
+        'loan_expected_return_date': fields.Date.today() + timedelta(days=15),
+        'move_ids_without_package': [Command.create({
+            'name': product.display_name,
+            'product_id': product.id,
+            'product_uom_qty': 1.0,
+            'product_uom': product.uom_id.id,
+            'location_id': source.id,
+            'location_dest_id': destination.id,
+            'move_line_ids': [Command.create({
+                'product_id': product.id,
+                'lot_id': lot.id,
+                'quantity': 1.0,
+                'location_id': source.id,
+                'location_dest_id': destination.id,
+            })],
+        })],
+    })
+
+
+def create_serial_in_stock(env, name):
+    """Producto con número de serie y una unidad en stock"""
+    product = env['product.product'].create({
+        'name': f'Equipo {name}',
+        'type': 'consu',
+        'is_storable': True,
+        'tracking': 'serial',
+    })
+    lot = env['stock.lot'].create({'name': name, 'product_id': product.id, 'company_id': env.company.id})
+    location = env['stock.warehouse'].search([('company_id', '=', env.company.id)], limit=1).lot_stock_id
+    env['stock.quant']._update_available_quantity(product, location, 1.0, lot_id=lot)
+    return product, lot
+
+
+@tagged('post_install', '-at_install')
+class TestLoanStockReservation(TransactionCase):
+    """Pruebas de reserve_loan_move_lines sobre préstamos reales"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.partner = cls.env['res.partner'].create({'name': 'Cliente Reservas'})
+        cls.product, cls.lot = create_serial_in_stock(cls.env, 'SN-RESERVA-001')
+        cls.Reservation = cls.env['loan.stock.reservation']
+
+    def _track(self, loan, status):
+        return self.env['loan.tracking.detail'].create({
+            'picking_id': loan.id,
+            'partner_id': self.partner.id,
+            'product_id': self.product.id,
+            'lot_id': self.lot.id,
+            'quantity': 1.0,
+            'status': status,
+            'loan_date': fields.Datetime.now(),
+            'expected_return_date': loan.loan_expected_return_date,
+            'original_cost': self.product.standard_price,
+        })
+
+    def test_free_serial_is_reserved(self):
+        loan = create_loan(self.env, self.partner, self.product, self.lot)
+        self.Reservation.reserve_loan_move_lines(loan.move_line_ids)
+
+    def test_serial_in_active_loan_is_rejected(self):
+        for status in ('active', 'pending_resolution'):
+            with self.subTest(status=status):
+                first_loan = create_loan(self.env, self.partner, self.product, self.lot)
+                detail = self._track(first_loan, status)
+                second_loan = create_loan(self.env, self.partner, self.product, self.lot)
+                with self.assertRaisesRegex(UserError, 'ya están prestados'):
+                    self.Reservation.reserve_loan_move_lines(second_loan.move_line_ids)
+                # La propia línea del préstamo no cuenta como duplicado
+                self.Reservation.reserve_loan_move_lines(first_loan.move_line_ids)
+                detail.unlink()
+
+    def test_resolved_serial_can_be_lent_again(self):
+        first_loan = create_loan(self.env, self.partner, self.product, self.lot)
+        self._track(first_loan, 'returned_good')
+        second_loan = create_loan(self.env, self.partner, self.product, self.lot)
+        self.Reservation.reserve_loan_move_lines(second_loan.move_line_ids)
+
+
+@tagged('post_install', '-at_install')
+class TestLoanStockReservationLockedQuant(TransactionCase):
+    """Quant bloqueado por otra sesión durante la validación de un préstamo.
+
+    Los datos se confirman en un cursor propio para que las demás sesiones
+    los vean, y se eliminan al terminar.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.registry_cursor = lambda: db_connect(self.env.cr.dbname).cursor()
+        with self.registry_cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            product, lot = create_serial_in_stock(env, 'SN-RESERVA-LOCK')
+            partner = env['res.partner'].create({'name': 'Cliente Reservas Concurrentes'})
+            self.fixture = {
+                'product': product.id,
+                'lot': lot.id,
+                'partner': partner.id,
+                'quants': env['stock.quant'].search([('lot_id', '=', lot.id)]).ids,
+            }
+            cr.commit()
+        self.addCleanup(self._remove_fixture)
+
+    def _remove_fixture(self):
+        with self.registry_cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            cr.execute("DELETE FROM stock_quant WHERE id IN %s", (tuple(self.fixture['quants']),))
+            env['stock.lot'].browse(self.fixture['lot']).unlink()
+            env['product.product'].browse(self.fixture['product']).product_tmpl_id.unlink()
+            env['res.partner'].browse(self.fixture['partner']).unlink()
+            cr.commit()
+
+    def test_locked_quant_raises_user_error(self):
+        with self.registry_cursor() as locking_cr, self.registry_cursor() as cr:
+            # Otra sesión está moviendo el stock de la serie
+            locking_cr.execute("SELECT id FROM stock_quant WHERE id IN %s FOR UPDATE",
+                               (tuple(self.fixture['quants']),))
+            try:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                loan = create_loan(
+                    env,
+                    env['res.partner'].browse(self.fixture['partner']),
+                    env['product.product'].browse(self.fixture['product']),
+                    env['stock.lot'].browse(self.fixture['lot']),
+                )
+                with self.assertRaisesRegex(UserError, 'modificado por otro usuario'):
+                    env['loan.stock.reservation'].reserve_loan_move_lines(loan.move_line_ids)
+            finally:
+                cr.rollback()
+                locking_cr.rollback()
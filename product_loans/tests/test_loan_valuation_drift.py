@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+
+@tagged('post_install', '-at_install')
+class TestLoanValuationDrift(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.partner = cls.env['res.partner'].create({'name': 'Cliente Valoración'})
+        cls.product = cls.env['product.product'].create({
+            'name': 'Equipo Valoración',
+            'type': 'consu',
+            'is_storable': True,
+            'standard_price': 100.0,
+        })
+        warehouse = cls.env['stock.warehouse'].search([('company_id', '=', cls.env.company.id)], limit=1)
+        cls.loan = cls.env['stock.picking'].create({
+            'picking_type_id': warehouse.out_type_id.id,
+            'location_id': warehouse.lot_stock_id.id,
+            'location_dest_id': cls.env.ref('stock.stock_location_customers').id,
+            'partner_id': cls.partner.id,
+            'is_loan': True,
+            'loaned_to_partner_id': cls.partner.id,
+        })
+
+    def _create_layer(self, product, quantity, unit_cost):
+        return self.env['stock.valuation.layer'].create({
+            'product_id': product.id,
+            'company_id': self.env.company.id,
+            'quantity': quantity,
+            'unit_cost': unit_cost,
+            'value': quantity * unit_cost,
+        })
+
+    def _create_tracker(self, product, original_cost=100.0):
+        return self.env['loan.valuation.tracker'].create({
+            'picking_id': self.loan.id,
+            'product_id': product.id,
+            'original_cost': original_cost,
+            'loan_date': fields.Date.today(),
+        })
+
+    def test_latest_layer_with_quantity_sets_the_cost(self):
+        self._create_layer(self.product, 1.0, 100.0)
+        self._create_layer(self.product, 1.0, 130.0)
+        # Revaluación sin cantidad: no fija el costo unitario
+        self._create_layer(self.product, 0.0, 999.0)
+
+        tracker = self._create_tracker(self.product)
+        self.assertEqual(tracker.current_cost, 130.0)
+        self.assertEqual(tracker.valuation_difference, 30.0)
+        self.assertTrue(tracker.is_significant_difference)
+        self.assertTrue(tracker.valuation_refresh_date)
+
+        # Una capa posterior toma el relevo al refrescar
+        self._create_layer(self.product, 2.0, 105.0)
+        self.env['loan.valuation.tracker']._cron_refresh_valuation_drift()
+        self.assertEqual(tracker.current_cost, 105.0)
+        self.assertEqual(tracker.valuation_difference, 5.0)
+        self.assertFalse(tracker.is_significant_difference)
+
+    def test_threshold_and_missing_layers(self):
+        self._create_layer(self.product, 1.0, 130.0)
+        tracker = self._create_tracker(self.product)
+        self.assertTrue(tracker.is_significant_difference)
+
+        self.env['ir.config_parameter'].sudo().set_param('product_loans.valuation_significant_threshold', 50)
+        tracker._refresh_valuation_drift()
+        self.assertFalse(tracker.is_significant_difference)
+
+        # Sin capas se conserva el costo original
+        other_product = self.product.copy({'name': 'Equipo Sin Capas'})
+        untouched = self._create_tracker(other_product, original_cost=80.0)
+        self.assertEqual(untouched.current_cost, 80.0)
+        self.assertEqual(untouched.valuation_difference, 0.0)
+
+    def test_resolved_trackers_are_frozen(self):
+        self._create_layer(self.product, 1.0, 130.0)
+        tracker = self._create_tracker(self.product)
+        tracker.is_resolved = True
+        self._create_layer(self.product, 1.0, 150.0)
+        self.env['loan.valuation.tracker']._cron_refresh_valuation_drift()
+        self.assertEqual(tracker.current_cost, 130.0)
@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
 
-from odoo import api, fields, models, _
+from odoo import api, fields, models, Command, _
 from odoo.exceptions import UserError, ValidationError
+from odoo.tools import float_compare
+from collections import defaultdict
 from datetime import datetime, timedelta
 
+from ..models.loan_stock_reservation import ACTIVE_TRACKING_STATUSES
+
 
 class LoanTrialConfigWizard(models.TransientModel):
     _name = 'loan.trial.config.wizard'
@@ -94,9 +98,20 @@ class LoanTrialConfigWizard(models.TransientModel):
             'loan_notes': (self.picking_id.loan_notes or '') + f"\n\nPeríodo de prueba iniciado: {fields.Date.today()} - {self.trial_end_date}. {self.notes or ''}"
         })
         
-        # Crear recordatorio automático si está habilitado
-        if self.automatic_reminder:
-            self._create_reminder_activity()
+        # Registrar el inicio de la prueba en el historial de eventos
+        active_details = self.env['loan.tracking.detail'].search([
+            ('picking_id', '=', self.picking_id.id),
+            ('status', 'in', ['active', 'pending_resolution'])
+        ])
+        LoanEvent = self.env['loan.event']
+        LoanEvent._log_events([
+            LoanEvent._prepare_detail_event('trial_started', detail) for detail in active_details
+        ])
+        
+        # El recordatorio lo crea el planificador de vencimientos al entrar en la ventana
+        self.env['loan.due.date']._configure_trial_reminder(
+            self.picking_id, self.reminder_user_id if self.automatic_reminder else None, self.notes
+        )
         
         return {
             'type': 'ir.actions.client',
@@ -115,38 +130,6 @@ class LoanTrialConfigWizard(models.TransientModel):
             }
         }
 
-    def _create_reminder_activity(self):
-        """Crear actividad de recordatorio automático"""
-        reminder_date = self.trial_end_date - timedelta(days=1)
-        
-        if reminder_date <= fields.Date.today():
-            reminder_date = fields.Date.today()
-        
-        activity_type = self.env.ref('mail.mail_activity_data_todo', False)
-        if not activity_type:
-            activity_type = self.env['mail.activity.type'].search([], limit=1)
-        
-        self.env['mail.activity'].create({
-            'activity_type_id': activity_type.id,
-            'res_model': 'stock.picking',
-            'res_id': self.picking_id.id,
-            'summary': f'Período de Prueba Finaliza - {self.picking_id.name}',
-            'note': f'''
-                <p><strong>El período de prueba finaliza mañana</strong></p>
-                <p>Cliente: {self.partner_id.name}</p>
-                <p>Fecha de vencimiento: {self.trial_end_date}</p>
-                <p>Acciones recomendadas:</p>
-                <ul>
-                    <li>Contactar al cliente para conocer su decisión</li>
-                    <li>Usar "Resolver Préstamo" para procesar compras/devoluciones</li>
-                    <li>Extender período si es necesario</li>
-                </ul>
-                <p>Notas: {self.notes or 'N/A'}</p>
-            ''',
-            'date_deadline': reminder_date,
-            'user_id': self.reminder_user_id.id,
-        })
-
 
 class LoanReturnWizardEnhanced(models.TransientModel):
     _name = 'loan.return.wizard.enhanced'
@@ -202,6 +185,59 @@ class LoanReturnWizardEnhanced(models.TransientModel):
         'wizard_id',
         string='Productos a Devolver'
     )
+    
+    scan_mode = fields.Boolean(
+        string='Devolución por Escáner',
+        help="Las líneas se generan a partir de los números de serie escaneados, "
+             "buscándolos en todos los préstamos activos del cliente"
+    )
+    
+    scan_input = fields.Char(
+        string='Escanear',
+        help="Cada lectura del escáner se agrega a la lista de series escaneadas"
+    )
+    
+    scanned_serials = fields.Text(
+        string='Series Escaneadas',
+        help="Un número de serie por línea. También se puede pegar una lista completa"
+    )
+    
+    scanned_count = fields.Integer(
+        string='Series Leídas',
+        compute='_compute_scanned_count'
+    )
+    
+    unmatched_serials = fields.Text(
+        string='Series No Encontradas',
+        readonly=True,
+        help="Series escaneadas que no corresponden a ningún préstamo activo del cliente"
+    )
+
+    @api.depends('scanned_serials')
+    def _compute_scanned_count(self):
+        for wizard in self:
+            wizard.scanned_count = len(wizard._get_scanned_serials())
+
+    @api.onchange('scan_input')
+    def _onchange_scan_input(self):
+        """Acumular la lectura del escáner y dejar el campo listo para la siguiente"""
+        if not self.scan_input:
+            return
+        serial = self.scan_input.strip()
+        self.scan_input = False
+        if serial in self._get_scanned_serials():
+            return {
+                'warning': {
+                    'title': _('Serie repetida'),
+                    'message': _(f'La serie {serial} ya fue escaneada.')
+                }
+            }
+        self.scanned_serials = f"{self.scanned_serials}\n{serial}" if self.scanned_serials else serial
+
+    def _get_scanned_serials(self):
+        """Conjunto de series escaneadas, sin espacios ni duplicados"""
+        self.ensure_one()
+        return set((self.scanned_serials or '').replace(',', '\n').split())
 
     @api.model
     def default_get(self, fields_list):
@@ -212,6 +248,11 @@ class LoanReturnWizardEnhanced(models.TransientModel):
             picking_id = self.env.context['picking_id']
             picking = self.env['stock.picking'].browse(picking_id)
             
+            # En modo escáner las líneas salen de las series leídas
+            if res.get('scan_mode'):
+                res['return_location_id'] = self._get_default_return_location_id()
+                return res
+            
             if picking.exists() and picking.is_loan:
                 # Buscar detalles de seguimiento activos
                 active_details = self.env['loan.tracking.detail'].search([
@@ -231,28 +272,87 @@ class LoanReturnWizardEnhanced(models.TransientModel):
                     }))
                 
                 res['return_line_ids'] = return_lines
-                
-                # Configurar ubicación de devolución por defecto
-                if 'return_location_id' in self.env.context:
-                    res['return_location_id'] = self.env.context['return_location_id']
-                else:
-                    # Buscar almacén principal
-                    main_warehouse = self.env['stock.warehouse'].search([
-                        ('warehouse_type', '!=', 'loans')
-                    ], limit=1)
-                    if main_warehouse:
-                        res['return_location_id'] = main_warehouse.lot_stock_id.id
+                res['return_location_id'] = self._get_default_return_location_id()
         
         return res
 
+    @api.model
+    def _get_default_return_location_id(self):
+        """Ubicación de devolución indicada en el contexto o la del almacén principal"""
+        if 'return_location_id' in self.env.context:
+            return self.env.context['return_location_id']
+        picking = self.env['stock.picking'].browse(self.env.context.get('picking_id'))
+        return self.env['loan.location.resolver'].resolve(
+            picking.company_id, picking.loaned_to_partner_id
+        )['return'].id or False
+
+    def action_match_scanned_serials(self):
+        """Generar las líneas de devolución a partir de las series escaneadas.
+
+        Todas las series se buscan en una sola consulta contra los detalles
+        activos o pendientes de resolución de todos los préstamos del cliente,
+        no solo el actual.
+        """
+        self.ensure_one()
+        serials = self._get_scanned_serials()
+        if not serials:
+            raise UserError(_("Escanee al menos un número de serie."))
+        
+        details = self.env['loan.tracking.detail'].search_fetch([
+            ('partner_id', '=', self.partner_id.id),
+            ('status', 'in', ACTIVE_TRACKING_STATUSES),
+            ('lot_id.name', 'in', list(serials)),
+        ], ['picking_id', 'product_id', 'lot_id', 'quantity'])
+        
+        matched = set(details.lot_id.mapped('name'))
+        unmatched = sorted(serials - matched)
+        
+        self.write({
+            'return_line_ids': [Command.clear()] + [
+                Command.create({
+                    'tracking_detail_id': detail.id,
+                    'product_id': detail.product_id.id,
+                    'lot_id': detail.lot_id.id,
+                    'loaned_qty': detail.quantity,
+                    'return_qty': detail.quantity,
+                    'return_condition': 'good',
+                })
+                for detail in details
+            ],
+            'unmatched_serials': "\n".join(unmatched) or False,
+        })
+        
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'views': [(False, 'form')],
+            'target': 'new',
+            'context': self.env.context,
+        }
+
     def action_process_return(self):
         """Procesar la devolución completa"""
         self.ensure_one()
         
+        # Reservar los detalles para evitar devoluciones concurrentes
+        self.env['loan.stock.reservation'].lock_tracking_details(
+            self.return_line_ids.tracking_detail_id
+        )
+        
         # Validaciones
         self._validate_return()
         
         try:
+            if self.scan_mode:
+                # Devolución masiva: un picking por préstamo y escrituras agrupadas
+                return_pickings = self._create_bulk_return_pickings()
+                self._bulk_update_tracking_details(return_pickings)
+                self._bulk_update_loan_status(return_pickings)
+                self._log_return_events()
+                return self._return_bulk_success_action(return_pickings)
+            
             # Crear picking de devolución
             return_picking = self._create_return_picking()
             
@@ -261,6 +361,7 @@ class LoanReturnWizardEnhanced(models.TransientModel):
             
             # Actualizar estado del préstamo original
             self._update_loan_status()
+            self._log_return_events()
             
             return self._return_success_action(return_picking)
             
@@ -285,6 +386,12 @@ class LoanReturnWizardEnhanced(models.TransientModel):
                     f"Prestado: {line.loaned_qty}, Intentando devolver: {line.return_qty}"
                 ))
 
+            if line.tracking_detail_id.status not in ACTIVE_TRACKING_STATUSES:
+                raise UserError(_(
+                    f"El producto {line.product_id.name} ya fue procesado por otro usuario. "
+                    f"Estado actual: {line.tracking_detail_id.status}"
+                ))
+
     def _create_return_picking(self):
         """Crear transferencia de devolución"""
         # Determinar ubicación final según si requiere inspección
@@ -329,6 +436,116 @@ class LoanReturnWizardEnhanced(models.TransientModel):
         
         return return_picking
 
+    def _create_bulk_return_pickings(self):
+        """Crear en un solo lote una devolución por cada préstamo escaneado.
+
+        Las series de un mismo producto se agrupan en un único movimiento.
+        Devuelve {préstamo: picking de devolución}.
+        """
+        final_location = self.inspection_location_id if self.inspection_required else self.return_location_id
+        
+        lines_by_loan = defaultdict(lambda: self.env['loan.return.wizard.enhanced.line'])
+        for line in self.return_line_ids.filtered(lambda l: l.return_qty > 0):
+            lines_by_loan[line.tracking_detail_id.picking_id] |= line
+        
+        loans = list(lines_by_loan)
+        picking_vals_list = []
+        for loan in loans:
+            moves = []
+            for product, product_lines in lines_by_loan[loan].grouped('product_id').items():
+                move_vals = {
+                    'product_id': product.id,
+                    'product_uom_qty': sum(product_lines.mapped('return_qty')),
+                    'product_uom': product.uom_id.id,
+                    'location_id': loan.location_dest_id.id,
+                    'location_dest_id': final_location.id,
+                    'name': f"Devolución: {product.name}",
+                    'origin': loan.name,
+                }
+                if product_lines.lot_id:
+                    move_vals['lot_ids'] = [Command.set(product_lines.lot_id.ids)]
+                moves.append(Command.create(move_vals))
+            
+            picking_vals_list.append({
+                'partner_id': self.partner_id.id,
+                'picking_type_id': loan.picking_type_id.id,
+                'location_id': loan.location_dest_id.id,
+                'location_dest_id': final_location.id,
+                'origin': f"Devolución de {loan.name}",
+                'scheduled_date': self.return_date,
+                'note': self.notes or "Devolución por escáner procesada automáticamente",
+                'loan_return_origin_id': loan.id,
+                'move_ids_without_package': moves,
+            })
+        
+        return_pickings = self.env['stock.picking'].create(picking_vals_list)
+        return_pickings.action_confirm()
+        return dict(zip(loans, return_pickings))
+
+    def _bulk_update_tracking_details(self, return_pickings):
+        """Marcar como devueltos los detalles que vuelven completos.
+
+        Pasa por action_mark_as_returned, igual que la devolución individual.
+        Una devolución parcial viaja en el picking pero no cierra el detalle.
+        """
+        full_lines = self.return_line_ids.filtered(
+            lambda l: l.return_qty > 0 and float_compare(
+                l.return_qty, l.loaned_qty, precision_rounding=l.product_id.uom_id.rounding
+            ) >= 0
+        )
+        for line in full_lines:
+            line.tracking_detail_id.action_mark_as_returned(
+                return_pickings[line.tracking_detail_id.picking_id],
+                line.return_condition,
+                line.condition_notes
+            )
+
+    def _bulk_update_loan_status(self, return_pickings):
+        """Actualizar el estado de todos los préstamos afectados con un solo conteo"""
+        loans = self.env['stock.picking'].union(*return_pickings)
+        remaining = dict(self.env['loan.tracking.detail']._read_group(
+            [('picking_id', 'in', loans.ids), ('status', 'in', ACTIVE_TRACKING_STATUSES)],
+            ['picking_id'], ['__count'],
+        ))
+        completed = loans.filtered(lambda loan: not remaining.get(loan))
+        completed.write({'loan_state': 'completed'})
+        (loans - completed).write({'loan_state': 'partially_resolved'})
+
+    def _return_bulk_success_action(self, return_pickings):
+        """Mostrar las devoluciones generadas por el escaneo"""
+        pickings = self.env['stock.picking'].union(*return_pickings.values())
+        if len(pickings) == 1:
+            return self._return_success_action(pickings)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Devolución Procesada',
+                'message': f'Se crearon {len(pickings)} devoluciones para '
+                           f'{len(self.return_line_ids)} productos escaneados',
+                'type': 'success',
+                'next': {
+                    'type': 'ir.actions.act_window',
+                    'name': 'Devoluciones',
+                    'res_model': 'stock.picking',
+                    'domain': [('id', 'in', pickings.ids)],
+                    'view_mode': 'list,form',
+                    'views': [(False, 'list'), (False, 'form')],
+                    'target': 'current'
+                }
+            }
+        }
+
+    def _log_return_events(self):
+        """Registrar las devoluciones en el historial de eventos"""
+        LoanEvent = self.env['loan.event']
+        LoanEvent._log_events([
+            LoanEvent._prepare_detail_event(
+                'returned', line.tracking_detail_id, quantity=line.return_qty, date=self.return_date
+            )
+            for line in self.return_line_ids if line.return_qty > 0
+        ])
+
     def _update_tracking_details(self, return_picking):
         """Actualizar detalles de seguimiento según devolución"""
         for line in self.return_line_ids:
@@ -494,6 +711,13 @@ class LoanNotificationWizard(models.TransientModel):
         help="Enviar notificaciones por email a los clientes"
     )
     
+    email_dispatch_mode = fields.Selection([
+        ('queued', 'En segundo plano'),
+        ('immediate', 'Inmediato'),
+    ], string='Modo de Envío', default='queued', required=True,
+       help="En segundo plano los emails se generan por lotes desde una plantilla "
+            "y el asistente responde de inmediato con una referencia de seguimiento")
+    
     assigned_user_id = fields.Many2one(
         'res.users',
         string='Usuario Asignado',
@@ -525,6 +749,11 @@ class LoanNotificationWizard(models.TransientModel):
         if self.create_activities:
             processed += self._create_notification_activities(loans)
         
+        # Encolar emails en segundo plano para no bloquear al usuario
+        if self.send_emails and self.email_dispatch_mode == 'queued':
+            job = self.env['loan.notification.job']._enqueue(self.notification_type, loans)
+            return self._return_queued_action(job, processed)
+        
         # Enviar emails si está habilitado
         if self.send_emails:
             processed += self._send_notification_emails(loans)
@@ -539,6 +768,27 @@ class LoanNotificationWizard(models.TransientModel):
             }
         }
 
+    def _return_queued_action(self, job, activities_created):
+        """Notificar la referencia del envío encolado y abrir su progreso"""
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Notificaciones en Cola',
+                'message': f'Se encolaron {job.total_count} emails en el envío {job.name}. '
+                           f'Actividades creadas: {activities_created}.',
+                'type': 'success',
+                'next': {
+                    'type': 'ir.actions.act_window',
+                    'res_model': 'loan.notification.job',
+                    'res_id': job.id,
+                    'view_mode': 'form',
+                    'views': [(False, 'form')],
+                    'target': 'current',
+                }
+            }
+        }
+
     def _get_applicable_loans(self):
         """Obtener préstamos aplicables según tipo de notificación"""
         domain = [
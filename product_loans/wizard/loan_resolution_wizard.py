@@ -105,49 +105,37 @@ class LoanResolutionWizard(models.TransientModel):
             
         picking = self.env['stock.picking'].browse(picking_id)
         if not picking.exists() or not picking.is_loan:
-            _logger.warning(f"Picking {picking_id} no existe o no es un préstamo")
+            _logger.warning("Picking %s no existe o no es un préstamo", picking_id)
             return res
         
-        _logger.info(f"Buscando detalles de seguimiento para picking {picking.name}")
-        
-        # Buscar detalles de seguimiento existentes y asegurar que los tenemos
-        tracking_details = self.env['loan.tracking.detail'].search([
+        # Leer en bloque solo los campos necesarios: una consulta para los detalles
+        # y otra para los precios, sin importar el número de líneas
+        tracking_details = self.env['loan.tracking.detail'].search_read([
             ('picking_id', '=', picking.id),
             ('status', 'in', ['active', 'pending_resolution'])
-        ])
+        ], ['product_id', 'lot_id', 'quantity'], order='id', load=None)
         
-        _logger.info(f"Encontrados {len(tracking_details)} detalles de seguimiento activos")
+        _logger.info("Encontrados %s detalles de seguimiento activos en %s", len(tracking_details), picking.name)
         
         resolution_lines = []
         
         # Si hay detalles de seguimiento, usarlos
         if tracking_details:
+            product_ids = list({detail['product_id'] for detail in tracking_details})
+            list_prices = {
+                product['id']: product['list_price']
+                for product in self.env['product.product'].browse(product_ids).read(['list_price'], load=None)
+            }
             for detail in tracking_details:
-                # Verificar que el detalle existe y está activo
-                if not detail.exists() or detail.status not in ['active', 'pending_resolution']:
-                    _logger.warning(
-                        f"Detalle de seguimiento {detail.id} no válido para producto {detail.product_id.name}. "
-                        f"Estado: {detail.status}"
-                    )
-                    continue
-                
-                # Crear línea del wizard con referencia al tracking detail
-                line_vals = {
-                    'tracking_detail_id': detail.id,
-                    'product_id': detail.product_id.id,
-                    'lot_id': detail.lot_id.id if detail.lot_id else False,
-                    'loaned_qty': detail.quantity,
-                    'qty_to_resolve': detail.quantity,
+                resolution_lines.append((0, 0, {
+                    'tracking_detail_id': detail['id'],
+                    'product_id': detail['product_id'],
+                    'lot_id': detail['lot_id'] or False,
+                    'loaned_qty': detail['quantity'],
+                    'qty_to_resolve': detail['quantity'],
                     'resolution_type': 'keep_loan',
-                    'unit_price': detail.product_id.list_price,
-                }
-                
-                # Crear línea y verificar que se creó correctamente
-                resolution_lines.append((0, 0, line_vals))
-                _logger.info(
-                    f"Línea preparada desde tracking para producto {detail.product_id.name} "
-                    f"con cantidad {detail.quantity}, tracking_detail_id={detail.id}"
-                )
+                    'unit_price': list_prices.get(detail['product_id'], 0.0),
+                }))
         else:
             # Si no hay detalles, crearlos desde los movimientos
             for move in picking.move_ids_without_package.filtered(lambda m: m.state == 'done'):
@@ -249,6 +237,11 @@ class LoanResolutionWizard(models.TransientModel):
         
         _logger.info(f"Iniciando proceso de resolución para préstamo {self.picking_id.name}")
         
+        # Reservar los detalles para que otra sesión no resuelva las mismas líneas
+        self.env['loan.stock.reservation'].lock_tracking_details(
+            self.resolution_line_ids.tracking_detail_id
+        )
+        
         # Validaciones previas
         self._validate_resolution()
         
@@ -286,6 +279,9 @@ class LoanResolutionWizard(models.TransientModel):
             if self.has_continued_loans:
                 results['continued_details'] = self._process_continued_loans()
         
+            # Registrar las decisiones en el historial de eventos
+            self._log_resolution_events()
+        
             # 5. Determinar estado final basado en las decisiones
             if self.has_continued_loans:
                 self.picking_id.write({'loan_state': 'partially_resolved'})
@@ -305,6 +301,25 @@ class LoanResolutionWizard(models.TransientModel):
                 f"Error al procesar la resolución del préstamo: {str(e)}"
             ))
 
+    def _log_resolution_events(self):
+        """Un evento por línea: venta, devolución o extensión del préstamo"""
+        resolution_to_event = {
+            'buy': 'sold',
+            'return': 'returned',
+            'keep_loan': 'extended',
+        }
+        LoanEvent = self.env['loan.event']
+        LoanEvent._log_events([
+            LoanEvent._prepare_detail_event(
+                resolution_to_event[line.resolution_type],
+                line.tracking_detail_id,
+                quantity=line.qty_to_resolve,
+                amount=line.total_price if line.resolution_type == 'buy' else 0.0,
+                date=self.resolution_date,
+            )
+            for line in self.resolution_line_ids if line.tracking_detail_id
+        ])
+
     def _validate_resolution(self):
         """Validar que la resolución es consistente"""
         if not self.resolution_line_ids:
@@ -545,12 +560,12 @@ class LoanResolutionWizard(models.TransientModel):
 
     def _create_return_picking(self, return_lines):
         """Crear picking de devolución SIN validación de stock"""
-        # Determinar ubicación de destino
-        main_warehouse = self.env['stock.warehouse'].search([
-            ('warehouse_type', '!=', 'loans')
-        ], limit=1)
+        # Determinar ubicación de destino (resuelta una vez por compañía y cacheada)
+        return_location = self.env['loan.location.resolver'].resolve(
+            self.picking_id.company_id, self.partner_id
+        )['return']
         
-        if not main_warehouse:
+        if not return_location:
             raise UserError(_("No se encontró almacén principal para devoluciones."))
         
         # Determinar tipo de operación de devolución
@@ -561,7 +576,7 @@ class LoanResolutionWizard(models.TransientModel):
             'partner_id': self.partner_id.id,
             'picking_type_id': return_type.id,
             'location_id': self.picking_id.location_dest_id.id,  # Desde ubicación de préstamo
-            'location_dest_id': main_warehouse.lot_stock_id.id,  # A almacén principal
+            'location_dest_id': return_location.id,  # A almacén principal
             'origin': f"Resolución Devolución {self.picking_id.name}",  # CAMBIO: indicar que es devolución
             'note': f"Devolución procesada desde resolución de préstamo. Notas: {self.notes or 'N/A'}",
             'scheduled_date': self.resolution_date,
@@ -579,7 +594,7 @@ class LoanResolutionWizard(models.TransientModel):
                 'product_uom_qty': line.qty_to_resolve,
                 'product_uom': line.product_id.uom_id.id,
                 'location_id': self.picking_id.location_dest_id.id,
-                'location_dest_id': main_warehouse.lot_stock_id.id,
+                'location_dest_id': return_location.id,
                 'name': f"Devolución: {line.product_id.name}",
                 'origin': f"Resolución Devolución {self.picking_id.name}",  # CAMBIO
                 'state': 'draft',
@@ -129,6 +129,17 @@ class LoanReturnWizard(models.TransientModel):
         # Configurar hook para actualización automática de estado
         return_picking._setup_loan_return_hooks(self.picking_id)
 
+        # Registrar las devoluciones en el historial de eventos
+        self.env['loan.event']._log_events([{
+            'event_type': 'returned',
+            'date': self.return_date,
+            'picking_id': self.picking_id.id,
+            'partner_id': self.picking_id.loaned_to_partner_id.id,
+            'product_id': line.product_id.id,
+            'quantity': line.return_qty,
+            'loan_date': self.picking_id.date_done,
+        } for line in self.move_line_ids if line.return_qty > 0])
+
         return {
             'name': _('Devolución Creada'),
             'type': 'ir.actions.act_window',
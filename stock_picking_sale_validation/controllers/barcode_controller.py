@@ -8,6 +8,37 @@ _logger = logging.getLogger(__name__)
 
 class StockBarcodeValidationController(http.Controller):
 
+    def _get_scan_index(self, products_data):
+        """
+        Índice compacto para validar los escaneos en el navegador:
+        código de barras / referencia interna -> producto, UdM de la línea,
+        cantidad pendiente y UdM del producto.
+        El escaneo usa la UdM del producto: si ninguna línea la usa, la
+        entrada lleva otra UdM y el navegador delega en el servidor.
+        """
+        lines_by_uom = {}
+        for product in products_data:
+            entry = lines_by_uom.setdefault(
+                (product['id'], product['uom_id']),
+                [product['id'], product['uom_id'], 0.0, product['product_uom_id']],
+            )
+            entry[2] += product['qty_remaining']
+
+        entries_by_product = {}
+        for (product_id, uom_id), entry in lines_by_uom.items():
+            # Preferir las líneas en la UdM del producto, la que valida el servidor
+            if product_id not in entries_by_product or uom_id == entry[3]:
+                entries_by_product[product_id] = entry
+
+        index = {}
+        # El código de barras tiene prioridad sobre la referencia interna, como en el servidor
+        for code_field in ('barcode', 'default_code'):
+            for product in products_data:
+                code = product[code_field]
+                if code and code not in index:
+                    index[code] = entries_by_product[product['id']]
+        return index
+
     @http.route('/stock_barcode/validate_product', type='json', auth='user')
     def validate_product_for_picking(self, picking_id, product_id, **kwargs):
         """
@@ -87,6 +118,7 @@ class StockBarcodeValidationController(http.Controller):
                         'barcode': line.product_id.barcode or '',
                         'uom_id': line.product_uom.id,
                         'uom_name': line.product_uom.name,
+                        'product_uom_id': line.product_id.uom_id.id,
                         'qty_ordered': line.product_uom_qty,
                         'qty_delivered': line.qty_delivered,
                         'qty_remaining': line.product_uom_qty - line.qty_delivered
@@ -96,6 +128,7 @@ class StockBarcodeValidationController(http.Controller):
                 'success': True,
                 'all_products_allowed': False,
                 'products': products_data,
+                'scan_index': self._get_scan_index(products_data),
                 'sale_order_name': sale_order.name,
                 'message': 'Lista de productos obtenida correctamente'
             }
@@ -121,16 +154,12 @@ class StockBarcodeValidationController(http.Controller):
                     'message': 'Picking no encontrado'
                 }
             
-            # Buscar producto por código de barras
-            product = request.env['product.product'].search([
-                ('barcode', '=', barcode)
-            ], limit=1)
-            
-            if not product:
-                # Intentar buscar por referencia interna
-                product = request.env['product.product'].search([
-                    ('default_code', '=', barcode)
-                ], limit=1)
+            # Buscar producto por código de barras o referencia interna en una sola consulta
+            products = request.env['product.product'].search([
+                '|', ('barcode', '=', barcode), ('default_code', '=', barcode)
+            ])
+            # El código de barras tiene prioridad sobre la referencia interna
+            product = products.filtered(lambda p: p.barcode == barcode)[:1] or products[:1]
             
             if not product:
                 return {
@@ -12,6 +12,10 @@ StockBarcodePickingClientAction.include({
     init: function () {
         this._super.apply(this, arguments);
         this.allowed_products = [];
+        // Índice de escaneo: código -> [product_id, UdM de la línea, cantidad pendiente, UdM del producto]
+        this.scan_index = null;
+        this.remaining_qty = {};
+        this.rejected_codes = {};
         this.validation_active = false;
         this.sale_order_name = '';
     },
@@ -68,10 +72,22 @@ StockBarcodePickingClientAction.include({
         }).then(function (result) {
             if (result.success && !result.all_products_allowed) {
                 self.allowed_products = result.products || [];
+                self.scan_index = result.scan_index || {};
+                self.remaining_qty = {};
+                Object.keys(self.scan_index).forEach(function (code) {
+                    var entry = self.scan_index[code];
+                    if (entry[1] === entry[3]) {
+                        self.remaining_qty[entry[0]] = entry[2];
+                    }
+                });
             }
         });
     },
 
+    _getAllowedProduct: function (productId) {
+        return this.allowed_products.find(p => p.id === productId);
+    },
+
     _showValidationWarning: function () {
         if (this.validation_active && this.sale_order_name) {
             this.$('.o_barcode_generic_view').prepend(
@@ -86,9 +102,28 @@ StockBarcodePickingClientAction.include({
 
     _onBarcodeScanned: function (barcode) {
         var self = this;
+        var _super = this._super.bind(this);
+        
+        if (this.validation_active && this.scan_index) {
+            // Validación local: sin llamada al servidor para los códigos conocidos
+            // cuya línea usa la UdM del producto; el resto lo decide el servidor
+            var entry = this.scan_index[barcode];
+            if (entry && entry[1] === entry[3]) {
+                var product = this._getAllowedProduct(entry[0]);
+                this.remaining_qty[entry[0]] -= 1;
+                if (this.remaining_qty[entry[0]] < 0) {
+                    this._showNotification('warning', _t('Cantidad pendiente superada: ') + product.name);
+                }
+                return _super(barcode);
+            }
+            if (barcode in this.rejected_codes) {
+                this._showNotification('danger', this.rejected_codes[barcode]);
+                return Promise.reject(this.rejected_codes[barcode]);
+            }
+        }
         
         if (this.validation_active) {
-            // Validar el código de barras antes de procesarlo
+            // Código desconocido: validar el código de barras en el servidor
             return this._rpc({
                 route: '/stock_barcode/scan_product',
                 params: {
@@ -99,9 +134,12 @@ StockBarcodePickingClientAction.include({
                 if (result.success) {
                     // Si es válido, procesar normalmente
                     self._showNotification('success', _t('Producto válido: ') + result.product_name);
-                    return self._super(barcode);
+                    return _super(barcode);
                 } else {
-                    // Si no es válido, mostrar error
+                    // Si no es válido, mostrar error y no volver a consultarlo
+                    if (result.product_name) {
+                        self.rejected_codes[barcode] = result.message;
+                    }
                     self._showNotification('danger', result.message);
                     return Promise.reject(result.message);
                 }
@@ -111,7 +149,7 @@ StockBarcodePickingClientAction.include({
             });
         } else {
             // Si no hay validación activa, procesar normalmente
-            return this._super(barcode);
+            return _super(barcode);
         }
     },
 
@@ -3,6 +3,8 @@ from odoo.tests.common import TransactionCase
 from odoo.exceptions import ValidationError
 from odoo import fields
 
+from odoo.addons.stock_picking_sale_validation.controllers.barcode_controller import StockBarcodeValidationController
+
 class TestStockPickingValidation(TransactionCase):
     """
     Tests para validar la funcionalidad del módulo de validación de stock picking
@@ -221,6 +223,34 @@ class TestStockPickingValidation(TransactionCase):
         self.assertIn(self.product2.id, product_ids)
         self.assertNotIn(self.product3.id, product_ids)
 
+    def test_scan_index(self):
+        """Test: Índice de escaneo para validar en el navegador"""
+        uom_unit = self.env.ref('uom.product_uom_unit')
+        products_data = [{
+            'id': line.product_id.id,
+            'default_code': line.product_id.default_code or '',
+            'barcode': line.product_id.barcode or '',
+            'uom_id': line.product_uom.id,
+            'qty_remaining': line.product_uom_qty - line.qty_delivered,
+            'product_uom_id': line.product_id.uom_id.id,
+        } for line in self.sale_order.order_line]
+        index = StockBarcodeValidationController()._get_scan_index(products_data)
+
+        # Código de barras y referencia interna apuntan al mismo producto
+        self.assertEqual(index[self.product1.barcode], [self.product1.id, uom_unit.id, 10, uom_unit.id])
+        self.assertEqual(index['PROD001'], index[self.product1.barcode])
+        self.assertNotIn(self.product3.barcode, index)
+
+        # La línea en 'Caja' no coincide con la UdM del producto: la decide el servidor
+        self.assertEqual(index['PROD002'], [self.product2.id, self.uom_caja.id, 5, uom_unit.id])
+
+        # Las líneas repetidas suman su cantidad pendiente por UdM de la línea
+        in_boxes = dict(products_data[0], uom_id=self.uom_caja.id, qty_remaining=3)
+        index = StockBarcodeValidationController()._get_scan_index(
+            [in_boxes] + products_data + products_data[:1]
+        )
+        self.assertEqual(index['PROD001'], [self.product1.id, uom_unit.id, 20, uom_unit.id])
+
     def test_validate_product_for_picking_rpc(self):
         """Test: Validación RPC de producto específico"""
         # Producto válido